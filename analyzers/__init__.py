@@ -1,2 +1,11 @@
 # Este arquivo pode estar vazio.
-# Ele serve para indicar ao Python que 'analyzers' é um pacote.
\ No newline at end of file
+# Ele serve para indicar ao Python que 'analyzers' é um pacote.
+import sys
+
+# As expressões do analisador léxico usam quantificadores possessivos e a
+# análise das regras usa re._parser, disponíveis a partir do Python 3.11.
+VERSAO_MINIMA_PYTHON = (3, 11)
+
+if sys.version_info < VERSAO_MINIMA_PYTHON:
+    raise ImportError(f"O AnalysisSecCode requer Python {VERSAO_MINIMA_PYTHON[0]}.{VERSAO_MINIMA_PYTHON[1]} ou superior "
+                      f"(em uso: {sys.version_info[0]}.{sys.version_info[1]}).")
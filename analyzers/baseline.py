@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+VERSAO_BASELINE = 1
+
+
+def normalizar_trecho(code_snippet: str) -> str:
+    """Trecho com as sequências de espaços reduzidas a um espaço, imune a mudanças de indentação."""
+    return " ".join(code_snippet.split())
+
+
+def impressao_achado(vul_name: str, arquivo_relativo: str, code_snippet: str) -> str:
+    """
+    Impressão digital estável de um achado: depende da regra, do arquivo e do
+    trecho normalizado, mas não da linha, e sobrevive a deslocamentos do código.
+    """
+    conteudo = "\0".join((vul_name, arquivo_relativo, normalizar_trecho(code_snippet)))
+    return hashlib.sha256(conteudo.encode('utf-8', 'surrogatepass')).hexdigest()[:32]
+
+
+class Baseline:
+    """
+    Achados conhecidos de um projeto, gravados em um arquivo JSON e carregados
+    em um índice (impressão -> ocorrências). Os caminhos são relativos ao
+    diretório do arquivo de baseline, de modo que ele vale em qualquer cópia
+    do repositório.
+
+    A cada filtragem de um arquivo, cada impressão (que inclui o arquivo)
+    suprime no máximo a quantidade de ocorrências registrada: uma nova cópia
+    de uma linha já conhecida no mesmo arquivo continua sendo relatada, e o
+    mesmo arquivo pode ser filtrado de novo, como a cada alteração em --watch.
+    """
+    def __init__(self, caminho: str, impressoes: dict = None):
+        self.caminho = caminho
+        self.diretorio_base = os.path.dirname(os.path.abspath(caminho))
+        self.impressoes = impressoes or {}
+        self.suprimidos = 0
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "Baseline":
+        """Lê o arquivo de baseline. Lança OSError ou ValueError se ele não puder ser lido ou for inválido."""
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        if not isinstance(dados, dict) or dados.get("versao") != VERSAO_BASELINE:
+            raise ValueError(f"formato de baseline não suportado (esperada a versão {VERSAO_BASELINE})")
+        impressoes = {}
+        try:
+            for registro in dados.get("achados", []):
+                impressao = registro["impressao"]
+                impressoes[impressao] = impressoes.get(impressao, 0) + int(registro.get("ocorrencias", 1))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"registro de achado inválido: {e!r}")
+        return cls(caminho, impressoes)
+
+    def caminho_relativo(self, file_path: str) -> str:
+        try:
+            relativo = os.path.relpath(os.path.abspath(file_path), self.diretorio_base)
+        except ValueError:  # Outra unidade no Windows.
+            relativo = os.path.abspath(file_path)
+        return relativo.replace(os.sep, "/")
+
+    def iniciar(self):
+        """Zera a contagem de achados suprimidos para uma nova análise."""
+        self.suprimidos = 0
+
+    def filtrar(self, file_path: str, achados: list[tuple]) -> list[tuple]:
+        """
+        Retorna os achados compactos (regra, linha, trecho) do arquivo que não
+        constam da baseline. Cada chamada dispõe de todas as ocorrências
+        registradas, de modo que os achados de um arquivo devem ser filtrados
+        de uma só vez.
+        """
+        if not self.impressoes or not achados:
+            return achados
+        relativo = self.caminho_relativo(file_path)
+        # Ocorrências de cada impressão já suprimidas nesta filtragem.
+        usadas = {}
+        novos = []
+        for achado in achados:
+            impressao = impressao_achado(achado[0], relativo, achado[2])
+            restantes = self.impressoes.get(impressao, 0) - usadas.get(impressao, 0)
+            if restantes > 0:
+                usadas[impressao] = usadas.get(impressao, 0) + 1
+                self.suprimidos += 1
+            else:
+                novos.append(achado)
+        return novos
+
+
+class GravadorBaseline:
+    """Acumula os achados de uma análise e os grava como um novo arquivo de baseline."""
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._referencia = Baseline(caminho)
+        # impressão -> [regra, arquivo relativo, trecho normalizado, ocorrências]
+        self.registros = {}
+
+    def limpar(self):
+        self.registros = {}
+
+    def registrar(self, file_path: str, achados: list[tuple]):
+        relativo = self._referencia.caminho_relativo(file_path)
+        for vul_name, _, code_snippet in achados:
+            impressao = impressao_achado(vul_name, relativo, code_snippet)
+            registro = self.registros.get(impressao)
+            if registro is None:
+                self.registros[impressao] = [vul_name, relativo, normalizar_trecho(code_snippet), 1]
+            else:
+                registro[3] += 1
+
+    def gravar(self) -> int:
+        """Grava o arquivo, ordenado por arquivo, regra e trecho para diffs estáveis. Retorna o total de achados."""
+        achados = [{"impressao": impressao, "regra": vul_name, "arquivo": relativo, "trecho": trecho,
+                    "ocorrencias": ocorrencias}
+                   for impressao, (vul_name, relativo, trecho, ocorrencias) in self.registros.items()]
+        achados.sort(key=lambda registro: (registro["arquivo"], registro["regra"], registro["trecho"]))
+        diretorio = os.path.dirname(os.path.abspath(self.caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        with open(self.caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({"versao": VERSAO_BASELINE, "gerado_em": datetime.now().isoformat(timespec="seconds"),
+                       "achados": achados}, arquivo, ensure_ascii=False, indent=1)
+            arquivo.write("\n")
+        return sum(registro["ocorrencias"] for registro in achados)
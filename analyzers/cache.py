@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+# Incrementar quando o formato dos achados armazenados ou o comportamento
+# do detector mudar, para que entradas antigas deixem de ser reaproveitadas.
+VERSAO_CACHE = 5
+
+# Opções do detector que não alteram os achados produzidos e, portanto, não
+# entram na assinatura. Resultados interrompidos pelo tempo limite nunca são
+# armazenados.
+OPCOES_FORA_DA_ASSINATURA = ("tempo_limite_regra",)
+
+# Quantidade de gravações acumuladas antes de cada commit.
+TAMANHO_LOTE_GRAVACAO = 500
+
+
+def calcular_hash_conteudo(php_code: str) -> str:
+    """Retorna o hash SHA-256 do conteúdo de um arquivo."""
+    return hashlib.sha256(php_code.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def calcular_hash_arquivo(caminho: str) -> str | None:
+    """Retorna o hash do conteúdo de um arquivo em disco, ou None se não puder ser lido."""
+    try:
+        with open(caminho, 'r', encoding='utf-8', errors='replace') as arquivo:
+            return calcular_hash_conteudo(arquivo.read())
+    except OSError:
+        return None
+
+
+class CacheAnalise:
+    """
+    Cache persistente de resultados de análise em SQLite.
+    Cada entrada associa o par (hash do conteúdo do arquivo, assinatura do
+    conjunto de regras) aos achados compactos produzidos pelo detector, de
+    modo que arquivos inalterados analisados com as mesmas regras não passem
+    novamente pela detecção.
+
+    Achados que dependem de outros arquivos (inclusões seguidas pela análise
+    de fluxo de dados) guardam o caminho do arquivo analisado e o hash de
+    cada dependência; a entrada só é reaproveitada para o mesmo caminho e
+    enquanto nenhuma dependência mudar.
+
+    Com somente_leitura=True a conexão não grava nada, nem o horário de
+    acesso; é o modo usado pelos processos de trabalho da análise paralela.
+    """
+    def __init__(self, caminho: str, tamanho_maximo_mb: float = 256, idade_maxima_dias: float = 30,
+                 somente_leitura: bool = False):
+        self.caminho = caminho
+        self.somente_leitura = somente_leitura
+        self.tamanho_maximo = int(tamanho_maximo_mb * 1024 * 1024)
+        self.idade_maxima = idade_maxima_dias * 24 * 60 * 60
+        self.acertos = 0
+        self.falhas = 0
+        self._gravacoes_pendentes = 0
+
+        if somente_leitura:
+            caminho_uri = "file:" + os.path.abspath(caminho).replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+            self.conexao = sqlite3.connect(caminho_uri, uri=True, timeout=30)
+            return
+
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        self.conexao = sqlite3.connect(caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                hash_conteudo TEXT NOT NULL,
+                assinatura TEXT NOT NULL,
+                achados TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                acessado_em REAL NOT NULL,
+                PRIMARY KEY (hash_conteudo, assinatura)
+            )
+        """)
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON resultados (acessado_em)")
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS dependencias (
+                hash_conteudo TEXT NOT NULL,
+                assinatura TEXT NOT NULL,
+                arquivo TEXT NOT NULL,
+                dependencias TEXT NOT NULL,
+                PRIMARY KEY (hash_conteudo, assinatura)
+            )
+        """)
+        self.conexao.commit()
+
+    @staticmethod
+    def assinatura_regras(hash_regras: str, opcoes_detector: dict) -> str:
+        """
+        Combina o hash das regras carregadas com as opções do detector e a
+        versão do cache em uma assinatura única.
+        """
+        opcoes = {nome: valor for nome, valor in opcoes_detector.items() if nome not in OPCOES_FORA_DA_ASSINATURA}
+        dados = json.dumps({"versao": VERSAO_CACHE, "regras": hash_regras, "opcoes": opcoes}, sort_keys=True)
+        return hashlib.sha256(dados.encode('utf-8')).hexdigest()
+
+    def obter(self, hash_conteudo: str, assinatura: str, caminho: str = None) -> list[tuple] | None:
+        """
+        Retorna os achados armazenados para o conteúdo e as regras informados,
+        ou None se não houver entrada correspondente ou se alguma dependência
+        registrada tiver mudado.
+        """
+        linha = self.conexao.execute(
+            "SELECT r.achados, d.arquivo, d.dependencias FROM resultados r LEFT JOIN dependencias d "
+            "ON d.hash_conteudo = r.hash_conteudo AND d.assinatura = r.assinatura "
+            "WHERE r.hash_conteudo = ? AND r.assinatura = ?",
+            (hash_conteudo, assinatura)
+        ).fetchone()
+        if linha is None or (linha[1] is not None and not self._dependencias_validas(caminho, linha[1], linha[2])):
+            self.falhas += 1
+            return None
+
+        self.acertos += 1
+        if not self.somente_leitura:
+            self.registrar_acesso(hash_conteudo, assinatura)
+        return [tuple(achado) for achado in json.loads(linha[0])]
+
+    def obter_dependencias(self, hash_conteudo: str, assinatura: str) -> dict:
+        """Arquivos (e seus hashes) dos quais dependem os achados armazenados para o conteúdo."""
+        linha = self.conexao.execute(
+            "SELECT dependencias FROM dependencias WHERE hash_conteudo = ? AND assinatura = ?",
+            (hash_conteudo, assinatura)
+        ).fetchone()
+        return json.loads(linha[0]) if linha is not None else {}
+
+    @staticmethod
+    def _dependencias_validas(caminho: str | None, arquivo: str, dependencias: str) -> bool:
+        if caminho is None or os.path.abspath(caminho) != arquivo:
+            return False
+        return all(calcular_hash_arquivo(dependencia) == hash_dependencia
+                   for dependencia, hash_dependencia in json.loads(dependencias).items())
+
+    def registrar_acesso(self, hash_conteudo: str, assinatura: str):
+        """Atualiza o horário de acesso de uma entrada, usado na remoção por idade e tamanho."""
+        self.conexao.execute(
+            "UPDATE resultados SET acessado_em = ? WHERE hash_conteudo = ? AND assinatura = ?",
+            (time.time(), hash_conteudo, assinatura)
+        )
+        self._registrar_gravacao()
+
+    def armazenar(self, hash_conteudo: str, assinatura: str, achados: list[tuple], caminho: str = None,
+                  dependencias: dict = None):
+        """
+        Armazena os achados de um conteúdo analisado com as regras informadas.
+        'dependencias' mapeia os arquivos dos quais os achados dependem para o
+        hash de seus conteúdos; nesse caso o caminho analisado é obrigatório.
+        """
+        serializado = json.dumps(achados, ensure_ascii=False)
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO resultados (hash_conteudo, assinatura, achados, tamanho, acessado_em) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (hash_conteudo, assinatura, serializado, len(serializado), time.time())
+        )
+        self.conexao.execute("DELETE FROM dependencias WHERE hash_conteudo = ? AND assinatura = ?",
+                             (hash_conteudo, assinatura))
+        if dependencias:
+            self.conexao.execute(
+                "INSERT INTO dependencias (hash_conteudo, assinatura, arquivo, dependencias) VALUES (?, ?, ?, ?)",
+                (hash_conteudo, assinatura, os.path.abspath(caminho), json.dumps(dependencias, ensure_ascii=False))
+            )
+        self._registrar_gravacao()
+
+    def _registrar_gravacao(self):
+        self._gravacoes_pendentes += 1
+        if self._gravacoes_pendentes >= TAMANHO_LOTE_GRAVACAO:
+            self.conexao.commit()
+            self._gravacoes_pendentes = 0
+
+    def remover_expirados(self):
+        """
+        Remove entradas não acessadas há mais tempo que a idade máxima e,
+        se o tamanho total ainda exceder o limite, as menos acessadas
+        recentemente até que ele seja respeitado.
+        """
+        self.conexao.execute("DELETE FROM resultados WHERE acessado_em < ?", (time.time() - self.idade_maxima,))
+
+        tamanho_total = self.conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM resultados").fetchone()[0]
+        if tamanho_total > self.tamanho_maximo:
+            excedente = tamanho_total - self.tamanho_maximo
+            removidas = []
+            for hash_conteudo, assinatura, tamanho in self.conexao.execute(
+                    "SELECT hash_conteudo, assinatura, tamanho FROM resultados ORDER BY acessado_em"):
+                if excedente <= 0:
+                    break
+                removidas.append((hash_conteudo, assinatura))
+                excedente -= tamanho
+            self.conexao.executemany(
+                "DELETE FROM resultados WHERE hash_conteudo = ? AND assinatura = ?", removidas
+            )
+        self.conexao.execute(
+            "DELETE FROM dependencias WHERE NOT EXISTS (SELECT 1 FROM resultados r WHERE "
+            "r.hash_conteudo = dependencias.hash_conteudo AND r.assinatura = dependencias.assinatura)"
+        )
+        self.conexao.commit()
+
+    def fechar(self):
+        """Aplica a política de remoção, grava as alterações pendentes e fecha o banco."""
+        if self.somente_leitura:
+            self.conexao.close()
+            return
+        try:
+            self.remover_expirados()
+        except sqlite3.Error as e:
+            print(f"Aviso: Não foi possível limpar o cache de análise '{self.caminho}': {e}", file=sys.stderr)
+        self.conexao.commit()
+        self.conexao.close()
@@ -0,0 +1,334 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from analyzers.detector import limitar_ocorrencias
+from analyzers.discovery import descobrir_arquivos_php
+from analyzers.large_files import ArquivoIgnorado, LeitorArquivos
+
+# Este módulo usa apenas a biblioteca padrão (e a descoberta de arquivos), para
+# que o cliente, que também o importa, inicie em poucos milissegundos. O
+# registro de regras é criado por quem inicia o servidor.
+
+# Protocolo: uma requisição JSON por conexão, em uma única linha, respondida
+# com uma linha JSON. Comandos:
+#   {"comando": "analisar", "arquivos": [caminhos], "buffers": [{"caminho": ..., "conteudo": ...}]}
+#   {"comando": "estado"}
+#   {"comando": "encerrar"}
+# As respostas têm "ok"; em caso de falha, "erro" traz a mensagem.
+ANALISAR = "analisar"
+ESTADO = "estado"
+ENCERRAR = "encerrar"
+
+# Tamanho máximo de uma requisição, em bytes (buffers de editor incluídos).
+TAMANHO_MAXIMO_REQUISICAO = 64 * 1024 * 1024
+
+# Tempo máximo de espera pela requisição de um cliente, em segundos; as
+# conexões são atendidas uma de cada vez.
+TEMPO_LIMITE_CONEXAO = 30.0
+
+PORTA_PADRAO = 8765
+NOME_SOCKET = "analysisseccode.sock"
+
+
+def _diretorio_socket_padrao() -> str:
+    """
+    $XDG_RUNTIME_DIR, privado do usuário, ou, sem ele, o diretório
+    'analysisseccode-<uid>' no diretório temporário, criado pelo servidor com
+    modo 0700 (veja _preparar_diretorio_privado).
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return runtime
+    return os.path.join(tempfile.gettempdir(), f"analysisseccode-{os.getuid()}")
+
+
+def endereco_padrao() -> str:
+    """
+    Socket Unix em um diretório acessível apenas pelo usuário (veja
+    _diretorio_socket_padrao); em sistemas sem AF_UNIX, a porta PORTA_PADRAO
+    de 127.0.0.1.
+    """
+    if hasattr(socket, "AF_UNIX") and hasattr(os, "getuid"):
+        return os.path.join(_diretorio_socket_padrao(), NOME_SOCKET)
+    return f"127.0.0.1:{PORTA_PADRAO}"
+
+
+def _endereco_tcp(endereco: str) -> tuple | None:
+    """Retorna (host, porta) se o endereço estiver no formato 'host:porta', ou None para um socket Unix."""
+    host, separador, porta = endereco.rpartition(":")
+    if separador and porta.isdigit() and os.sep not in host and "/" not in host:
+        return host or "127.0.0.1", int(porta)
+    return None
+
+
+class ErroDaemon(Exception):
+    """Falha na comunicação com o servidor de análise."""
+
+
+def _verificar_dono(caminho: str):
+    """
+    Lança ErroDaemon se o socket existir e pertencer a outro usuário, que
+    poderia tê-lo criado antes do servidor para receber os arquivos e buffers
+    enviados pelo cliente.
+    """
+    if not hasattr(os, "getuid"):
+        return
+    try:
+        dono = os.stat(caminho).st_uid
+    except OSError:
+        return
+    if dono != os.getuid():
+        raise ErroDaemon(f"o socket '{caminho}' pertence a outro usuário (uid {dono})")
+
+
+def _preparar_diretorio_privado(diretorio: str):
+    """
+    Cria o diretório do socket padrão com modo 0700 ou, se ele já existir,
+    confere que é um diretório do usuário inacessível aos demais. Lança
+    ErroDaemon caso contrário.
+    """
+    try:
+        os.mkdir(diretorio, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        raise ErroDaemon(f"não foi possível criar o diretório '{diretorio}': {e}")
+    estado = os.lstat(diretorio)
+    if not stat.S_ISDIR(estado.st_mode) or estado.st_uid != os.getuid() or estado.st_mode & 0o077:
+        raise ErroDaemon(f"'{diretorio}' deve ser um diretório do usuário atual, inacessível aos demais "
+                         "(modo 0700); remova-o ou use --daemon ENDERECO")
+
+
+def enviar_requisicao(endereco: str, requisicao: dict, tempo_limite: float = None) -> dict:
+    """Envia uma requisição ao servidor e retorna a resposta. Lança ErroDaemon se não houver servidor."""
+    tcp = _endereco_tcp(endereco)
+    try:
+        if tcp is None:
+            _verificar_dono(endereco)
+            conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conexao.settimeout(tempo_limite)
+            conexao.connect(endereco)
+        else:
+            conexao = socket.create_connection(tcp, timeout=tempo_limite)
+    except OSError as e:
+        raise ErroDaemon(f"não foi possível conectar ao servidor de análise em '{endereco}': {e}")
+
+    with conexao, conexao.makefile('rb') as leitura:
+        try:
+            conexao.sendall(json.dumps(requisicao, ensure_ascii=False).encode('utf-8') + b"\n")
+            linha = leitura.readline()
+        except OSError as e:
+            raise ErroDaemon(f"falha na comunicação com o servidor de análise: {e}")
+    if not linha:
+        raise ErroDaemon("o servidor de análise encerrou a conexão sem responder")
+    return json.loads(linha)
+
+
+class _TratadorRequisicao(socketserver.StreamRequestHandler):
+    timeout = TEMPO_LIMITE_CONEXAO
+
+    def handle(self):
+        try:
+            linha = self.rfile.readline(TAMANHO_MAXIMO_REQUISICAO + 1)
+        except OSError:
+            return
+        if not linha:
+            return
+        if len(linha) > TAMANHO_MAXIMO_REQUISICAO:
+            resposta = {"ok": False, "erro": f"requisição maior que {TAMANHO_MAXIMO_REQUISICAO} bytes"}
+        else:
+            try:
+                resposta = self.server.servidor_analise.atender(json.loads(linha))
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                resposta = {"ok": False, "erro": f"requisição inválida: {e}"}
+        try:
+            self.wfile.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b"\n")
+        except OSError:
+            pass
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _ServidorUnix(socketserver.UnixStreamServer):
+        pass
+
+
+class _ServidorTCP(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+class ServidorAnalise:
+    """
+    Servidor de longa duração que mantém as regras compiladas em memória e
+    analisa, a cada requisição, arquivos do disco ou conteúdos enviados pelo
+    cliente (por exemplo, buffers ainda não salvos de um editor).
+
+    'criar_registro' é chamado na inicialização e sempre que algum pacote de
+    regras em 'caminho_regras' (arquivo ou diretório de pacotes) muda, é
+    adicionado ou removido, e deve retornar um RegistroRegras.
+    As requisições são atendidas em sequência, na thread principal, o que
+    mantém disponível o tempo limite por regra baseado em SIGALRM; os
+    resumos de fluxo de dados dos arquivos ficam em memória entre elas.
+    Com uma baseline, os achados já conhecidos não são relatados, e o
+    'limite_ocorrencias_regra' é aplicado aos demais (sem ela, o limite fica
+    a cargo dos detectores criados por 'criar_registro'). Os arquivos
+    são lidos pelo 'leitor' (LeitorArquivos), que aplica o tamanho máximo e
+    a política para arquivos grandes.
+    """
+    def __init__(self, criar_registro, caminho_regras: str, endereco: str = None, opcoes_descoberta: dict = None,
+                 baseline=None, leitor: LeitorArquivos = None, limite_ocorrencias_regra: int = None):
+        self.criar_registro = criar_registro
+        self.caminho_regras = caminho_regras
+        self.endereco = endereco or endereco_padrao()
+        self.opcoes_descoberta = opcoes_descoberta or {}
+        self.baseline = baseline
+        self.limite_ocorrencias_regra = limite_ocorrencias_regra or None
+        self.leitor = leitor or LeitorArquivos()
+        self.registro = criar_registro()
+        self._versao_regras = self._versao_arquivo_regras()
+        self.requisicoes = 0
+        self.arquivos_analisados = 0
+        self.iniciado_em = datetime.now().isoformat(timespec="seconds")
+        self._encerrar = False
+        self._servidor = None
+
+    def _versao_arquivo_regras(self):
+        caminhos = [self.caminho_regras]
+        if os.path.isdir(self.caminho_regras):
+            caminhos = sorted(os.path.join(self.caminho_regras, nome) for nome in os.listdir(self.caminho_regras)
+                              if nome.lower().endswith(".json"))
+        versao = []
+        for caminho in caminhos:
+            try:
+                estado = os.stat(caminho)
+            except OSError:
+                continue
+            versao.append((caminho, estado.st_mtime_ns, estado.st_size))
+        return versao
+
+    def _recarregar_regras_se_alteradas(self):
+        versao = self._versao_arquivo_regras()
+        if versao == self._versao_regras:
+            return
+        try:
+            self.registro = self.criar_registro()
+        except (Exception, SystemExit) as e:
+            # Configuracao encerra o processo em erros de leitura; o servidor mantém as regras anteriores.
+            print(f"Aviso: Não foi possível recarregar as regras de '{self.caminho_regras}': {e}. "
+                  "Mantendo as regras anteriores.", file=sys.stderr)
+        else:
+            print(f"Regras recarregadas de '{self.caminho_regras}'.")
+        self._versao_regras = versao
+
+    def atender(self, requisicao: dict) -> dict:
+        """Executa uma requisição já decodificada e retorna a resposta."""
+        self.requisicoes += 1
+        comando = requisicao.get("comando", ANALISAR)
+        if comando == ESTADO:
+            return {"ok": True, "pid": os.getpid(), "endereco": self.endereco, "iniciado_em": self.iniciado_em,
+                    "requisicoes": self.requisicoes, "arquivos_analisados": self.arquivos_analisados,
+                    "regras": self.registro.total_regras, "extensoes": list(self.registro.extensoes)}
+        if comando == ENCERRAR:
+            self._encerrar = True
+            return {"ok": True}
+        if comando != ANALISAR:
+            return {"ok": False, "erro": f"comando desconhecido: {comando}"}
+
+        self._recarregar_regras_se_alteradas()
+        inicio = time.perf_counter()
+        achados = []
+        erros = []
+        analisados = 0
+        if self.baseline is not None:
+            self.baseline.iniciar()
+
+        entradas = [(buffer["caminho"], buffer["conteudo"]) for buffer in requisicao.get("buffers", [])]
+        for caminho in requisicao.get("arquivos", []):
+            if not os.path.exists(caminho):
+                erros.append(f"Arquivo '{caminho}' não encontrado.")
+                continue
+            entradas.extend((file_path, None) for file_path in descobrir_arquivos_php(
+                caminho, **{"extensoes": self.registro.extensoes, **self.opcoes_descoberta}))
+
+        for file_path, php_code in entradas:
+            detector = self.registro.detector_para(file_path)
+            if detector is None:
+                # Sem pacote de regras para a extensão (ex.: buffer de outra linguagem): nada a relatar.
+                continue
+            partes = None
+            if php_code is None:
+                try:
+                    php_code, partes = self.leitor.ler(file_path)
+                except ArquivoIgnorado as e:
+                    erros.append(f"Arquivo '{file_path}' ignorado: {e}.")
+                    continue
+                except Exception as e:
+                    erros.append(f"Erro ao ler o arquivo '{file_path}': {e}")
+                    continue
+            try:
+                if partes is not None:
+                    achados_arquivo = detector.detectar_achados_partes(partes, file_path)
+                else:
+                    achados_arquivo = detector.detectar_achados(php_code, file_path)
+            except Exception as e:
+                erros.append(f"Erro ao analisar o arquivo '{file_path}': {e}")
+                continue
+            finally:
+                detector.retirar_dependencias()
+            if self.baseline is not None:
+                achados_arquivo = self.baseline.filtrar(file_path, achados_arquivo)
+                if achados_arquivo and self.limite_ocorrencias_regra:
+                    achados_arquivo = limitar_ocorrencias(achados_arquivo, self.limite_ocorrencias_regra)
+            achados.extend(vul.to_dict() for vul in detector.criar_vulnerabilidades(achados_arquivo, file_path))
+            analisados += 1
+        diagnosticos = [{"arquivo": file_path, "regra": vul_name, "mensagem": mensagem}
+                        for file_path, vul_name, mensagem in self.registro.retirar_diagnosticos()]
+
+        self.arquivos_analisados += analisados
+        return {"ok": True, "achados": achados, "diagnosticos": diagnosticos, "erros": erros,
+                "arquivos_analisados": analisados,
+                "suprimidos_baseline": self.baseline.suprimidos if self.baseline is not None else 0, "segundos": round(time.perf_counter() - inicio, 6)}
+
+    def _criar_servidor(self):
+        tcp = _endereco_tcp(self.endereco)
+        if tcp is not None:
+            # Apenas conexões locais: o servidor lê qualquer arquivo que o usuário que o iniciou pode ler.
+            if tcp[0] not in ("127.0.0.1", "localhost", "::1"):
+                raise ErroDaemon(f"o servidor só aceita endereços locais, não '{tcp[0]}'")
+            return _ServidorTCP(tcp, _TratadorRequisicao)
+
+        if self.endereco == endereco_padrao():
+            _preparar_diretorio_privado(os.path.dirname(self.endereco))
+        if os.path.exists(self.endereco):
+            _verificar_dono(self.endereco)
+            try:
+                enviar_requisicao(self.endereco, {"comando": ESTADO}, tempo_limite=2)
+            except ErroDaemon:
+                os.unlink(self.endereco)  # Socket deixado por um servidor que não foi encerrado corretamente.
+            else:
+                raise ErroDaemon(f"já existe um servidor de análise em '{self.endereco}'")
+        servidor = _ServidorUnix(self.endereco, _TratadorRequisicao)
+        os.chmod(self.endereco, 0o600)
+        return servidor
+
+    def executar(self):
+        """Atende requisições até receber o comando de encerramento ou uma interrupção (Ctrl+C)."""
+        self._servidor = self._criar_servidor()
+        self._servidor.servidor_analise = self
+        print(f"Servidor de análise aguardando requisições em: {self.endereco} (PID {os.getpid()})")
+        try:
+            while not self._encerrar:
+                self._servidor.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._servidor.server_close()
+            if _endereco_tcp(self.endereco) is None and os.path.exists(self.endereco):
+                os.unlink(self.endereco)
+            print("Servidor de análise encerrado.")
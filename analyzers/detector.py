@@ -1,15 +1,476 @@
 import re
 import sys
-from config import Configuracao
-from analyzers.vulnerability import Vulnerabilidade
+import time
+from bisect import bisect_right
+from itertools import accumulate
+from operator import sub
+from config import LINGUAGEM_PHP, Configuracao
+from analyzers.vulnerability import Vulnerabilidade, severidade_atinge
+from analyzers.profiling import EXPRESSAO_COMBINADA, FLUXO_DE_DADOS, GanchoPerfil, LEXICO, PREFILTRO
+from analyzers.lexer import IDENTIFICADOR, OPERADOR, TokensPHP, remover_comentarios, tokenizar
+from analyzers.taint import FONTES_PADRAO, MotorTaint, RegraTaint
+from analyzers.rule_lint import LimitadorTempo, TempoEsgotadoRegra
+
+from re import _parser as sre_parse
+
+# Construções que impedem um padrão de ser mesclado na alternação única:
+# referências numéricas (a numeração dos grupos muda ao combinar), flags
+# globais inline, que em uma alternação afetariam todas as regras, e grupos
+# nomeados, cujos nomes poderiam se repetir entre as regras.
+_REFERENCIA_NUMERICA = re.compile(r'\\[1-9]')
+_FLAGS_GLOBAIS = re.compile(r'^\(\?[aiLmsux]+\)')
+_GRUPO_NOMEADO = re.compile(r'\(\?P[<=]')
+
+# Limite de combinações ao expandir classes e alternações em literais.
+_MAX_COMBINACOES_LITERAIS = 64
+
+# Caracteres ASCII, como máscara de bits (o bit n é o caractere de código n),
+# de todos e de cada categoria de classe, para _caracteres_consumidos.
+_TODOS_ASCII = (1 << 128) - 1
+_CATEGORIAS_ASCII = {
+    categoria: sum(1 << codigo for codigo in range(128) if re.match(classe, chr(codigo)))
+    for categoria, classe in ((sre_parse.CATEGORY_DIGIT, r'\d'), (sre_parse.CATEGORY_NOT_DIGIT, r'\D'),
+                              (sre_parse.CATEGORY_SPACE, r'\s'), (sre_parse.CATEGORY_NOT_SPACE, r'\S'),
+                              (sre_parse.CATEGORY_WORD, r'\w'), (sre_parse.CATEGORY_NOT_WORD, r'\W'))
+}
+
+# Quebras de linha reconhecidas por str.splitlines().
+_QUEBRA_DE_LINHA = re.compile(r'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+# Linhas mais longas que isso (arquivos minificados ou gerados) são avaliadas
+# pelas regras em janelas de TAMANHO_JANELA caracteres que se sobrepõem em
+# SOBREPOSICAO_JANELA, o que limita o custo de padrões como '.*' ao tamanho da
+# janela; ocorrências mais longas que a sobreposição podem sair truncadas.
+TAMANHO_JANELA = 4096
+SOBREPOSICAO_JANELA = 512
+
+# O trecho de código de um achado é a linha inteira, sem espaços nas pontas,
+# até LIMITE_TRECHO caracteres; em linhas mais longas, é uma janela de até
+# LIMITE_TRECHO caracteres que começa CONTEXTO_TRECHO caracteres antes da ocorrência.
+LIMITE_TRECHO = 300
+CONTEXTO_TRECHO = 120
+
+# Com tempo_limite_regra, o temporizador é armado uma vez por arquivo e
+# dispara a cada fração do limite, somando-a ao tempo da regra em andamento
+# (ou verificando o prazo dela, com perfil); uma regra pode excedê-lo em até
+# tempo_limite_regra / DIVISOES_TEMPO_LIMITE.
+DIVISOES_TEMPO_LIMITE = 10
+
+# Tipos de regra avaliados sobre os tokens (campo 'token' da configuração):
+# chamadas de função, qualquer uso de um identificador ou uso de uma variável.
+REGRA_CHAMADA = "chamada"
+REGRA_IDENTIFICADOR = "identificador"
+REGRA_VARIAVEL = "variavel"
+TIPOS_REGRA_TOKEN = (REGRA_CHAMADA, REGRA_IDENTIFICADOR, REGRA_VARIAVEL)
+
+# Tokens que, antes de um nome seguido de '(', indicam método, declaração ou
+# instanciação em vez de chamada de função.
+_ANTES_DE_NAO_CHAMADA = {(OPERADOR, "->"), (OPERADOR, "?->"), (OPERADOR, "::")}
+_PALAVRAS_NAO_CHAMADA = {"function", "fn", "new"}
+
+# Supressão em linha: um comentário '// analysis-ignore' (ou
+# '// analysis-ignore: Regra A, Regra B', limitado às regras citadas) ignora os
+# achados da própria linha ou, se o comentário estiver sozinho na linha, os da
+# linha seguinte.
+MARCADOR_SUPRESSAO = "analysis-ignore"
+_SUPRESSAO = re.compile(re.escape(MARCADOR_SUPRESSAO) + r'(?:[ \t]*:[ \t]*((?:(?!\*/)[^\r\n])*))?')
+
+
+def _literais_exatos(items) -> set | None:
+    """
+    Retorna o conjunto finito de textos que a sequência casa por inteiro,
+    ou None se ela contiver algo além de literais, classes de literais,
+    grupos e alternações.
+    """
+    textos = {""}
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            opcoes = {chr(av)}
+        elif op == sre_parse.IN and all(sub_op == sre_parse.LITERAL for sub_op, _ in av):
+            opcoes = {chr(sub_av) for _, sub_av in av}
+        elif op == sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            opcoes = _literais_exatos(av[3])
+        elif op == sre_parse.BRANCH:
+            opcoes = set()
+            for alternativa in av[1]:
+                sub = _literais_exatos(alternativa)
+                if sub is None:
+                    return None
+                opcoes |= sub
+        else:
+            return None
+        if opcoes is None or len(textos) * len(opcoes) > _MAX_COMBINACOES_LITERAIS:
+            return None
+        textos = {t + o for t in textos for o in opcoes}
+    return textos
+
+
+def _literais_obrigatorios(items) -> set | None:
+    """
+    Retorna um conjunto de literais dos quais ao menos um aparece em todo
+    texto casado pela sequência, escolhendo o conjunto cujo menor literal é
+    o mais longo. Retorna None se nenhum literal obrigatório for encontrado.
+    """
+    candidatos = []
+    sequencia = {""}
+
+    def encerrar_sequencia():
+        if all(sequencia):
+            candidatos.append(sequencia)
+
+    for op, av in items:
+        exatos = _literais_exatos([(op, av)])
+        if exatos is not None and len(sequencia) * len(exatos) <= _MAX_COMBINACOES_LITERAIS:
+            sequencia = {t + e for t in sequencia for e in exatos}
+            continue
+
+        encerrar_sequencia()
+        sequencia = {""}
+
+        interno = None
+        if op == sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            interno = _literais_obrigatorios(av[3])
+        elif op == sre_parse.ATOMIC_GROUP:
+            interno = _literais_obrigatorios(av)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            interno = _literais_obrigatorios(av[2])
+        elif op == sre_parse.BRANCH:
+            interno = set()
+            for alternativa in av[1]:
+                sub = _literais_obrigatorios(alternativa)
+                if sub is None:
+                    interno = None
+                    break
+                interno |= sub
+        if interno:
+            candidatos.append(interno)
+    encerrar_sequencia()
+
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda c: (min(len(t) for t in c), -len(c)))
+
+
+def _extrair_palavras_chave(compiled_pattern: re.Pattern) -> set | None:
+    """
+    Extrai do padrão os literais obrigatórios usados no pré-filtro.
+    Retorna None quando não é possível garantir nenhum literal.
+    """
+    try:
+        parsed = sre_parse.parse(compiled_pattern.pattern, compiled_pattern.flags)
+    except Exception:
+        return None
+    if parsed.state.flags & re.VERBOSE:
+        return None
+    return _literais_obrigatorios(list(parsed))
+
+
+def _caractere_consumido(codigo: int, ignorecase: bool) -> tuple:
+    if codigo >= 128:
+        return 0, True
+    mascara = 1 << codigo
+    caractere = chr(codigo)
+    if ignorecase and caractere.isalpha():
+        # Letras ASCII também casam, sem distinção de maiúsculas, com
+        # caracteres não ASCII (como 'K' e o símbolo de Kelvin).
+        return mascara | 1 << ord(caractere.swapcase()), True
+    return mascara, False
+
+
+def _classe_consumida(itens, ignorecase: bool) -> tuple:
+    mascara, outros = 0, False
+    negada = False
+    for op, av in itens:
+        if op == sre_parse.NEGATE:
+            negada = True
+            continue
+        if op == sre_parse.LITERAL:
+            item_mascara, item_outros = _caractere_consumido(av, ignorecase)
+        elif op == sre_parse.RANGE:
+            item_mascara, item_outros = 0, av[1] >= 128
+            for codigo in range(av[0], min(av[1], 127) + 1):
+                caractere_mascara, caractere_outros = _caractere_consumido(codigo, ignorecase)
+                item_mascara |= caractere_mascara
+                item_outros = item_outros or caractere_outros
+        elif op == sre_parse.CATEGORY and av in _CATEGORIAS_ASCII:
+            item_mascara, item_outros = _CATEGORIAS_ASCII[av], True
+        else:
+            # Sem a lista exata de itens, a classe negada não pode ser calculada.
+            return _TODOS_ASCII, True
+        mascara |= item_mascara
+        outros = outros or item_outros
+    if negada:
+        return _TODOS_ASCII & ~mascara, True
+    return mascara, outros
+
+
+def _caracteres_consumidos(items, ignorecase: bool = False) -> tuple:
+    """
+    Retorna (máscara, outros): os caracteres ASCII que podem aparecer em um
+    texto casado pela sequência, como máscara de bits, e se caracteres não
+    ASCII também podem. Âncoras e asserções (lookarounds) não consomem
+    caracteres; construções não reconhecidas valem como qualquer caractere.
+    """
+    mascara, outros = 0, False
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            item_mascara, item_outros = _caractere_consumido(av, ignorecase)
+        elif op == sre_parse.IN:
+            item_mascara, item_outros = _classe_consumida(av, ignorecase)
+        elif op == sre_parse.SUBPATTERN:
+            item_mascara, item_outros = _caracteres_consumidos(
+                av[3], (ignorecase or bool(av[1] & re.IGNORECASE)) and not av[2] & re.IGNORECASE)
+        elif op == sre_parse.BRANCH:
+            item_mascara, item_outros = 0, False
+            for alternativa in av[1]:
+                alternativa_mascara, alternativa_outros = _caracteres_consumidos(alternativa, ignorecase)
+                item_mascara |= alternativa_mascara
+                item_outros = item_outros or alternativa_outros
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT):
+            item_mascara, item_outros = _caracteres_consumidos(av[2], ignorecase)
+        elif op == sre_parse.ATOMIC_GROUP:
+            item_mascara, item_outros = _caracteres_consumidos(av, ignorecase)
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue
+        else:
+            item_mascara, item_outros = _TODOS_ASCII, True
+        mascara |= item_mascara
+        outros = outros or item_outros
+    return mascara, outros
+
+
+def _regras_sobrepostas(compiled_patterns: list) -> set:
+    """
+    Retorna os índices dos padrões cujas ocorrências podem se sobrepor às de
+    outro padrão da lista, isto é, que podem consumir algum caractere em
+    comum. Em uma alternação, a ocorrência de um deles pode esconder a do
+    outro; os demais nunca disputam uma mesma posição.
+    """
+    consumidos = []
+    for compiled_pattern in compiled_patterns:
+        try:
+            parsed = sre_parse.parse(compiled_pattern.pattern, compiled_pattern.flags)
+            consumidos.append(_caracteres_consumidos(list(parsed), bool(parsed.state.flags & re.IGNORECASE)))
+        except Exception:
+            consumidos.append((_TODOS_ASCII, True))
+    sobrepostas = set()
+    for i, (mascara, outros) in enumerate(consumidos):
+        for j in range(i + 1, len(consumidos)):
+            if mascara & consumidos[j][0] or (outros and consumidos[j][1]):
+                sobrepostas.update((i, j))
+    return sobrepostas
+
+
+def _fim_da_linha(texto: str, inicios: list[int], indice_linha: int) -> int:
+    """Deslocamento do fim da linha indicada, antes da quebra de linha."""
+    if indice_linha + 1 == len(inicios):
+        return len(texto)
+    fim = inicios[indice_linha + 1]
+    return fim - 2 if texto[fim - 2:fim] == "\r\n" else fim - 1
+
+
+def _recortar_linha(texto: str, inicios: list[int], indice_linha: int) -> str:
+    """Recorta do texto a linha indicada, sem a quebra de linha final."""
+    return texto[inicios[indice_linha]:_fim_da_linha(texto, inicios, indice_linha)]
+
+
+def _recortar_trecho(texto: str, inicios: list[int], indice_linha: int, coluna: int = None,
+                     coluna_fim: int = None) -> str:
+    """
+    Trecho de código de um achado na linha indicada. Linhas longas não são
+    copiadas: o trecho é a janela ao redor das colunas da ocorrência (ou o
+    início da linha, sem coluna), marcada com '...' onde foi cortada.
+    """
+    inicio = inicios[indice_linha]
+    fim = _fim_da_linha(texto, inicios, indice_linha)
+    if fim - inicio <= LIMITE_TRECHO:
+        return texto[inicio:fim].strip()
+    coluna = coluna or 0
+    de = max(inicio, inicio + coluna - CONTEXTO_TRECHO)
+    ate = min(fim, inicio + max(coluna, coluna_fim or 0) + CONTEXTO_TRECHO, de + LIMITE_TRECHO)
+    return ("..." if de > inicio else "") + texto[de:ate].strip() + ("..." if ate < fim else "")
+
+
+def _ocorrencias_em_janelas(compiled_pattern: re.Pattern, texto: str):
+    """
+    Gera as ocorrências do padrão no texto, como finditer(), buscando em
+    janelas sobrepostas de TAMANHO_JANELA caracteres (sem copiar o texto).
+    Cada ocorrência pertence à janela em que começa antes da sobreposição e
+    a busca seguinte continua após o fim da anterior, de modo que nenhuma é
+    gerada duas vezes.
+
+    O fim de cada janela funciona como fim do texto para '$', '\\Z' e '\\b'
+    ('$' também casa antes de uma quebra de linha final); por isso uma
+    ocorrência que termina nele ou no caractere anterior é refeita sobre o
+    texto inteiro, a partir do mesmo início, e descartada se não se confirmar.
+    """
+    passo = TAMANHO_JANELA - SOBREPOSICAO_JANELA
+    fim_anterior = 0
+    for inicio in range(0, len(texto), passo):
+        fim_janela = min(inicio + TAMANHO_JANELA, len(texto))
+        ultima = fim_janela == len(texto)
+        pos = max(inicio, fim_anterior)
+        while pos is not None:
+            busca, pos = pos, None
+            for match in compiled_pattern.finditer(texto, busca, fim_janela):
+                if match.start() >= inicio + passo and not ultima:
+                    break
+                if match.end() >= fim_janela - 1 and not ultima:
+                    confirmado = compiled_pattern.match(texto, match.start())
+                    if confirmado is None:
+                        # Retoma a busca na janela logo após o início descartado.
+                        pos = match.start() + 1
+                        break
+                    match = confirmado
+                fim_anterior = match.end()
+                yield match
+        if ultima:
+            break
+
+
+def _ocorrencias(compiled_pattern: re.Pattern, texto: str):
+    """finditer() do padrão no texto, em janelas se ele for mais longo que TAMANHO_JANELA."""
+    if len(texto) <= TAMANHO_JANELA:
+        return compiled_pattern.finditer(texto)
+    return _ocorrencias_em_janelas(compiled_pattern, texto)
+
+
+def _tem_linha_longa(texto: str, inicios: list[int]) -> bool:
+    """
+    Indica se alguma linha do texto é mais longa que TAMANHO_JANELA. Preenche
+    'inicios' (veja _preencher_inicios) apenas se o texto for mais longo.
+    """
+    if len(texto) <= TAMANHO_JANELA:
+        return False
+    _preencher_inicios(texto, inicios)
+    return len(texto) - inicios[-1] > TAMANHO_JANELA or max(map(sub, inicios[1:], inicios), default=0) > TAMANHO_JANELA
+
+
+def contar_quebras_de_linha(texto: str) -> int:
+    """Conta as quebras de linha do texto, com os mesmos critérios de str.splitlines()."""
+    return len(_QUEBRA_DE_LINHA.findall(texto))
+
+
+def limitar_ocorrencias(achados: list[tuple], limite: int) -> list[tuple]:
+    """Mantém as 'limite' primeiras ocorrências de cada regra dos achados compactos."""
+    contagens = {}
+    mantidos = []
+    for achado in achados:
+        contagem = contagens.get(achado[0], 0)
+        if contagem < limite:
+            contagens[achado[0]] = contagem + 1
+            mantidos.append(achado)
+    return mantidos
+
+
+def _contar_linhas(texto: str) -> int:
+    """Conta as linhas do texto, como len(texto.splitlines()) para quebras '\\n'."""
+    if not texto:
+        return 0
+    return texto.count("\n") + (0 if texto.endswith("\n") else 1)
+
+
+def _expressao_trie(palavras) -> str:
+    """
+    Monta uma expressão regular em forma de trie para as palavras informadas,
+    de modo que cada posição do texto seja testada uma única vez por prefixo.
+    Quantificadores gulosos fazem a palavra mais longa prevalecer.
+    """
+    raiz = {}
+    for palavra in palavras:
+        no = raiz
+        for caractere in palavra:
+            no = no.setdefault(caractere, {})
+        no[""] = {}
+
+    def montar(no: dict) -> str:
+        ramos = [re.escape(caractere) + montar(filho) for caractere, filho in sorted(no.items()) if caractere]
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        return f"(?:{corpo})?" if "" in no else corpo
+
+    return montar(raiz)
+
+
+def _inicios_de_linha(texto: str) -> list[int]:
+    """Retorna o deslocamento inicial de cada linha, coerente com str.splitlines()."""
+    inicios = list(accumulate(map(len, texto.splitlines(True)), initial=0))
+    # O fim do texto só inicia uma linha (vazia) se ele termina com uma quebra de linha.
+    if len(inicios) > 1 and texto[-1].splitlines()[0]:
+        inicios.pop()
+    return inicios
+
+
+def _preencher_inicios(texto: str, inicios: list[int]) -> list[int]:
+    """
+    Preenche 'inicios', se ainda vazia, com os inícios de linha do texto e a
+    retorna. A mesma lista acompanha a análise de um arquivo, de modo que os
+    inícios são calculados no máximo uma vez, e só se forem usados.
+    """
+    if not inicios:
+        inicios.extend(_inicios_de_linha(texto))
+    return inicios
 
 class DetectorVulnerabilidade:
     """
     Detecta vulnerabilidades em código PHP utilizando padrões definidos na configuração.
     """
-    def __init__(self, configuracao: Configuracao):
+    def __init__(self, configuracao: Configuracao, modo_buffer: bool = False, tempo_limite_regra: float = None,
+                 ignorar_comentarios: bool = True, severidade_minima: str = None, limite_ocorrencias_regra: int = None,
+                 fluxo_de_dados: bool = False):
         self.configuracao = configuracao
+        self.modo_buffer = modo_buffer
+        # As regras regex são avaliadas sobre o código com os comentários apagados;
+        # o analisador léxico é de PHP, e os demais pacotes veem o texto original.
+        self.ignorar_comentarios = ignorar_comentarios and configuracao.linguagem == LINGUAGEM_PHP
+        # Tempo máximo, em segundos, que cada regra pode consumir em um arquivo.
+        self.tempo_limite_regra = tempo_limite_regra or None
+        # Regras abaixo da severidade mínima não são compiladas nem avaliadas.
+        self.severidade_minima = severidade_minima
+        self.regras_ativas = [details for details in configuracao.obter_todos_padroes_vulnerabilidades()
+                              if severidade_minima is None
+                              or severidade_atinge(details.get('severity', 'Desconhecida'), severidade_minima)]
+        # Máximo de achados de cada regra em um arquivo; ao atingi-lo, a regra
+        # deixa de ser avaliada no restante do arquivo.
+        self.limite_ocorrencias_regra = limite_ocorrencias_regra or None
+        self.ganchos_perfil = []
+        # (caminho do arquivo, nome da regra, mensagem) das regras interrompidas.
+        self.diagnosticos = []
+        # Limitador usado durante a detecção de cada arquivo; fora dela, inativo.
+        self._limitador = LimitadorTempo(habilitado=False)
+        # Arquivos (caminho -> hash do conteúdo) dos quais dependem os achados
+        # do último arquivo analisado, por meio de include/require.
+        self.dependencias = {}
+        self.token_rules = self._compilar_regras_token()
+        self.taint_rules = self._compilar_regras_taint()
+        # A análise de fluxo de dados custa bem mais que as demais regras e só
+        # é feita quando pedida; sem ela, as regras 'taint' não são avaliadas.
+        self.fluxo_de_dados = fluxo_de_dados
+        self.motor_taint = MotorTaint(self.taint_rules.values()) if self.taint_rules and fluxo_de_dados else None
+        self.token_prefilter = self._construir_prefiltro_tokens()
         self.compiled_patterns = self._compile_patterns()
+        self.rule_keywords = self._extrair_palavras_chave_regras()
+        self.literal_keywords, self.keyword_index, self.keyword_rules = self._construir_indice_palavras_chave()
+        self._rules_by_occurrence = {}
+        # As linhas candidatas no texto original incluem as do texto sem
+        # comentários, exceto se alguma palavra-chave puder casar com os
+        # espaços que substituem os comentários: nesse caso, o pré-filtro é
+        # aplicado ao texto já sem eles.
+        self.prefiltro_sem_comentarios = self.ignorar_comentarios and any(
+            " " in keyword for keywords in self.rule_keywords.values() for keyword in keywords)
+
+        self.unanchored_rules = [name for name in self.compiled_patterns if name not in self.rule_keywords]
+        self.combined_pattern, self._combinada_nomeada, self.isolated_patterns = \
+            self._combinar_padroes(self.unanchored_rules)
+        self.combined_rules = [name for name in self.unanchored_rules if name not in self.isolated_patterns]
+        # A alternativa de cada regra combinada é o grupo 'r<índice em combined_rules>'. As ocorrências
+        # das regras que podem se sobrepor a outra não são atribuídas pelo grupo (None): essas regras
+        # são avaliadas isoladamente nas linhas em que a expressão combinada as encontra.
+        sobrepostas = _regras_sobrepostas([self.compiled_patterns[name] for name in self.combined_rules])
+        self._regra_do_grupo = {f"r{indice}": None if indice in sobrepostas else name
+                                for indice, name in enumerate(self.combined_rules)}
+        self.overlapping_rules = [name for indice, name in enumerate(self.combined_rules) if indice in sobrepostas]
 
     def _compile_patterns(self) -> dict:
         """
@@ -17,47 +478,787 @@ class DetectorVulnerabilidade:
         e as armazena em um dicionário para uso eficiente.
         """
         compiled = {}
-        for details in self.configuracao.obter_todos_padroes_vulnerabilidades():
-            vul_name = details.get('vulnerability', 'Desconhecida') 
+        for details in self.regras_ativas:
+            vul_name = details.get('vulnerability', 'Desconhecida')
             pattern_str = details.get('pattern', '')
+            if vul_name in self.token_rules or vul_name in self.taint_rules:
+                continue
             if pattern_str:
                 try:
-                    compiled[vul_name] = re.compile(pattern_str)
+                    # No modo buffer o texto inteiro é avaliado de uma vez; MULTILINE
+                    # mantém '^' e '$' ancorados em cada linha, como na avaliação linha a linha.
+                    compiled[vul_name] = re.compile(pattern_str, re.MULTILINE if self.modo_buffer else 0)
                 except re.error as e:
                     print(f"Erro ao compilar a expressão regular '{pattern_str}' para '{vul_name}': {e}", file=sys.stderr)
             else:
                 print(f"Aviso: Padrão regex não encontrado para a vulnerabilidade '{vul_name}'.", file=sys.stderr)
         return compiled
 
+    def _compilar_regras_token(self) -> dict:
+        """
+        Lê as regras avaliadas sobre os tokens, que trazem o campo 'token' no
+        lugar de 'pattern', por exemplo {"tipo": "chamada", "nomes": ["assert"]}.
+        Nomes de funções e identificadores são comparados sem distinção de
+        maiúsculas; variáveis, com o '$' e a caixa exatos.
+        Retorna {nome da regra: (tipo, nomes normalizados)}.
+        """
+        token_rules = {}
+        for details in self.regras_ativas:
+            token = details.get('token')
+            if token is None:
+                continue
+            vul_name = details.get('vulnerability', 'Desconhecida')
+            tipo = token.get('tipo') if isinstance(token, dict) else None
+            nomes = token.get('nomes') if isinstance(token, dict) else None
+            if tipo not in TIPOS_REGRA_TOKEN or not isinstance(nomes, list) or not nomes \
+                    or not all(isinstance(nome, str) and nome for nome in nomes):
+                print(f"Aviso: Campo 'token' inválido para a vulnerabilidade '{vul_name}'. "
+                      f"Use {{\"tipo\": {'|'.join(TIPOS_REGRA_TOKEN)}, \"nomes\": [...]}}.", file=sys.stderr)
+                continue
+            if tipo == REGRA_VARIAVEL:
+                nomes = tuple(nome if nome.startswith("$") else "$" + nome for nome in nomes)
+            else:
+                nomes = tuple(nome.lstrip("\\").lower() for nome in nomes)
+            token_rules[vul_name] = (tipo, nomes)
+        return token_rules
+
+    def _compilar_regras_taint(self) -> dict:
+        """
+        Lê as regras de fluxo de dados, que trazem o campo 'taint' no lugar de
+        'pattern', por exemplo {"sinks": ["mysqli_query", "->query"],
+        "sanitizadores": ["intval"]}. 'fontes' é opcional (padrão: FONTES_PADRAO).
+        Retorna {nome da regra: RegraTaint}.
+        """
+        taint_rules = {}
+        for details in self.regras_ativas:
+            taint = details.get('taint')
+            if taint is None:
+                continue
+            vul_name = details.get('vulnerability', 'Desconhecida')
+            campos = {}
+            if isinstance(taint, dict):
+                campos = {campo: taint.get(campo, padrao) for campo, padrao in
+                          (('sinks', None), ('sanitizadores', []), ('fontes', list(FONTES_PADRAO)))}
+            if not campos or not campos['sinks'] or not all(
+                    isinstance(valores, list) and all(isinstance(valor, str) and valor for valor in valores)
+                    for valores in campos.values()):
+                print(f"Aviso: Campo 'taint' inválido para a vulnerabilidade '{vul_name}'. "
+                      "Use {\"sinks\": [...], \"sanitizadores\": [...], \"fontes\": [...]}.", file=sys.stderr)
+                continue
+            taint_rules[vul_name] = RegraTaint(vul_name, campos['sinks'], campos['sanitizadores'], campos['fontes'])
+        return taint_rules
+
+    def _construir_prefiltro_tokens(self) -> re.Pattern | None:
+        """
+        Expressão que encontra qualquer nome das regras de tokens. Arquivos em
+        que nenhum deles aparece não precisam ser tokenizados.
+        """
+        nomes = {nome for _, nomes_regra in self.token_rules.values() for nome in nomes_regra}
+        if not nomes:
+            return None
+        return re.compile(_expressao_trie(sorted(nomes)), re.IGNORECASE)
+
+    def _extrair_palavras_chave_regras(self) -> dict:
+        """
+        Determina as palavras-chave de cada regra: o campo 'keywords' da
+        configuração, quando presente, ou os literais obrigatórios extraídos do
+        próprio padrão. Regras sem palavras-chave ficam de fora do dicionário
+        e são avaliadas em todas as linhas.
+        """
+        rule_keywords = {}
+        # Literais já extraídos em execuções anteriores, guardados no cache de regras da configuração.
+        extraidas = self.configuracao.palavras_chave_padroes
+        novas = False
+        for vul_name, compiled_pattern in self.compiled_patterns.items():
+            keywords = self.configuracao.obter_padrao_vulnerabilidade(vul_name).get('keywords')
+            if keywords is not None and (not isinstance(keywords, list) or not all(isinstance(k, str) and k for k in keywords)):
+                print(f"Aviso: Campo 'keywords' inválido para a vulnerabilidade '{vul_name}'. Extraindo literais do padrão.", file=sys.stderr)
+                keywords = None
+            if not keywords:
+                chave = (compiled_pattern.pattern, compiled_pattern.flags)
+                if chave not in extraidas:
+                    extraidos = _extrair_palavras_chave(compiled_pattern)
+                    extraidas[chave] = tuple(sorted(extraidos)) if extraidos else None
+                    novas = True
+                keywords = extraidas[chave]
+            if keywords:
+                rule_keywords[vul_name] = set(keywords)
+        if novas:
+            self.configuracao.salvar_cache_regras()
+        return rule_keywords
+
+    def _construir_indice_palavras_chave(self) -> tuple:
+        """
+        Organiza as palavras-chave para a busca no texto. As de regras com
+        distinção de maiúsculas são procuradas uma a uma com str.find; as
+        demais ficam em uma expressão em forma de trie com IGNORECASE, que
+        encontra, em cada posição do texto, a palavra-chave mais longa que
+        começa ali (str.lower não reproduz a comparação de IGNORECASE).
+        Retorna a lista (palavra-chave, regras, contidas) das literais, o
+        índice das demais (ou None) e o mapa de cada palavra-chave normalizada
+        para as regras que dependem dela.
+        """
+        keyword_rules = {}
+        for vul_name, keywords in self.rule_keywords.items():
+            ignorecase = bool(self.compiled_patterns[vul_name].flags & re.IGNORECASE)
+            for keyword in keywords:
+                chave = (keyword.lower() if ignorecase else keyword, ignorecase)
+                keyword_rules.setdefault(chave, set()).add(vul_name)
+
+        # Cada palavra-chave literal guarda as outras contidas nela, com o
+        # deslocamento: se uma delas falta no arquivo, esta também falta. A de
+        # uma só linha que contém outra cujas regras já incluem as suas não
+        # acrescenta linhas candidatas e é descartada.
+        literais = sorted(keyword for keyword, ignorecase in keyword_rules if not ignorecase)
+        literal_keywords = []
+        for keyword in sorted(literais, key=len):
+            vul_names = keyword_rules[(keyword, False)]
+            contidas = [(outra, keyword.index(outra)) for outra in literais
+                        if outra != keyword and outra in keyword]
+            if keyword.splitlines()[0] != keyword or \
+                    not any(vul_names <= keyword_rules[(outra, False)] for outra, _ in contidas):
+                literal_keywords.append((keyword, frozenset(vul_names), contidas))
+        keywords = [keyword for keyword, ignorecase in keyword_rules if ignorecase]
+        keyword_index = re.compile(_expressao_trie(keywords), re.IGNORECASE) if keywords else None
+        return literal_keywords, keyword_index, keyword_rules
+
+    def _regras_da_ocorrencia(self, texto: str) -> set:
+        """
+        Retorna as regras sem distinção de maiúsculas cujas palavras-chave
+        aparecem no texto encontrado pelo índice. Inclui palavras-chave
+        contidas em outra mais longa, que o índice não reporta separadamente
+        na mesma posição.
+        """
+        texto = texto.lower()
+        regras = self._rules_by_occurrence.get(texto)
+        if regras is None:
+            regras = set()
+            for (keyword, ignorecase), vul_names in self.keyword_rules.items():
+                if ignorecase and keyword in texto:
+                    regras |= vul_names
+            self._rules_by_occurrence[texto] = regras
+        return regras
+
+    def _linhas_candidatas(self, php_code: str, inicios: list[int]) -> dict:
+        """
+        Retorna, para cada linha (base zero) com ocorrências de palavras-chave,
+        as regras que precisam ser avaliadas nela. Cada palavra-chave literal
+        ausente do arquivo descarta suas regras com uma única busca; das
+        presentes, basta a primeira ocorrência de cada linha. Os inícios de
+        linha (veja _preencher_inicios) só são calculados se alguma
+        palavra-chave aparecer.
+        """
+        candidatas = {}
+        # Primeira ocorrência de cada palavra-chave literal já procurada (-1 se ausente).
+        primeiras = {}
+        for keyword, vul_names, contidas in self.literal_keywords:
+            inicio = 0
+            for outra, deslocamento in contidas:
+                if outra not in primeiras:
+                    primeiras[outra] = php_code.find(outra)
+                if primeiras[outra] < 0:
+                    inicio = -1
+                    break
+                inicio = max(inicio, primeiras[outra] - deslocamento)
+            pos = php_code.find(keyword, inicio) if inicio >= 0 else -1
+            primeiras[keyword] = pos
+            if pos < 0:
+                continue
+            _preencher_inicios(php_code, inicios)
+            ultima_linha = len(inicios) - 1
+            while pos >= 0:
+                indice_linha = bisect_right(inicios, pos) - 1
+                regras = candidatas.get(indice_linha)
+                if regras is None:
+                    candidatas[indice_linha] = set(vul_names)
+                else:
+                    regras |= vul_names
+                if indice_linha == ultima_linha:
+                    break
+                # As demais ocorrências na mesma linha não acrescentam regras.
+                pos = php_code.find(keyword, inicios[indice_linha + 1])
+
+        if self.keyword_index is not None:
+            pos = 0
+            while True:
+                match = self.keyword_index.search(php_code, pos)
+                if match is None:
+                    break
+                indice_linha = bisect_right(_preencher_inicios(php_code, inicios), match.start()) - 1
+                candidatas.setdefault(indice_linha, set()).update(self._regras_da_ocorrencia(match.group()))
+                # Avança um caractere para não perder palavras-chave sobrepostas.
+                pos = match.start() + 1
+        return candidatas
+
+    def _regras_presentes(self, php_code: str) -> set:
+        """
+        Retorna as regras com palavras-chave que aparecem em algum ponto do
+        arquivo, encerrando a busca assim que todas forem encontradas.
+        """
+        presentes = set()
+        for keyword, vul_names, _ in self.literal_keywords:
+            if not vul_names <= presentes and keyword in php_code:
+                presentes |= vul_names
+        if self.keyword_index is not None:
+            pos = 0
+            while len(presentes) < len(self.rule_keywords):
+                match = self.keyword_index.search(php_code, pos)
+                if match is None:
+                    break
+                presentes |= self._regras_da_ocorrencia(match.group())
+                pos = match.start() + 1
+        return presentes
+
+    def _combinar_padroes(self, vul_names: list) -> tuple:
+        """
+        Mescla os padrões informados em uma única alternação, permitindo
+        percorrer cada linha uma só vez para encontrar as posições em que
+        alguma regra casa. Uma segunda versão, com cada regra em um grupo
+        nomeado 'r<n>', é aplicada a partir da primeira dessas posições, para
+        atribuir cada ocorrência à regra pelo grupo que casou (veja
+        _ocorrencias_combinadas); os grupos de captura deixariam mais lenta a
+        busca nas linhas em que nada casa. Retorna as duas
+        expressões (ou None) e a lista de regras que precisam ser avaliadas
+        isoladamente, entre elas as que podem casar com o texto vazio.
+        """
+        alternativas = []
+        isoladas = []
+        for vul_name in vul_names:
+            pattern_str = self.compiled_patterns[vul_name].pattern
+            if _REFERENCIA_NUMERICA.search(pattern_str) or _FLAGS_GLOBAIS.match(pattern_str) \
+                    or _GRUPO_NOMEADO.search(pattern_str) or sre_parse.parse(pattern_str).getwidth()[0] == 0:
+                isoladas.append(vul_name)
+                continue
+            alternativas.append(pattern_str)
+
+        if not alternativas:
+            return None, None, isoladas
+
+        try:
+            combined = re.compile("|".join(f"(?:{alternativa})" for alternativa in alternativas))
+            nomeada = re.compile("|".join(f"(?P<r{indice}>{alternativa})" for indice, alternativa in enumerate(alternativas)))
+        except re.error as e:
+            print(f"Aviso: Não foi possível combinar os padrões em uma única expressão ({e}). Usando avaliação por regra.", file=sys.stderr)
+            return None, None, list(vul_names)
+
+        return combined, nomeada, isoladas
+
     def analyze_php_code(self, php_code: str, file_path: str) -> list[Vulnerabilidade]:
         """
         Analisa o código PHP fornecido em busca de vulnerabilidades.
         Retorna uma lista de objetos Vulnerabilidade encontrados.
         """
-        found_vulnerabilities = []
-        lines = php_code.splitlines()
+        return self.criar_vulnerabilidades(self.detectar_achados(php_code, file_path), file_path)
+
+    def adicionar_gancho_perfil(self, gancho: GanchoPerfil):
+        """
+        Registra um gancho que recebe, a cada arquivo analisado, o tempo, as
+        linhas examinadas e as ocorrências de cada regra. Sem ganchos
+        registrados a detecção não faz nenhuma medição.
+        """
+        self.ganchos_perfil.append(gancho)
+
+    def detectar_achados(self, php_code: str, file_path: str = None) -> list[tuple]:
+        """
+        Executa as regras sobre o código e retorna os achados na forma compacta
+        (nome da regra, linha, trecho de código), ordenados por regra e linha.
+        O caminho do arquivo só é usado para identificar as medições de perfil
+        e os diagnósticos.
+
+        Regras com palavras-chave só são avaliadas nas linhas em que alguma
+        delas aparece, segundo o índice construído na inicialização. As demais
+        regras são avaliadas juntas pela expressão combinada, que atribui cada
+        ocorrência à regra pelo grupo nomeado que casou (veja
+        _ocorrencias_combinadas); as que podem se sobrepor a outra regra
+        combinada só são avaliadas isoladamente nas linhas em que a expressão
+        combinada as encontra, e as que não podem ser combinadas, em todas.
+
+        Com tempo_limite_regra definido, a regra que esgotar seu tempo no
+        arquivo deixa de ser avaliada no restante dele e um diagnóstico é
+        registrado; a análise dos demais arquivos e regras prossegue. Sem
+        ganchos de perfil, o tempo de cada regra é amostrado pelo temporizador
+        (veja LimitadorTempo) em vez de medido a cada avaliação; onde o
+        temporizador não está disponível, ele é medido e verificado entre as
+        avaliações.
+
+        Com ignorar_comentarios, as regras regex veem os comentários trocados
+        por espaços, sem alterar os números de linha, e o trecho de código dos
+        achados é recortado do texto original. Linhas mais longas que
+        TAMANHO_JANELA são avaliadas em janelas (também no modo buffer, que
+        passa a avaliar o arquivo linha a linha) e, nelas, o trecho é limitado
+        às colunas ao redor da ocorrência (veja LIMITE_TRECHO). As regras de tokens vêm depois
+        das regras regex. Por fim, são descartados os achados suprimidos por
+        comentários MARCADOR_SUPRESSAO e, com limite_ocorrencias_regra, os que
+        excedem o limite de cada regra (as primeiras ocorrências são mantidas).
+        Em arquivos sem supressões, a regra que atinge o limite deixa de ser
+        avaliada; nos demais, todas as ocorrências são buscadas, para que as
+        suprimidas não contem no limite.
+        """
+        if not self.compiled_patterns and not self.token_rules and self.motor_taint is None:
+            return []
+        limitador = LimitadorTempo(habilitado=bool(self.tempo_limite_regra),
+                                   intervalo=self.tempo_limite_regra and self.tempo_limite_regra / DIVISOES_TEMPO_LIMITE,
+                                   limite_amostrado=self.tempo_limite_regra)
+        # nome da regra -> [segundos, linhas examinadas, ocorrências]
+        medicoes = {} if self.ganchos_perfil or (self.tempo_limite_regra and not limitador.ativo) else None
+        esgotadas = set()
+        limite = self.limite_ocorrencias_regra if MARCADOR_SUPRESSAO not in php_code else None
+        inicio_arquivo = time.perf_counter()
+
+        # Inícios de linha do arquivo, os mesmos no texto sem comentários.
+        inicios = []
+        inativo = self._limitador
+        try:
+            with limitador as self._limitador:
+                if self.modo_buffer and not _tem_linha_longa(php_code, inicios):
+                    achados = self._detectar_achados_buffer(php_code, inicios, medicoes, esgotadas, limite)
+                else:
+                    achados = self._detectar_achados_linhas(php_code, inicios, medicoes, esgotadas, limite)
+        finally:
+            self._limitador = inativo
+
+        # Até aqui cada achado é (nome da regra, linha, coluna, coluna final);
+        # os trechos de código só são recortados no fim, para os mantidos. Os
+        # tokens das regras de tokens são repassados à análise de fluxo de
+        # dados; sem eles, o MotorTaint só tokeniza o arquivo se o resumo
+        # guardado dele não puder ser reaproveitado.
+        tokens = None
+        if self.token_rules and self.token_prefilter.search(php_code) is not None:
+            tokens = self._tokenizar(php_code, medicoes)
+            achados.extend(self._detectar_achados_tokens(php_code, tokens, inicios, medicoes))
+        self.dependencias = {}
+        if self.motor_taint is not None and self.motor_taint.relevante(php_code):
+            achados.extend(self._detectar_achados_taint(php_code, tokens, file_path, medicoes))
+
+        if achados and MARCADOR_SUPRESSAO in php_code:
+            achados = self._aplicar_supressoes(php_code, achados, inicios)
+        if achados and self.limite_ocorrencias_regra:
+            achados = limitar_ocorrencias(achados, self.limite_ocorrencias_regra)
+        if achados:
+            _preencher_inicios(php_code, inicios)
+            achados = [(vul_name, line_number, _recortar_trecho(php_code, inicios, line_number - 1, coluna, coluna_fim))
+                       for vul_name, line_number, coluna, coluna_fim in achados]
+
+        for vul_name in (name for name in self.compiled_patterns if name in esgotadas):
+            self.diagnosticos.append((file_path, vul_name, f"tempo limite de {self.tempo_limite_regra}s excedido; "
+                                                           "regra ignorada no restante do arquivo"))
+        if self.ganchos_perfil:
+            self._notificar_perfil(file_path, php_code, medicoes, time.perf_counter() - inicio_arquivo, len(achados))
+        return achados
+
+    def detectar_achados_partes(self, partes, file_path: str = None) -> list[tuple]:
+        """
+        Como detectar_achados, para um arquivo lido em partes (veja
+        analyzers/large_files.py): 'partes' gera (número da primeira linha,
+        código), e cada parte é analisada separadamente, com os números de
+        linha deslocados. Construções e fluxos de dados que atravessam partes
+        não são encontrados. O limite de ocorrências vale para o arquivo todo.
+        """
+        achados = []
+        dependencias = {}
+        for numero, (linha_inicial, php_code) in enumerate(partes):
+            if numero and self.configuracao.linguagem == LINGUAGEM_PHP:
+                # O analisador léxico começa fora do PHP; as partes seguintes
+                # continuam o código da anterior, em uma linha a mais aberta aqui.
+                php_code = "<?php\n" + php_code
+                linha_inicial -= 1
+            achados.extend((vul_name, line_number + linha_inicial - 1, code_snippet)
+                           for vul_name, line_number, code_snippet in self.detectar_achados(php_code, file_path))
+            dependencias.update(self.dependencias)
+        self.dependencias = dependencias
+        if achados and self.limite_ocorrencias_regra:
+            achados = limitar_ocorrencias(achados, self.limite_ocorrencias_regra)
+        return achados
+
+    @staticmethod
+    def _aplicar_supressoes(php_code: str, achados: list[tuple], inicios: list[int]) -> list[tuple]:
+        """
+        Remove os achados suprimidos por comentários MARCADOR_SUPRESSAO. Só
+        valem marcadores dentro de comentários: no texto sem comentários eles
+        foram trocados por espaços.
+        """
+        sem_comentarios = remover_comentarios(php_code)
+        _preencher_inicios(php_code, inicios)
+        # número da linha -> nomes das regras suprimidas (em minúsculas), ou None para todas
+        supressoes = {}
+        for marca in _SUPRESSAO.finditer(php_code):
+            if sem_comentarios[marca.start()] != " ":
+                continue
+            indice_linha = bisect_right(inicios, marca.start()) - 1
+            sozinho = not _recortar_linha(sem_comentarios, inicios, indice_linha).strip()
+            linha = indice_linha + (2 if sozinho else 1)
+            regras = None
+            if marca.group(1) is not None:
+                regras = {nome.strip().lower() for nome in marca.group(1).split(",") if nome.strip()} or None
+            anteriores = supressoes.get(linha, set())
+            supressoes[linha] = None if regras is None or anteriores is None else anteriores | regras
+
+        if not supressoes:
+            return achados
+        mantidos = []
+        for achado in achados:
+            regras = supressoes.get(achado[1], ())
+            if regras is None or achado[0].lower() in regras:
+                continue
+            mantidos.append(achado)
+        return mantidos
+
+    def _detectar_achados_linhas(self, php_code: str, inicios: list[int], medicoes: dict | None, esgotadas: set,
+                                 limite: int = None) -> list[tuple]:
+        """
+        Avalia as regras linha a linha. Com 'limite', a regra que já tem esse
+        número de ocorrências não é mais avaliada no arquivo. Os comentários
+        só são removidos até a última linha que alguma regra precisa ver.
+        """
+        matches_by_rule = {vul_name: [] for vul_name in self.compiled_patterns}
+
+        sem_comentarios = self.prefiltro_sem_comentarios
+        if sem_comentarios:
+            php_code = self._sem_comentarios(php_code, None, medicoes)
+        inicio = time.perf_counter()
+        candidate_lines = self._linhas_candidatas(php_code, inicios)
+        if medicoes is not None and self.keyword_rules:
+            medicoes[PREFILTRO] = [time.perf_counter() - inicio, _contar_linhas(php_code), 0]
+        if not sem_comentarios and (candidate_lines or self.unanchored_rules):
+            fim = None
+            if not self.unanchored_rules and max(candidate_lines) + 1 < len(inicios):
+                fim = inicios[max(candidate_lines) + 1]
+            php_code = self._sem_comentarios(php_code, fim, medicoes)
+
+        # Apenas as linhas com palavras-chave são recortadas do texto.
+        for i in sorted(candidate_lines):
+            line_content = _recortar_linha(php_code, inicios, i)
+            for vul_name in candidate_lines[i]:
+                if limite is not None and len(matches_by_rule[vul_name]) >= limite:
+                    continue
+                self._avaliar_regra_na_linha(vul_name, line_content, i + 1, matches_by_rule[vul_name], medicoes,
+                                             esgotadas)
+
+        if self.unanchored_rules:
+            combinada = self.combined_pattern is not None
+            for i, line_content in enumerate(php_code.splitlines()):
+                candidate_rules = []
+                if not combinada:
+                    # Expressão combinada ausente (todas as regras isoladas) ou com tempo esgotado no arquivo.
+                    candidate_rules = self.combined_rules
+                elif len(line_content) > TAMANHO_JANELA:
+                    # Em janelas, a expressão combinada só indica se alguma regra pode casar na linha.
+                    if next(_ocorrencias(self.combined_pattern, line_content), None) is not None:
+                        candidate_rules = self.combined_rules
+                else:
+                    primeira = self.combined_pattern.search(line_content)
+                    if primeira is None:
+                        pass
+                    elif len(self.overlapping_rules) == len(self.combined_rules):
+                        candidate_rules = self.combined_rules
+                    else:
+                        sobreposta = self._avaliar_combinada(line_content, primeira, i + 1, matches_by_rule,
+                                                             medicoes, limite)
+                        if sobreposta is None:
+                            # Desta linha em diante, cada regra é avaliada (e limitada) isoladamente.
+                            combinada = False
+                            candidate_rules = self.combined_rules
+                        elif sobreposta:
+                            candidate_rules = self.overlapping_rules
+
+                for vul_name in (*candidate_rules, *self.isolated_patterns):
+                    if limite is not None and len(matches_by_rule[vul_name]) >= limite:
+                        continue
+                    self._avaliar_regra_na_linha(vul_name, line_content, i + 1, matches_by_rule[vul_name], medicoes,
+                                             esgotadas)
+                if limite is not None and all(len(matches_by_rule[vul_name]) >= limite
+                                              for vul_name in self.unanchored_rules):
+                    break
+
+        return [achado for matches in matches_by_rule.values() for achado in matches]
+
+    def _avaliar_combinada(self, line_content: str, primeira: re.Match, line_number: int, matches_by_rule: dict,
+                           medicoes: dict | None, limite: int = None) -> bool | None:
+        """
+        Acrescenta a 'matches_by_rule' as ocorrências das regras combinadas que
+        não se sobrepõem a outras na linha, a partir da primeira ocorrência da
+        expressão combinada, medindo-as se solicitado. Retorna se a expressão
+        encontrou alguma regra que pode se sobrepor, a ser avaliada
+        isoladamente. A expressão combinada tem seu próprio tempo limite no
+        arquivo; ao esgotá-lo, nada é acrescentado e o retorno é None.
+        """
+        if medicoes is None:
+            limitador = self._limitador
+            try:
+                limitador.em_andamento = EXPRESSAO_COMBINADA
+                ocorrencias, sobreposta = self._ocorrencias_combinadas(line_content, primeira)
+                limitador.em_andamento = None
+            except TempoEsgotadoRegra:
+                limitador.em_andamento = None
+                return None
+        else:
+            inicio = time.perf_counter()
+            medida = medicoes.setdefault(EXPRESSAO_COMBINADA, [0.0, 0, 0])
+            try:
+                ocorrencias, sobreposta = self._limitador.executar(
+                    self._ocorrencias_combinadas, self.tempo_limite_regra and self.tempo_limite_regra - medida[0],
+                    line_content, primeira)
+            except TempoEsgotadoRegra:
+                return None
+            finally:
+                medida[0] += time.perf_counter() - inicio
+            medida[1] += 1
+            medida[2] += len(ocorrencias)
+        for vul_name, inicio_match, fim_match in ocorrencias:
+            matches = matches_by_rule[vul_name]
+            if limite is None or len(matches) < limite:
+                matches.append((vul_name, line_number, inicio_match, fim_match))
+        return sobreposta
+
+    def _ocorrencias_combinadas(self, line_content: str, primeira: re.Match) -> tuple:
+        """
+        Retorna (ocorrências, sobreposta): as ocorrências (nome da regra,
+        início, fim) das regras combinadas que não se sobrepõem a outras, em
+        ordem de início, e se alguma das demais casou na linha.
+
+        Uma regra cujos caracteres não podem aparecer nas ocorrências de
+        nenhuma outra (veja _regras_sobrepostas) nunca casa na mesma posição
+        nem dentro da ocorrência de outra regra, de modo que finditer() da
+        expressão combinada produz exatamente as ocorrências dela. As
+        ocorrências das outras regras podem esconder umas às outras e servem
+        apenas para indicar que elas precisam ser avaliadas na linha.
+        """
+        regras = self._regra_do_grupo
+        ocorrencias = []
+        sobreposta = False
+        for match in self._combinada_nomeada.finditer(line_content, primeira.start()):
+            vul_name = regras[match.lastgroup]
+            if vul_name is None:
+                sobreposta = True
+            else:
+                ocorrencias.append((vul_name, match.start(), match.end()))
+        return ocorrencias, sobreposta
+
+    def _avaliar_regra_na_linha(self, vul_name: str, line_content: str, line_number: int, matches: list,
+                                medicoes: dict | None, esgotadas: set):
+        """
+        Acrescenta a 'matches' as ocorrências da regra na linha, medindo-as se
+        solicitado. Regras que esgotaram o tempo no arquivo são ignoradas.
+        """
+        if vul_name in esgotadas:
+            return
+        if medicoes is None:
+            # A regra fica marcada como em andamento apenas dentro do 'try': um
+            # disparo fora dele não tem a quem atribuir o tempo e nada lança.
+            limitador = self._limitador
+            try:
+                limitador.em_andamento = vul_name
+                for match in _ocorrencias(self.compiled_patterns[vul_name], line_content):
+                    matches.append((vul_name, line_number, match.start(), match.end()))
+                limitador.em_andamento = None
+            except TempoEsgotadoRegra:
+                limitador.em_andamento = None
+                esgotadas.add(vul_name)
+            return
+
+        inicio = time.perf_counter()
+        antes = len(matches)
+        medida = medicoes.setdefault(vul_name, [0.0, 0, 0])
+        try:
+            if self.tempo_limite_regra:
+                self._limitador.executar(self._coletar_ocorrencias, self.tempo_limite_regra - medida[0],
+                                         vul_name, line_content, line_number, matches)
+            else:
+                self._coletar_ocorrencias(vul_name, line_content, line_number, matches)
+        except TempoEsgotadoRegra:
+            esgotadas.add(vul_name)
+        medida[0] += time.perf_counter() - inicio
+        medida[1] += 1
+        medida[2] += len(matches) - antes
+        if self.tempo_limite_regra and medida[0] >= self.tempo_limite_regra:
+            esgotadas.add(vul_name)
+
+    def _coletar_ocorrencias(self, vul_name: str, line_content: str, line_number: int, matches: list):
+        for match in _ocorrencias(self.compiled_patterns[vul_name], line_content):
+            matches.append((vul_name, line_number, match.start(), match.end()))
+
+    def _sem_comentarios(self, php_code: str, fim: int | None, medicoes: dict | None) -> str:
+        """
+        Retorna o texto visto pelas regras regex: com ignorar_comentarios, sem
+        os comentários (até 'fim'; veja remover_comentarios), somando o tempo
+        gasto à medição do analisador léxico.
+        """
+        if not self.ignorar_comentarios:
+            return php_code
+        inicio = time.perf_counter()
+        codigo = remover_comentarios(php_code, fim)
+        if medicoes is not None:
+            medicoes[LEXICO] = [time.perf_counter() - inicio, _contar_linhas(php_code), 0]
+        return codigo
 
+    def _detectar_achados_buffer(self, php_code: str, inicios: list[int], medicoes: dict | None = None,
+                                 esgotadas: set = None, limite: int = None) -> list[tuple]:
+        """
+        Avalia cada regra aplicável com uma única busca sobre o arquivo inteiro,
+        o que também encontra construções que se estendem por várias linhas.
+        Diferentemente da avaliação por linha, '.' casa com as quebras de linha
+        de str.splitlines() além de '\\n' (como '\\r', '\\x0c' e '\\u2028'),
+        e uma ocorrência que atravessa linhas esconde as seguintes da mesma
+        regra que comecem dentro dela (finditer() não gera sobreposições).
+        O deslocamento de cada ocorrência é convertido em número de linha (e
+        coluna) por busca binária nos inícios de linha. Uma regra
+        interrompida pelo tempo limite mantém as ocorrências já encontradas;
+        com 'limite', a busca de cada regra termina nessa ocorrência.
+        """
+        sem_comentarios = self.prefiltro_sem_comentarios
+        if sem_comentarios:
+            php_code = self._sem_comentarios(php_code, None, medicoes)
+        inicio = time.perf_counter()
+        presentes = self._regras_presentes(php_code) if self.rule_keywords else set()
+        total_linhas = _contar_linhas(php_code) if medicoes is not None else 0
+        if medicoes is not None and self.rule_keywords:
+            medicoes[PREFILTRO] = [time.perf_counter() - inicio, total_linhas, 0]
+        if not sem_comentarios and (presentes or self.unanchored_rules):
+            php_code = self._sem_comentarios(php_code, None, medicoes)
+
+        achados = []
         for vul_name, compiled_pattern in self.compiled_patterns.items():
+            if vul_name in self.rule_keywords and vul_name not in presentes:
+                continue
+            inicio = time.perf_counter()
+            antes = len(achados)
+            try:
+                self._limitador.executar(
+                    lambda: self._coletar_ocorrencias_buffer(vul_name, compiled_pattern, php_code, inicios, achados,
+                                                             limite),
+                    self.tempo_limite_regra)
+            except TempoEsgotadoRegra:
+                esgotadas.add(vul_name)
+            if medicoes is not None:
+                medicoes[vul_name] = [time.perf_counter() - inicio, total_linhas, len(achados) - antes]
+        return achados
+
+    @staticmethod
+    def _coletar_ocorrencias_buffer(vul_name: str, compiled_pattern: re.Pattern, php_code: str, inicios: list,
+                                    achados: list, limite: int = None):
+        """Acrescenta a 'achados' as ocorrências da regra no arquivo inteiro, até 'limite' delas."""
+        encontradas = 0
+        for match in compiled_pattern.finditer(php_code):
+            indice_linha = bisect_right(_preencher_inicios(php_code, inicios), match.start()) - 1
+            achados.append((vul_name, indice_linha + 1, match.start() - inicios[indice_linha],
+                            match.end() - inicios[indice_linha]))
+            encontradas += 1
+            if encontradas == limite:
+                break
+
+    @staticmethod
+    def _tokenizar(php_code: str, medicoes: dict | None) -> TokensPHP:
+        """Tokeniza o código, somando o tempo gasto à medição do analisador léxico."""
+        inicio = time.perf_counter()
+        tokens = tokenizar(php_code)
+        if medicoes is not None:
+            medida = medicoes.setdefault(LEXICO, [0.0, _contar_linhas(php_code), 0])
+            medida[0] += time.perf_counter() - inicio
+        return tokens
+
+    def _detectar_achados_tokens(self, php_code: str, tokens: TokensPHP, inicios: list[int],
+                                 medicoes: dict | None) -> list[tuple]:
+        """
+        Avalia as regras de tokens pelo índice de nomes do analisador léxico.
+        Só é chamado se algum nome das regras aparecer no texto; ocorrências em
+        comentários e strings não contam como identificadores.
+        """
+        indice = tokens.indice()
+        achados = []
+        for vul_name, (tipo, nomes) in self.token_rules.items():
+            inicio = time.perf_counter()
+            # linha -> deslocamento da primeira ocorrência nela
+            linhas = {}
+            for nome in nomes:
+                for posicao, deslocamento in indice.get(nome, ()):
+                    if tipo != REGRA_CHAMADA or self._eh_chamada(tokens, posicao):
+                        linha = tokens.linha(deslocamento)
+                        linhas[linha] = min(deslocamento, linhas.get(linha, deslocamento))
+            if linhas:
+                _preencher_inicios(php_code, inicios)
+            for linha in sorted(linhas):
+                coluna = linhas[linha] - inicios[linha - 1]
+                achados.append((vul_name, linha, coluna, coluna))
+            if medicoes is not None:
+                medicoes[vul_name] = [time.perf_counter() - inicio, 0, len(linhas)]
+        return achados
+
+    def _detectar_achados_taint(self, php_code: str, tokens: TokensPHP | None, file_path: str | None,
+                                medicoes: dict | None) -> list[tuple]:
+        """
+        Avalia as regras de fluxo de dados com o MotorTaint, que segue as
+        inclusões do arquivo e guarda os resumos de cada arquivo para as
+        análises seguintes. Só é chamado para os arquivos relevantes segundo
+        MotorTaint.relevante.
+        """
+        inicio = time.perf_counter()
+        try:
+            resumo = self.motor_taint.analisar(php_code, file_path, tokens)
+        except RecursionError:
+            self.diagnosticos.append((file_path, FLUXO_DE_DADOS, "expressões aninhadas além do limite de recursão; "
+                                                                 "análise ignorada no arquivo"))
+            return []
+        self.dependencias = dict(resumo.dependencias)
+        achados = [(vul_name, linha, None, None) for vul_name, linha in resumo.achados]
+        if medicoes is not None:
+            medicoes[FLUXO_DE_DADOS] = [time.perf_counter() - inicio, _contar_linhas(php_code), len(achados)]
+        return achados
+
+    @staticmethod
+    def _eh_chamada(tokens, posicao: int) -> bool:
+        """
+        Indica se o identificador na posição é uma chamada de função: seguido
+        de '(' e não precedido de '->', '?->', '::', 'function', 'fn' ou 'new'.
+        """
+        seguinte = tokens.vizinho(posicao, 1)
+        if seguinte is None or seguinte[:2] != (OPERADOR, "("):
+            return False
+        anterior = tokens.vizinho(posicao, -1)
+        if anterior is None:
+            return True
+        if anterior[0] == IDENTIFICADOR:
+            return anterior[1].lower() not in _PALAVRAS_NAO_CHAMADA
+        return anterior[:2] not in _ANTES_DE_NAO_CHAMADA
+
+    def retirar_dependencias(self) -> dict:
+        """Retorna e descarta as dependências do último arquivo analisado."""
+        dependencias, self.dependencias = self.dependencias, {}
+        return dependencias
+
+    def retirar_diagnosticos(self) -> list[tuple]:
+        """Retorna e descarta os diagnósticos acumulados desde a última chamada."""
+        diagnosticos, self.diagnosticos = self.diagnosticos, []
+        return diagnosticos
+
+    def _notificar_perfil(self, file_path: str, php_code: str, medicoes: dict, segundos: float, ocorrencias: int):
+        """Repassa aos ganchos as medições de um arquivo."""
+        for gancho in self.ganchos_perfil:
+            for vul_name, (segundos_regra, linhas, ocorrencias_regra) in medicoes.items():
+                gancho.registrar_regra(file_path, vul_name, segundos_regra, linhas, ocorrencias_regra)
+            gancho.registrar_arquivo(file_path, segundos, _contar_linhas(php_code), ocorrencias)
+
+    def criar_vulnerabilidades(self, achados: list[tuple], file_path: str) -> list[Vulnerabilidade]:
+        """
+        Converte achados compactos (nome da regra, linha, trecho de código) em
+        objetos Vulnerabilidade, completando-os com os metadados da regra.
+        """
+        found_vulnerabilities = []
+        for vul_name, line_number, code_snippet in achados:
             vul_details = self.configuracao.obter_padrao_vulnerabilidade(vul_name)
-            
+
             message = vul_details.get('message', 'Nenhuma mensagem disponível')
             severity = vul_details.get('severity', 'Desconhecida')
             suggestion = vul_details.get('suggestion', 'Consulte a documentação de segurança para correção.')
 
-            for i, line_content in enumerate(lines):
-                for match in compiled_pattern.finditer(line_content):
-                    line_number = i + 1
-                    code_snippet = line_content.strip() 
-
-                    found_vulnerabilities.append(
-                        Vulnerabilidade(
-                            vul_type=vul_name, 
-                            description=message,
-                            severity=severity,
-                            line=line_number,
-                            code_snippet=code_snippet,
-                            suggestion=suggestion,
-                            file_path=file_path
-                        )
-                    )
-        return found_vulnerabilities
\ No newline at end of file
+            found_vulnerabilities.append(
+                Vulnerabilidade(
+                    vul_type=vul_name,
+                    description=message,
+                    severity=severity,
+                    line=line_number,
+                    code_snippet=code_snippet,
+                    suggestion=suggestion,
+                    file_path=file_path
+                )
+            )
+        return found_vulnerabilities
@@ -0,0 +1,228 @@
+import os
+import re
+import sys
+
+# Diretórios de terceiros e de controle de versão ignorados por padrão.
+DIRETORIOS_IGNORADOS_PADRAO = ("vendor", "node_modules", ".git")
+
+# Arquivos no formato do .gitignore lidos em cada diretório percorrido.
+ARQUIVOS_IGNORE_PADRAO = (".gitignore", ".analysisignore")
+
+EXTENSOES_PHP = (".php", ".phtml", ".inc")
+
+
+def _glob_para_regex(padrao: str) -> str:
+    """
+    Converte um glob em expressão regular sobre caminhos separados por '/'.
+    '*' e '?' não atravessam diretórios; '**' atravessa qualquer quantidade.
+    """
+    partes = []
+    i = 0
+    while i < len(padrao):
+        caractere = padrao[i]
+        if padrao.startswith("**/", i):
+            partes.append("(?:.*/)?")
+            i += 3
+            continue
+        if padrao.startswith("**", i):
+            partes.append(".*")
+            i += 2
+            continue
+        if caractere == "*":
+            partes.append("[^/]*")
+        elif caractere == "?":
+            partes.append("[^/]")
+        elif caractere == "[":
+            fim = padrao.find("]", i + 1)
+            if fim == -1:
+                partes.append(re.escape(caractere))
+            else:
+                classe = padrao[i + 1:fim].replace("\\", "\\\\")
+                if classe.startswith("!"):
+                    classe = "^" + classe[1:]
+                partes.append(f"[{classe}]")
+                i = fim
+        elif caractere == "\\" and i + 1 < len(padrao):
+            i += 1
+            partes.append(re.escape(padrao[i]))
+        else:
+            partes.append(re.escape(caractere))
+        i += 1
+    return "".join(partes)
+
+
+def compilar_glob(padrao: str) -> re.Pattern:
+    """
+    Compila um glob de inclusão ou exclusão. Globs sem '/' casam com o nome
+    do arquivo ou diretório em qualquer profundidade; os demais, com o caminho
+    relativo à raiz percorrida.
+    """
+    padrao = padrao.replace(os.sep, "/").rstrip("/")
+    if "/" in padrao:
+        return re.compile(_glob_para_regex(padrao.lstrip("/")) + r"\Z")
+    return re.compile(r"(?:.*/)?" + _glob_para_regex(padrao) + r"\Z")
+
+
+class RegrasIgnore:
+    """
+    Regras de um arquivo no formato do .gitignore: comentários com '#',
+    negação com '!', '/' final para casar apenas diretórios e padrões com '/'
+    ancorados no diretório do arquivo. Vale a última regra que casar.
+    """
+    def __init__(self, base: str, linhas):
+        # Caminho, relativo à raiz percorrida, do diretório que contém o arquivo.
+        self.base = base
+        self.regras = []
+        for linha in linhas:
+            linha = linha.rstrip("\n\r")
+            if not linha.strip() or linha.startswith("#"):
+                continue
+            linha = linha.rstrip(" ")
+            negada = linha.startswith("!")
+            if negada:
+                linha = linha[1:]
+            elif linha.startswith("\\"):
+                linha = linha[1:]
+            somente_diretorio = linha.endswith("/")
+            linha = linha.rstrip("/")
+            if not linha:
+                continue
+            if "/" in linha:
+                expressao = re.compile(_glob_para_regex(linha.lstrip("/")) + r"\Z")
+            else:
+                expressao = re.compile(r"(?:.*/)?" + _glob_para_regex(linha) + r"\Z")
+            self.regras.append((expressao, negada, somente_diretorio))
+
+    @classmethod
+    def carregar(cls, caminho: str, base: str):
+        try:
+            with open(caminho, 'r', encoding='utf-8', errors='replace') as arquivo:
+                return cls(base, arquivo.readlines())
+        except OSError as e:
+            print(f"Aviso: Não foi possível ler o arquivo de exclusões '{caminho}': {e}", file=sys.stderr)
+            return None
+
+    def decidir(self, relativo: str, eh_diretorio: bool) -> bool | None:
+        """
+        Retorna True se o caminho (relativo à raiz) for ignorado, False se uma
+        negação o reincluir, ou None se nenhuma regra casar.
+        """
+        if self.base:
+            if not relativo.startswith(self.base + "/"):
+                return None
+            relativo = relativo[len(self.base) + 1:]
+        decisao = None
+        for expressao, negada, somente_diretorio in self.regras:
+            if somente_diretorio and not eh_diretorio:
+                continue
+            if expressao.match(relativo):
+                decisao = not negada
+        return decisao
+
+
+def _ignorado(regras_ignore: list, relativo: str, eh_diretorio: bool) -> bool:
+    ignorado = False
+    for regras in regras_ignore:
+        decisao = regras.decidir(relativo, eh_diretorio)
+        if decisao is not None:
+            ignorado = decisao
+    return ignorado
+
+
+def descobrir_arquivos_php(caminho: str, incluir=(), excluir=(), tamanho_maximo: int = None,
+                           arquivos_ignore=ARQUIVOS_IGNORE_PADRAO,
+                           diretorios_ignorados=DIRETORIOS_IGNORADOS_PADRAO,
+                           extensoes=EXTENSOES_PHP, diretorios: list = None):
+    """
+    Gera, à medida que são encontrados, os arquivos PHP de um caminho (arquivo
+    ou diretório), na mesma ordem de os.walk: os arquivos de cada diretório
+    antes dos subdiretórios.
+
+    - incluir/excluir: globs (veja compilar_glob); com 'incluir', apenas os
+      arquivos que casarem com algum deles são gerados; diretórios que casarem
+      com 'excluir' não são percorridos.
+    - tamanho_maximo: arquivos maiores que isso, em bytes, são ignorados.
+    - arquivos_ignore: nomes dos arquivos no formato do .gitignore lidos em
+      cada diretório; suas regras valem para a subárvore.
+    - diretorios_ignorados: nomes de diretórios nunca percorridos.
+    - extensoes: extensões, em minúsculas, dos arquivos gerados (por padrão,
+      as de PHP; RegistroRegras.extensoes traz as de todos os pacotes).
+    - diretorios: se informada, recebe cada diretório percorrido (usada para
+      observar alterações; veja analyzers/watch.py).
+
+    Links simbólicos para diretórios são seguidos, mas cada diretório real é
+    visitado uma única vez, o que evita laços.
+    """
+    if os.path.isfile(caminho):
+        if caminho.lower().endswith(extensoes):
+            yield caminho
+        return
+    if not os.path.isdir(caminho):
+        return
+
+    padroes_incluir = [compilar_glob(padrao) for padrao in incluir]
+    padroes_excluir = [compilar_glob(padrao) for padrao in excluir]
+    ignorados = set(diretorios_ignorados)
+    visitados = set()
+
+    def percorrer(diretorio: str, relativo_diretorio: str, regras_ignore: list):
+        try:
+            estado = os.stat(diretorio)
+        except OSError:
+            return
+        identificador = (estado.st_dev, estado.st_ino)
+        if identificador in visitados:
+            return
+        visitados.add(identificador)
+        if diretorios is not None:
+            diretorios.append(diretorio)
+
+        try:
+            with os.scandir(diretorio) as iterador:
+                entradas = list(iterador)
+        except OSError as e:
+            print(f"Aviso: Não foi possível listar o diretório '{diretorio}': {e}", file=sys.stderr)
+            return
+
+        nomes = {entrada.name for entrada in entradas}
+        for nome in arquivos_ignore:
+            if nome in nomes:
+                regras = RegrasIgnore.carregar(os.path.join(diretorio, nome), relativo_diretorio)
+                if regras is not None:
+                    regras_ignore = regras_ignore + [regras]
+
+        subdiretorios = []
+        for entrada in entradas:
+            relativo = f"{relativo_diretorio}/{entrada.name}" if relativo_diretorio else entrada.name
+            try:
+                eh_diretorio = entrada.is_dir()
+            except OSError:
+                continue
+            if eh_diretorio:
+                if entrada.name in ignorados or any(padrao.match(relativo) for padrao in padroes_excluir):
+                    continue
+                if not _ignorado(regras_ignore, relativo, True):
+                    subdiretorios.append((entrada.path, relativo))
+                continue
+
+            if not entrada.name.lower().endswith(extensoes):
+                continue
+            if padroes_incluir and not any(padrao.match(relativo) for padrao in padroes_incluir):
+                continue
+            if any(padrao.match(relativo) for padrao in padroes_excluir) or _ignorado(regras_ignore, relativo, False):
+                continue
+            if tamanho_maximo is not None:
+                try:
+                    tamanho = entrada.stat().st_size
+                except OSError:
+                    continue
+                if tamanho > tamanho_maximo:
+                    print(f"Aviso: Arquivo '{entrada.path}' ignorado: {tamanho} bytes excedem o limite de "
+                          f"{tamanho_maximo} bytes.", file=sys.stderr)
+                    continue
+            yield entrada.path
+
+        for subdiretorio, relativo in subdiretorios:
+            yield from percorrer(subdiretorio, relativo, regras_ignore)
+
+    yield from percorrer(caminho, "", [])
@@ -0,0 +1,112 @@
+from array import array
+
+from analyzers.vulnerability import Vulnerabilidade
+
+
+class TabelaAchados:
+    """
+    Armazena vulnerabilidades em forma colunar e compacta.
+
+    Cada achado ocupa apenas quatro inteiros (regra, arquivo, linha e trecho
+    de código) em arrays; os metadados das regras, os caminhos dos arquivos e
+    os trechos de código ficam em tabelas compartilhadas, sem repetição. Os
+    objetos Vulnerabilidade só são criados quando um consumidor acessa os
+    achados, por índice ou iteração.
+    """
+    def __init__(self):
+        # (tipo, descrição, severidade, sugestão) de cada regra.
+        self._regras = []
+        self._ids_regras = {}
+        self._arquivos = []
+        self._ids_arquivos = {}
+        self._trechos = []
+        self._ids_trechos = {}
+
+        self._coluna_regra = array('I')
+        self._coluna_arquivo = array('I')
+        self._coluna_linha = array('I')
+        self._coluna_trecho = array('I')
+
+    @staticmethod
+    def _internar(valor, tabela: list, ids: dict) -> int:
+        """Retorna o identificador do valor na tabela, incluindo-o se necessário."""
+        identificador = ids.get(valor)
+        if identificador is None:
+            identificador = len(tabela)
+            tabela.append(valor)
+            ids[valor] = identificador
+        return identificador
+
+    def adicionar_achado(self, vul_type: str, description: str, severity: str, suggestion: str,
+                         file_path: str, line: int, code_snippet: str):
+        """Adiciona um achado a partir de seus campos, sem criar uma Vulnerabilidade."""
+        self._coluna_regra.append(self._internar((vul_type, description, severity, suggestion),
+                                                 self._regras, self._ids_regras))
+        self._coluna_arquivo.append(self._internar(file_path, self._arquivos, self._ids_arquivos))
+        self._coluna_linha.append(line)
+        self._coluna_trecho.append(self._internar(code_snippet, self._trechos, self._ids_trechos))
+
+    def adicionar(self, vulnerability: Vulnerabilidade):
+        """Adiciona uma vulnerabilidade; o objeto não é mantido."""
+        self.adicionar_achado(vulnerability.type, vulnerability.description, vulnerability.severity,
+                              vulnerability.suggestion, vulnerability.file_path, vulnerability.line,
+                              vulnerability.code_snippet)
+
+    def _criar_vulnerabilidade(self, indice: int) -> Vulnerabilidade:
+        vul_type, description, severity, suggestion = self._regras[self._coluna_regra[indice]]
+        return Vulnerabilidade(
+            vul_type=vul_type,
+            description=description,
+            severity=severity,
+            line=self._coluna_linha[indice],
+            code_snippet=self._trechos[self._coluna_trecho[indice]],
+            suggestion=suggestion,
+            file_path=self._arquivos[self._coluna_arquivo[indice]]
+        )
+
+    def __len__(self) -> int:
+        return len(self._coluna_linha)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._criar_vulnerabilidade(i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice de achado fora do intervalo")
+        return self._criar_vulnerabilidade(indice)
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield self._criar_vulnerabilidade(indice)
+
+    def agrupar(self) -> list:
+        """
+        Agrupa os achados por regra e, em cada regra, por arquivo, sem criar
+        objetos Vulnerabilidade. Retorna uma lista de
+        ((tipo, descrição, severidade, sugestão), [(caminho, [(linha, trecho), ...]), ...]),
+        com regras, arquivos e ocorrências na ordem em que foram adicionados.
+        """
+        grupos = {}
+        for regra, arquivo, linha, trecho in zip(self._coluna_regra, self._coluna_arquivo,
+                                                 self._coluna_linha, self._coluna_trecho):
+            grupos.setdefault(regra, {}).setdefault(arquivo, []).append((linha, self._trechos[trecho]))
+        return [(self._regras[regra], [(self._arquivos[arquivo], ocorrencias)
+                                       for arquivo, ocorrencias in arquivos.items()])
+                for regra, arquivos in grupos.items()]
+
+    def colunas(self) -> dict:
+        """
+        Retorna os achados na forma colunar, serializável em JSON: as tabelas
+        de regras, arquivos e trechos e, para cada achado, os índices nessas
+        tabelas e a linha.
+        """
+        return {
+            "regras": self._regras,
+            "arquivos": self._arquivos,
+            "trechos": self._trechos,
+            "regra": self._coluna_regra.tolist(),
+            "arquivo": self._coluna_arquivo.tolist(),
+            "linha": self._coluna_linha.tolist(),
+            "trecho": self._coluna_trecho.tolist(),
+        }
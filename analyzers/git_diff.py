@@ -0,0 +1,183 @@
+import codecs
+import os
+import re
+import subprocess
+from bisect import bisect_right
+
+from analyzers.discovery import DIRETORIOS_IGNORADOS_PADRAO, EXTENSOES_PHP, compilar_glob
+
+# Cabeçalho de um hunk; interessa apenas o intervalo do lado novo (+inicio,quantidade).
+_CABECALHO_HUNK = re.compile(rb'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+# Quebra de linha ao final de uma linha, como reconhecida por str.splitlines().
+_QUEBRA_FINAL = re.compile(r'(?:\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029])\Z')
+
+# Linhas de contexto avaliadas antes e depois de cada trecho alterado.
+CONTEXTO_PADRAO = 3
+
+
+def _quebra_final(linha: str) -> str:
+    quebra = _QUEBRA_FINAL.search(linha)
+    return quebra.group() if quebra else ""
+
+
+class ErroGit(Exception):
+    """Falha ao executar o git ou ao interpretar sua saída."""
+
+
+def _executar_git(argumentos: list, repositorio: str, entrada: bytes = None) -> bytes:
+    try:
+        processo = subprocess.run(["git", *argumentos], cwd=repositorio, input=entrada, capture_output=True)
+    except FileNotFoundError:
+        raise ErroGit("o executável 'git' não foi encontrado")
+    if processo.returncode != 0:
+        mensagem = processo.stderr.decode('utf-8', 'replace').strip()
+        raise ErroGit(mensagem or f"git {' '.join(argumentos)} terminou com código {processo.returncode}")
+    return processo.stdout
+
+
+def _caminho_do_cabecalho(caminho: bytes) -> str | None:
+    """Extrai o caminho de uma linha '+++ b/caminho', que o git pode citar entre aspas."""
+    if caminho == b"/dev/null":
+        return None
+    if caminho.startswith(b'"') and caminho.endswith(b'"'):
+        caminho = codecs.escape_decode(caminho[1:-1])[0]
+    if caminho.startswith(b"b/"):
+        caminho = caminho[2:]
+    return os.fsdecode(caminho)
+
+
+def analisar_saida_diff(saida: bytes) -> dict:
+    """
+    Interpreta a saída de 'git diff --unified=0' e retorna, para cada arquivo
+    (caminho relativo à raiz do repositório), os intervalos (primeira, última)
+    de linhas adicionadas ou modificadas na versão nova. Hunks que apenas
+    removem linhas não produzem intervalos.
+    """
+    alteracoes = {}
+    atual = None
+    for linha in saida.split(b"\n"):
+        if linha.startswith(b"+++ "):
+            atual = _caminho_do_cabecalho(linha[4:].rstrip(b"\t"))
+            if atual is not None:
+                alteracoes.setdefault(atual, [])
+        elif linha.startswith(b"@@") and atual is not None:
+            hunk = _CABECALHO_HUNK.match(linha)
+            if hunk is None:
+                raise ErroGit(f"cabeçalho de hunk inesperado: {linha.decode('utf-8', 'replace')}")
+            inicio = int(hunk.group(1))
+            quantidade = int(hunk.group(2)) if hunk.group(2) is not None else 1
+            if quantidade:
+                alteracoes[atual].append((inicio, inicio + quantidade - 1))
+    return alteracoes
+
+
+class RecorteDiff:
+    """
+    Linhas alteradas de um arquivo e, se lido do git, o conteúdo da versão
+    nova. Permite analisar apenas os trechos alterados mais uma janela de
+    contexto e descartar achados fora das linhas alteradas.
+    """
+    __slots__ = ("intervalos", "contexto", "conteudo", "_inicios")
+
+    def __init__(self, intervalos: list, contexto: int = CONTEXTO_PADRAO, conteudo: str = None):
+        self.intervalos = sorted(intervalos)
+        self.contexto = contexto
+        self.conteudo = conteudo
+        self._inicios = [inicio for inicio, _ in self.intervalos]
+
+    def linha_alterada(self, numero_linha: int) -> bool:
+        indice = bisect_right(self._inicios, numero_linha) - 1
+        return indice >= 0 and numero_linha <= self.intervalos[indice][1]
+
+    def aplicar(self, php_code: str) -> str:
+        """
+        Retorna o código com as linhas fora dos trechos alterados (e de suas
+        janelas de contexto) esvaziadas. As quebras de linha são mantidas, de
+        modo que os números de linha dos achados continuam os mesmos.
+        """
+        linhas = php_code.splitlines(keepends=True)
+        partes = []
+        proxima = 0
+        for inicio, fim in self.intervalos:
+            primeira = max(proxima, inicio - 1 - self.contexto)
+            ultima = min(len(linhas), fim + self.contexto)
+            partes.extend(_quebra_final(linha) for linha in linhas[proxima:primeira])
+            partes.extend(linhas[primeira:ultima])
+            proxima = max(proxima, ultima)
+        partes.extend(_quebra_final(linha) for linha in linhas[proxima:])
+        return "".join(partes)
+
+
+def _ler_versoes(repositorio: str, revisao: str, caminhos: list) -> dict:
+    """Lê o conteúdo dos arquivos na revisão informada com um único 'git cat-file --batch'."""
+    entrada = "".join(f"{revisao}:{caminho}\n" for caminho in caminhos).encode('utf-8', 'surrogateescape')
+    saida = _executar_git(["cat-file", "--batch"], repositorio, entrada)
+    conteudos = {}
+    posicao = 0
+    for caminho in caminhos:
+        fim_cabecalho = saida.index(b"\n", posicao)
+        cabecalho = saida[posicao:fim_cabecalho].split()
+        posicao = fim_cabecalho + 1
+        if len(cabecalho) != 3:
+            continue
+        tamanho = int(cabecalho[2])
+        conteudos[caminho] = saida[posicao:posicao + tamanho].decode('utf-8', 'replace')
+        posicao += tamanho + 1
+    return conteudos
+
+
+def obter_alteracoes(intervalo: str, repositorio: str = None, contexto: int = CONTEXTO_PADRAO,
+                     caminhos=(), incluir=(), excluir=(), diretorios_ignorados=DIRETORIOS_IGNORADOS_PADRAO,
+                     extensoes=EXTENSOES_PHP) -> dict:
+    """
+    Retorna {caminho absoluto: RecorteDiff} dos arquivos PHP alterados.
+
+    'intervalo' segue a sintaxe do git diff: 'base..head', 'base...head'
+    (a partir do ancestral comum) ou apenas 'base', que compara com a árvore
+    de trabalho. Com 'head' informado, o conteúdo é lido do próprio git; sem
+    ele, os arquivos são lidos do disco. 'caminhos' restringe a análise aos
+    arquivos sob esses caminhos; os globs e diretórios ignorados seguem as
+    mesmas regras da descoberta de arquivos. Sem 'repositorio', usa o
+    repositório do primeiro caminho informado ou o do diretório atual.
+    """
+    if repositorio is None:
+        repositorio = "."
+        if caminhos:
+            repositorio = caminhos[0] if os.path.isdir(caminhos[0]) else (os.path.dirname(caminhos[0]) or ".")
+    raiz = os.fsdecode(_executar_git(["rev-parse", "--show-toplevel"], repositorio).strip())
+    saida = _executar_git(["-c", "core.quotepath=off", "diff", "--no-color", "--no-ext-diff", "--unified=0",
+                           "--diff-filter=d", "--src-prefix=a/", "--dst-prefix=b/", intervalo, "--"], raiz)
+    alteracoes = analisar_saida_diff(saida)
+
+    padroes_incluir = [compilar_glob(padrao) for padrao in incluir]
+    padroes_excluir = [compilar_glob(padrao) for padrao in excluir]
+    prefixos = [os.path.relpath(os.path.abspath(caminho), raiz).replace(os.sep, "/") for caminho in caminhos]
+
+    def aceito(relativo: str) -> bool:
+        if not relativo.lower().endswith(extensoes):
+            return False
+        if prefixos and not any(prefixo == "." or relativo == prefixo or relativo.startswith(prefixo + "/")
+                                for prefixo in prefixos):
+            return False
+        diretorios = relativo.split("/")[:-1]
+        if any(nome in diretorios_ignorados for nome in diretorios):
+            return False
+        if padroes_incluir and not any(padrao.match(relativo) for padrao in padroes_incluir):
+            return False
+        partes = relativo.split("/")
+        return not any(padrao.match("/".join(partes[:i])) for padrao in padroes_excluir
+                       for i in range(1, len(partes) + 1))
+
+    selecionados = {relativo: intervalos for relativo, intervalos in alteracoes.items()
+                    if intervalos and aceito(relativo)}
+
+    _, separador, head = intervalo.partition("...") if "..." in intervalo else intervalo.partition("..")
+    conteudos = {}
+    if separador and selecionados:
+        conteudos = _ler_versoes(raiz, head or "HEAD", list(selecionados))
+
+    return {
+        os.path.join(raiz, *relativo.split("/")): RecorteDiff(intervalos, contexto, conteudos.get(relativo))
+        for relativo, intervalos in selecionados.items()
+    }
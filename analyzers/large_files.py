@@ -0,0 +1,122 @@
+import os
+import re
+import sys
+from itertools import chain
+
+from analyzers.detector import contar_quebras_de_linha
+
+# Políticas para arquivos maiores que o tamanho máximo (--large-files).
+POLITICA_IGNORAR = "skip"
+POLITICA_AMOSTRAR = "sample"
+POLITICA_PARTES = "chunk"
+POLITICAS_ARQUIVOS_GRANDES = (POLITICA_IGNORAR, POLITICA_AMOSTRAR, POLITICA_PARTES)
+
+# Tamanho máximo, em bytes, quando uma política é escolhida sem --max-file-size.
+TAMANHO_MAXIMO_PADRAO = 1024 * 1024
+
+# Marcadores de código gerado, procurados nos primeiros caracteres do arquivo.
+_MARCADOR_GERADO = re.compile(r'@generated\b|\bDO NOT EDIT\b|(?i:\bauto-?generated\b)')
+INICIO_CLASSIFICACAO = 2048
+
+# Código com pelo menos TAMANHO_MINIMO_MINIFICADO caracteres e, em média,
+# MEDIA_LINHA_MINIFICADO caracteres por linha é considerado minificado.
+TAMANHO_MINIMO_MINIFICADO = 4096
+MEDIA_LINHA_MINIFICADO = 250
+
+CODIGO_GERADO = "gerado"
+CODIGO_MINIFICADO = "minificado"
+
+
+class ArquivoIgnorado(Exception):
+    """O arquivo não deve ser analisado; a mensagem traz o motivo."""
+
+
+def classificar_codigo(codigo: str) -> str | None:
+    """Retorna CODIGO_GERADO, CODIGO_MINIFICADO ou None para código escrito à mão."""
+    if _MARCADOR_GERADO.search(codigo, 0, INICIO_CLASSIFICACAO):
+        return CODIGO_GERADO
+    if len(codigo) >= TAMANHO_MINIMO_MINIFICADO \
+            and len(codigo) / (codigo.count("\n") + 1) >= MEDIA_LINHA_MINIFICADO:
+        return CODIGO_MINIFICADO
+    return None
+
+
+def ler_partes(file_path: str, tamanho_parte: int):
+    """
+    Gera (número da primeira linha, código) com partes de até 'tamanho_parte'
+    caracteres do arquivo, estendidas até o fim da linha (em até mais
+    'tamanho_parte' caracteres). Uma linha mais longa que isso é cortada, e
+    a parte seguinte começa no meio dela, com o mesmo número de linha.
+    """
+    linha = 1
+    with open(file_path, 'r', encoding='utf-8') as arquivo:
+        while True:
+            codigo = arquivo.read(tamanho_parte)
+            if not codigo:
+                return
+            if not codigo.endswith("\n"):
+                codigo += arquivo.readline(tamanho_parte)
+            yield linha, codigo
+            linha += contar_quebras_de_linha(codigo)
+
+
+class LeitorArquivos:
+    """
+    Lê os arquivos a analisar. Arquivos de até 'tamanho_maximo' bytes (ou
+    todos, sem limite) são lidos inteiros; os maiores seguem a 'politica':
+    - skip: são ignorados;
+    - chunk: são lidos e analisados em partes de cerca de 'tamanho_maximo'
+      caracteres (veja ler_partes), de modo que apenas uma parte fica em memória;
+    - sample: apenas a primeira e a última partes, de metade do tamanho,
+      são analisadas; as demais são lidas só para contar as linhas.
+    Com ignorar_gerados, arquivos com código gerado ou minificado (veja
+    classificar_codigo) também são ignorados.
+    """
+    def __init__(self, tamanho_maximo: int = None, politica: str = POLITICA_IGNORAR, ignorar_gerados: bool = False):
+        self.tamanho_maximo = tamanho_maximo
+        self.politica = politica
+        self.ignorar_gerados = ignorar_gerados
+
+    def ler(self, file_path: str) -> tuple:
+        """
+        Retorna (código, None) para os arquivos lidos inteiros ou (None,
+        partes) para os maiores que o limite, em que 'partes' gera (número da
+        primeira linha, código), como ler_partes. Lança ArquivoIgnorado para os
+        arquivos que não devem ser analisados e os erros de leitura (OSError,
+        UnicodeDecodeError), inclusive ao percorrer as partes.
+        """
+        if self.tamanho_maximo is not None:
+            tamanho = os.path.getsize(file_path)
+            if tamanho > self.tamanho_maximo:
+                if self.politica == POLITICA_IGNORAR:
+                    raise ArquivoIgnorado(f"{tamanho} bytes excedem o limite de {self.tamanho_maximo} bytes")
+                partes = self._partes(file_path)
+                primeira = next(partes)
+                self._verificar_gerado(primeira[1])
+                descricao = "por amostragem (início e fim)" if self.politica == POLITICA_AMOSTRAR else "em partes"
+                print(f"Aviso: Arquivo '{file_path}' com {tamanho} bytes analisado {descricao}.", file=sys.stderr)
+                return None, chain([primeira], partes)
+
+        with open(file_path, 'r', encoding='utf-8') as arquivo:
+            codigo = arquivo.read()
+        self._verificar_gerado(codigo)
+        return codigo, None
+
+    def _partes(self, file_path: str):
+        if self.politica != POLITICA_AMOSTRAR:
+            yield from ler_partes(file_path, max(1, self.tamanho_maximo))
+            return
+        ultima = None
+        for numero, parte in enumerate(ler_partes(file_path, max(1, self.tamanho_maximo // 2))):
+            if numero == 0:
+                yield parte
+            else:
+                ultima = parte
+        if ultima is not None:
+            yield ultima
+
+    def _verificar_gerado(self, codigo: str):
+        if self.ignorar_gerados:
+            tipo = classificar_codigo(codigo)
+            if tipo is not None:
+                raise ArquivoIgnorado(f"código {tipo}")
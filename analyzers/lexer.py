@@ -0,0 +1,206 @@
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+# Tipos de token produzidos por tokenizar().
+HTML = "html"
+ABRE_TAG = "abre_tag"
+FECHA_TAG = "fecha_tag"
+COMENTARIO = "comentario"
+STRING = "string"
+HEREDOC = "heredoc"
+VARIAVEL = "variavel"
+IDENTIFICADOR = "identificador"
+NUMERO = "numero"
+OPERADOR = "operador"
+
+# Quantidade de arquivos cujo resultado fica guardado em memória; o mesmo
+# conteúdo é processado uma única vez mesmo que vários estágios o peçam.
+TAMANHO_CACHE_LEXICO = 32
+
+_ABRE_TAG = re.compile(r'<\?(?:php(?=\s)|php\Z|=)', re.IGNORECASE)
+
+# Nome PHP: letra ASCII, '_' ou qualquer caractere não ASCII, seguido também de
+# dígitos. Escrito como classes negadas de faixas ASCII, que compilam muito mais
+# rápido que '[A-Za-z_\x80-\U0010ffff][\w\x80-\U0010ffff]*', a forma equivalente
+# (o '\w' Unicode, combinado à faixa, gera uma tabela enorme ao importar o módulo).
+_NOME = r'[^\x00-\x40\x5b-\x5e\x60\x7b-\x7f][^\x00-\x2f\x3a-\x40\x5b-\x5e\x60\x7b-\x7f]*'
+
+# Strings com aspas simples, duplas e crases; aceitam ficar sem fechamento no fim do arquivo.
+_STRINGS = r"""
+    '[^'\\]*+(?:\\.[^'\\]*+)*+'?
+  | "[^"\\]*+(?:\\.[^"\\]*+)*+"?
+  | `[^`\\]*+(?:\\.[^`\\]*+)*+`?
+"""
+
+# Heredoc e nowdoc: o identificador de fechamento pode estar indentado (PHP 7.3+).
+_HEREDOC = r"""<<<[ \t]*(?P<aspas_heredoc>["']?)(?P<rotulo_heredoc>[A-Za-z_]\w*)(?P=aspas_heredoc)\r?\n
+    (?:.*?\n)??[ \t]*(?P=rotulo_heredoc)\b"""
+
+# Comentários; os de linha terminam na quebra de linha ou no '?>' que fecha o bloco PHP.
+_COMENTARIOS = r"""
+    /\*.*?(?:\*/|\Z)
+  | (?://|\#(?!\[))[^\r\n?]*+(?:\?(?!>)[^\r\n?]*+)*+
+"""
+
+# Cada token consome também os espaços em branco que o seguem, evitando uma
+# iteração à parte para eles.
+_TOKEN_PHP = re.compile(rf"""
+    (?:
+    (?P<{COMENTARIO}>{_COMENTARIOS})
+  | (?P<{FECHA_TAG}>\?>(?:\r?\n)?)
+  | (?P<{HEREDOC}>{_HEREDOC})
+  | (?P<{STRING}>{_STRINGS})
+  | (?P<{VARIAVEL}>\${_NOME})
+  | (?P<{IDENTIFICADOR}>\\?{_NOME}(?:\\{_NOME})*)
+  | (?P<{NUMERO}>0[xX][0-9a-fA-F_]+|0[bB][01_]+|\d[\d_]*(?:\.[\d_]*)?(?:[eE][+-]?\d+)?|\.\d[\d_]*(?:[eE][+-]?\d+)?)
+  | (?P<{OPERADOR}>
+        <<=|>>=|\*\*=|\.\.\.|<=>|===|!==|\?\?=|\?->
+      | ->|=>|::|\+\+|--|==|!=|<>|<=|>=|&&|\|\||\?\?|<<|>>|\*\*|[-+*/.%&|^]=
+      | .)
+    )\s*
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+_ESPACOS = re.compile(r'\s*')
+
+# Trecho de código PHP até o próximo comentário, consumido sem criar tokens.
+# Strings, heredocs e HTML entre '?>' e a próxima abertura de tag são
+# atravessados para que marcadores de comentário dentro deles sejam ignorados.
+_ATE_COMENTARIO = re.compile(rf"""
+    (?:
+        [^'"`/\#<?]++
+      | {_STRINGS}
+      | {_HEREDOC}
+      | \?>.*?(?:<\?(?:php(?=\s)|php\Z|=)|\Z)
+      | /(?![/*])
+      | \#\[
+      | [<?]
+    )*+
+    (?P<comentario>{_COMENTARIOS})?
+""", re.VERBOSE | re.DOTALL | re.MULTILINE | re.IGNORECASE)
+
+# Quebras de linha reconhecidas por str.splitlines(), e trechos sem nenhuma delas.
+_QUEBRA_DE_LINHA = re.compile(r'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+_NAO_QUEBRA = re.compile(r'[^\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]+')
+
+# Variáveis interpoladas em strings com aspas duplas e heredocs (usadas também
+# pela análise de fluxo de dados).
+INTERPOLACAO = re.compile(rf'(?<!\\)\${_NOME}')
+
+
+def _espacos(trecho: re.Match) -> str:
+    return " " * (trecho.end() - trecho.start())
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_LEXICO)
+def remover_comentarios(codigo: str, fim: int = None) -> str:
+    """
+    Retorna o código com os comentários PHP substituídos por espaços. As
+    quebras de linha são mantidas e o texto tem o mesmo tamanho do original,
+    de modo que deslocamentos e números de linha não mudam. Sem comentários,
+    retorna o próprio objeto recebido. O HTML antes da primeira abertura de
+    tag não é alterado. Com 'fim', a busca termina no primeiro comentário que
+    acaba depois dessa posição, e os seguintes são mantidos.
+    """
+    abertura = _ABRE_TAG.search(codigo)
+    if abertura is None:
+        return codigo
+
+    partes = []
+    anterior = 0
+    pos = abertura.end()
+    fim = len(codigo) if fim is None else min(fim, len(codigo))
+    while pos < fim:
+        trecho = _ATE_COMENTARIO.match(codigo, pos)
+        comentario = trecho.group("comentario")
+        if comentario is None:
+            break
+        inicio = trecho.start("comentario")
+        partes.append(codigo[anterior:inicio])
+        partes.append(_NAO_QUEBRA.sub(_espacos, comentario))
+        anterior = pos = trecho.end()
+
+    if not partes:
+        return codigo
+    partes.append(codigo[anterior:])
+    return "".join(partes)
+
+
+class TokensPHP:
+    """
+    Tokens de um arquivo PHP, na forma (tipo, texto, deslocamento), sem os
+    espaços em branco, e o índice das ocorrências de cada nome.
+    """
+    __slots__ = ("codigo", "tokens", "_inicios_linha", "_indice")
+
+    def __init__(self, codigo: str, tokens: list, indice: dict):
+        self.codigo = codigo
+        self.tokens = tokens
+        self._inicios_linha = None
+        self._indice = indice
+
+    def linha(self, deslocamento: int) -> int:
+        """Número da linha (base um) de um deslocamento do código."""
+        if self._inicios_linha is None:
+            self._inicios_linha = [0] + [quebra.end() for quebra in _QUEBRA_DE_LINHA.finditer(self.codigo)]
+        return bisect_right(self._inicios_linha, deslocamento)
+
+    def indice(self) -> dict:
+        """
+        Mapeia cada nome para as ocorrências (índice do token, deslocamento).
+        Identificadores são normalizados em minúsculas, como funções e
+        palavras reservadas do PHP; variáveis mantêm o '$' e a caixa. Variáveis
+        interpoladas em strings com aspas duplas e heredocs também entram no
+        índice, apontando para o token da string.
+        """
+        return self._indice
+
+    def vizinho(self, posicao: int, passo: int):
+        """Retorna o token significativo (que não é comentário) antes ou depois da posição, ou None."""
+        posicao += passo
+        while 0 <= posicao < len(self.tokens):
+            if self.tokens[posicao][0] != COMENTARIO:
+                return self.tokens[posicao]
+            posicao += passo
+        return None
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_LEXICO)
+def tokenizar(codigo: str) -> TokensPHP:
+    """
+    Divide o código PHP em tokens. O texto fora das tags '<?php'/'<?=' e
+    '?>' vira tokens HTML. O resultado é guardado em memória para os últimos
+    arquivos processados.
+    """
+    tokens = []
+    indice = {}
+    adicionar = tokens.append
+    pos = 0
+    tamanho = len(codigo)
+    while pos < tamanho:
+        abertura = _ABRE_TAG.search(codigo, pos)
+        if abertura is None:
+            adicionar((HTML, codigo[pos:], pos))
+            break
+        if abertura.start() > pos:
+            adicionar((HTML, codigo[pos:abertura.start()], pos))
+        adicionar((ABRE_TAG, abertura.group(), abertura.start()))
+
+        pos = _ESPACOS.match(codigo, abertura.end()).end()
+        leitor = _TOKEN_PHP.scanner(codigo, pos)
+        for token in iter(leitor.match, None):
+            tipo = token.lastgroup
+            texto = token.group(tipo)
+            deslocamento = token.start()
+            pos = token.end()
+            if tipo == IDENTIFICADOR:
+                indice.setdefault(texto.lstrip("\\").lower(), []).append((len(tokens), deslocamento))
+            elif tipo == VARIAVEL:
+                indice.setdefault(texto, []).append((len(tokens), deslocamento))
+            elif (tipo == STRING and texto[0] == '"') or (tipo == HEREDOC and "'" not in texto[:texto.index("\n")]):
+                for variavel in INTERPOLACAO.finditer(texto):
+                    indice.setdefault(variavel.group(), []).append((len(tokens), deslocamento + variavel.start()))
+            adicionar((tipo, texto, deslocamento))
+            if tipo == FECHA_TAG:
+                break
+    return TokensPHP(codigo, tokens, indice)
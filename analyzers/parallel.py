@@ -0,0 +1,174 @@
+import os
+from collections import deque
+from collections.abc import Sized
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from analyzers.cache import CacheAnalise, calcular_hash_conteudo
+from analyzers.large_files import ArquivoIgnorado, LeitorArquivos
+from analyzers.registry import RegistroRegras
+from analyzers.profiling import ColetorEventosPerfil, repassar_eventos
+
+# Registro de regras próprio de cada processo de trabalho, criado uma única vez
+# no inicializador do pool e reutilizado em todos os lotes recebidos; os
+# detectores de cada extensão são compilados quando ela aparece.
+_registro = None
+
+# Leitor dos arquivos, com o tamanho máximo e a política do processo principal.
+_leitor = None
+
+# Conexão de leitura ao cache de análise e opções do detector no processo de
+# trabalho. As gravações ficam a cargo do processo principal.
+_cache = None
+_opcoes_detector = None
+
+# Hash das regras dos pacotes de cada extensão -> assinatura no cache.
+_assinaturas = {}
+
+# Coletor das medições de perfil do processo de trabalho, quando solicitadas.
+_coletor_perfil = None
+
+# Limite de arquivos por lote enviado a um processo de trabalho.
+TAMANHO_MAXIMO_LOTE = 64
+
+# Tamanho dos lotes quando os arquivos chegam de um gerador, cujo total não
+# é conhecido de antemão.
+TAMANHO_LOTE_FLUXO = 16
+
+# Lotes enviados por processo antes de aguardar o primeiro resultado; limita
+# o quanto do gerador de arquivos é consumido à frente da análise.
+LOTES_PENDENTES_POR_PROCESSO = 4
+
+
+def _inicializar_worker(vul_config_path: str, opcoes_detector: dict, cache_path: str = None,
+                        coletar_perfil: bool = False, opcoes_leitura: dict = None):
+    """Carrega os pacotes de regras no processo de trabalho."""
+    global _registro, _leitor, _cache, _opcoes_detector, _coletor_perfil
+    # Os avisos sobre as regras já foram exibidos pelo processo principal.
+    _registro = RegistroRegras(vul_config_path, opcoes_detector, verificar_regras=False)
+    _leitor = LeitorArquivos(**(opcoes_leitura or {}))
+    if coletar_perfil:
+        _coletor_perfil = ColetorEventosPerfil()
+        _registro.adicionar_gancho_perfil(_coletor_perfil)
+    if cache_path:
+        _cache = CacheAnalise(cache_path, somente_leitura=True)
+        _opcoes_detector = opcoes_detector
+
+
+def _assinatura_regras(file_path: str) -> str:
+    """Assinatura no cache das regras que se aplicam ao arquivo, como no processo principal."""
+    hash_regras = _registro.obter_hash_regras(file_path)
+    assinatura = _assinaturas.get(hash_regras)
+    if assinatura is None:
+        assinatura = _assinaturas[hash_regras] = CacheAnalise.assinatura_regras(hash_regras, _opcoes_detector)
+    return assinatura
+
+
+def _analisar_lote(file_paths: list) -> tuple:
+    """
+    Analisa um lote de arquivos no processo de trabalho.
+    Retorna a lista de resultados e os eventos de perfil coletados no lote.
+    Cada resultado é a tupla (caminho, mensagem de erro, achados, hash do
+    conteúdo, veio do cache, diagnósticos, dependências), com os achados na
+    forma compacta produzida pelo detector, os diagnósticos das regras
+    interrompidas pelo tempo limite e os arquivos incluídos dos quais os
+    achados dependem. O hash só é preenchido quando o cache está ativo e o
+    arquivo foi lido inteiro; o processo principal grava os achados novos e
+    registra o acesso aos reaproveitados.
+    """
+    resultados = []
+    for file_path in file_paths:
+        detector = _registro.detector_para(file_path)
+        if detector is None:
+            resultados.append((file_path, f"Aviso: Nenhum pacote de regras se aplica a '{file_path}'. Ignorando.",
+                               [], None, False, [], {}))
+            continue
+        if not os.path.exists(file_path):
+            resultados.append((file_path, f"Erro: Arquivo '{file_path}' não encontrado.", [], None, False, [], {}))
+            continue
+        try:
+            php_code, partes = _leitor.ler(file_path)
+        except ArquivoIgnorado as e:
+            resultados.append((file_path, f"Aviso: Arquivo '{file_path}' ignorado: {e}.", [], None, False, [], {}))
+            continue
+        except Exception as e:
+            resultados.append((file_path, f"Erro ao ler o arquivo '{file_path}': {e}", [], None, False, [], {}))
+            continue
+
+        if partes is not None:
+            try:
+                achados = detector.detectar_achados_partes(partes, file_path)
+            except (OSError, UnicodeDecodeError) as e:
+                detector.retirar_diagnosticos()
+                detector.retirar_dependencias()
+                resultados.append((file_path, f"Erro ao ler o arquivo '{file_path}': {e}", [], None, False, [], {}))
+                continue
+            resultados.append((file_path, None, achados, None, False, detector.retirar_diagnosticos(),
+                               detector.retirar_dependencias()))
+            continue
+
+        if _cache is None:
+            achados = detector.detectar_achados(php_code, file_path)
+            resultados.append((file_path, None, achados, None, False, detector.retirar_diagnosticos(),
+                               detector.retirar_dependencias()))
+            continue
+
+        hash_conteudo = calcular_hash_conteudo(php_code)
+        achados = _cache.obter(hash_conteudo, _assinatura_regras(file_path), file_path)
+        if achados is not None:
+            resultados.append((file_path, None, achados, hash_conteudo, True, [], {}))
+        else:
+            achados = detector.detectar_achados(php_code, file_path)
+            resultados.append((file_path, None, achados, hash_conteudo, False, detector.retirar_diagnosticos(),
+                               detector.retirar_dependencias()))
+    eventos_perfil = _coletor_perfil.retirar_eventos() if _coletor_perfil is not None else []
+    return resultados, eventos_perfil
+
+
+def _dividir_em_lotes(file_paths, tamanho_lote: int):
+    iterador = iter(file_paths)
+    while lote := list(islice(iterador, tamanho_lote)):
+        yield lote
+
+
+def analisar_em_paralelo(vul_config_path: str, file_paths, jobs: int, opcoes_detector: dict = None,
+                         cache_path: str = None, ganchos_perfil: list = None, opcoes_leitura: dict = None):
+    """
+    Distribui os arquivos em lotes entre 'jobs' processos de trabalho, cada um
+    com um registro de regras criado com as mesmas opções do processo principal.
+    Gera as tuplas (caminho, mensagem de erro, achados, hash do conteúdo,
+    veio do cache, diagnósticos, dependências) na mesma ordem da entrada,
+    independentemente da ordem em que os lotes terminam. As medições de
+    perfil dos processos de trabalho são repassadas aos ganchos informados.
+    'opcoes_leitura' são os parâmetros do LeitorArquivos de cada processo.
+
+    'file_paths' pode ser uma lista ou um gerador; os lotes são enviados aos
+    poucos, de modo que a análise começa antes de o gerador terminar. Se o
+    consumidor parar antes do fim, os lotes que ainda não começaram são
+    cancelados.
+    """
+    if isinstance(file_paths, Sized):
+        tamanho_lote = max(1, min(TAMANHO_MAXIMO_LOTE, len(file_paths) // (jobs * 4)))
+    else:
+        tamanho_lote = TAMANHO_LOTE_FLUXO
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_inicializar_worker,
+                             initargs=(vul_config_path, opcoes_detector or {}, cache_path,
+                                       bool(ganchos_perfil), opcoes_leitura)) as executor:
+        pendentes = deque()
+        try:
+            for lote in _dividir_em_lotes(file_paths, tamanho_lote):
+                pendentes.append(executor.submit(_analisar_lote, lote))
+                if len(pendentes) >= jobs * LOTES_PENDENTES_POR_PROCESSO:
+                    yield from _resultados_do_lote(pendentes.popleft(), ganchos_perfil)
+            while pendentes:
+                yield from _resultados_do_lote(pendentes.popleft(), ganchos_perfil)
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
+
+
+def _resultados_do_lote(futuro, ganchos_perfil: list):
+    resultados, eventos_perfil = futuro.result()
+    repassar_eventos(eventos_perfil, ganchos_perfil or [])
+    yield from resultados
@@ -0,0 +1,134 @@
+import importlib
+import json
+import os
+
+# Nome usado nas medições para o tempo gasto no pré-filtro de palavras-chave,
+# que é compartilhado por todas as regras.
+PREFILTRO = "<pré-filtro de palavras-chave>"
+
+# Nome usado para o tempo do analisador léxico (remoção de comentários e
+# tokenização), também compartilhado pelas regras.
+LEXICO = "<analisador léxico>"
+
+# Nome usado para a análise de fluxo de dados, que avalia todas as regras
+# 'taint' de uma só vez.
+FLUXO_DE_DADOS = "<análise de fluxo de dados>"
+
+# Nome usado para a expressão combinada, que avalia de uma só vez, em cada
+# linha, as regras sem palavras-chave.
+EXPRESSAO_COMBINADA = "<expressão combinada>"
+
+
+class GanchoPerfil:
+    """
+    Interface para receber as medições do detector. Implementações podem
+    encaminhar os contadores para sistemas de métricas externos; os métodos
+    padrão não fazem nada.
+    """
+    def registrar_regra(self, file_path: str, vul_name: str, segundos: float, linhas: int, ocorrencias: int):
+        """Chamado uma vez por regra avaliada em cada arquivo."""
+
+    def registrar_arquivo(self, file_path: str, segundos: float, linhas: int, ocorrencias: int):
+        """Chamado uma vez por arquivo analisado, com os totais da detecção."""
+
+
+class ColetorEventosPerfil(GanchoPerfil):
+    """
+    Registra as chamadas recebidas como eventos serializáveis, para que sejam
+    repassadas aos ganchos de outro processo (análise paralela).
+    """
+    def __init__(self):
+        self.eventos = []
+
+    def registrar_regra(self, file_path, vul_name, segundos, linhas, ocorrencias):
+        self.eventos.append(("regra", file_path, vul_name, segundos, linhas, ocorrencias))
+
+    def registrar_arquivo(self, file_path, segundos, linhas, ocorrencias):
+        self.eventos.append(("arquivo", file_path, segundos, linhas, ocorrencias))
+
+    def retirar_eventos(self) -> list:
+        eventos, self.eventos = self.eventos, []
+        return eventos
+
+
+def repassar_eventos(eventos: list, ganchos: list):
+    """Reproduz, nos ganchos informados, os eventos de um ColetorEventosPerfil."""
+    for evento in eventos:
+        for gancho in ganchos:
+            if evento[0] == "regra":
+                gancho.registrar_regra(*evento[1:])
+            else:
+                gancho.registrar_arquivo(*evento[1:])
+
+
+class PerfilAnalise(GanchoPerfil):
+    """
+    Acumula tempo, linhas examinadas e ocorrências por regra e por arquivo,
+    e gera o resumo exibido pela opção --profile.
+    """
+    def __init__(self):
+        # nome da regra -> [segundos, linhas examinadas, ocorrências, arquivos]
+        self.por_regra = {}
+        # caminho do arquivo -> [segundos, linhas, ocorrências]
+        self.por_arquivo = {}
+        # (caminho do arquivo, nome da regra) -> [segundos, linhas examinadas, ocorrências]
+        self.por_regra_e_arquivo = {}
+
+    def registrar_regra(self, file_path, vul_name, segundos, linhas, ocorrencias):
+        totais = self.por_regra.setdefault(vul_name, [0.0, 0, 0, 0])
+        totais[0] += segundos
+        totais[1] += linhas
+        totais[2] += ocorrencias
+        totais[3] += 1
+        self.por_regra_e_arquivo[(file_path, vul_name)] = [segundos, linhas, ocorrencias]
+
+    def registrar_arquivo(self, file_path, segundos, linhas, ocorrencias):
+        self.por_arquivo[file_path] = [segundos, linhas, ocorrencias]
+
+    def exibir_resumo(self, limite: int = 10):
+        """Exibe as regras e os arquivos mais lentos."""
+        print(f"\nPerfil da análise - {limite} regra(s) mais lenta(s):")
+        regras = sorted(self.por_regra.items(), key=lambda item: item[1][0], reverse=True)[:limite]
+        for vul_name, (segundos, linhas, ocorrencias, arquivos) in regras:
+            print(f"- {vul_name}: {segundos:.4f}s em {arquivos} arquivo(s), "
+                  f"{linhas} linha(s) examinada(s), {ocorrencias} ocorrência(s)")
+
+        print(f"\nPerfil da análise - {limite} arquivo(s) mais lento(s):")
+        arquivos = sorted(self.por_arquivo.items(), key=lambda item: item[1][0], reverse=True)[:limite]
+        for file_path, (segundos, linhas, ocorrencias) in arquivos:
+            print(f"- {file_path}: {segundos:.4f}s, {linhas} linha(s), {ocorrencias} ocorrência(s)")
+
+    def exportar_json(self, caminho: str):
+        """Grava todas as medições em um arquivo JSON."""
+        dados = {
+            "regras": [
+                {"regra": vul_name, "segundos": segundos, "linhas_examinadas": linhas,
+                 "ocorrencias": ocorrencias, "arquivos": arquivos}
+                for vul_name, (segundos, linhas, ocorrencias, arquivos) in self.por_regra.items()
+            ],
+            "arquivos": [
+                {"arquivo": file_path, "segundos": segundos, "linhas": linhas, "ocorrencias": ocorrencias}
+                for file_path, (segundos, linhas, ocorrencias) in self.por_arquivo.items()
+            ],
+            "regras_por_arquivo": [
+                {"arquivo": file_path, "regra": vul_name, "segundos": segundos,
+                 "linhas_examinadas": linhas, "ocorrencias": ocorrencias}
+                for (file_path, vul_name), (segundos, linhas, ocorrencias) in self.por_regra_e_arquivo.items()
+            ],
+        }
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+        print(f"Perfil da análise gravado em: {caminho}")
+
+
+def carregar_gancho(especificacao: str) -> GanchoPerfil:
+    """
+    Instancia um gancho a partir de 'modulo:Classe', por exemplo
+    'metricas.statsd:GanchoStatsd'. A classe é chamada sem argumentos.
+    """
+    nome_modulo, _, nome_classe = especificacao.partition(":")
+    if not nome_modulo or not nome_classe:
+        raise ValueError(f"Gancho de perfil inválido '{especificacao}'. Use o formato modulo:Classe.")
+    return getattr(importlib.import_module(nome_modulo), nome_classe)()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+
+from config import Configuracao, ConfiguracaoCombinada
+from analyzers.detector import DetectorVulnerabilidade
+from analyzers.profiling import GanchoPerfil
+
+# Diretório com os pacotes de regras distribuídos com a ferramenta.
+DIRETORIO_REGRAS_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Vul")
+
+
+def resolver_pacotes_regras(caminhos) -> list[str]:
+    """
+    Retorna os arquivos de pacotes de regras a partir de um caminho ou de uma
+    lista de caminhos: arquivos são usados como estão; de diretórios, entram
+    os arquivos .json, em ordem alfabética.
+    """
+    if isinstance(caminhos, str):
+        caminhos = [caminhos]
+    pacotes = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            pacotes.extend(sorted(os.path.join(caminho, nome) for nome in os.listdir(caminho)
+                                  if nome.lower().endswith(".json") and os.path.isfile(os.path.join(caminho, nome))))
+        else:
+            pacotes.append(caminho)
+    return pacotes
+
+
+def extensao_arquivo(file_path: str) -> str:
+    return os.path.splitext(file_path)[1].lower()
+
+
+class RegistroRegras:
+    """
+    Carrega vários pacotes de regras (veja Configuracao) e indexa-os pela
+    extensão dos arquivos a que se aplicam. Cada arquivo é analisado por um
+    detector com apenas as regras dos pacotes da sua extensão; os detectores
+    são compilados na primeira vez em que uma extensão aparece e compartilhados
+    pelas extensões com o mesmo conjunto de pacotes. Assim, um pacote a mais só
+    custa nos arquivos aos quais ele se aplica.
+    """
+    def __init__(self, caminhos_regras, opcoes_detector: dict = None, verificar_regras: bool = True):
+        self.caminhos_pacotes = resolver_pacotes_regras(caminhos_regras)
+        self.opcoes_detector = opcoes_detector or {}
+        self.pacotes = [Configuracao(caminho, verificar_regras=verificar_regras) for caminho in self.caminhos_pacotes]
+        # extensão -> índices dos pacotes que se aplicam a ela
+        self.pacotes_por_extensao = {}
+        for indice, pacote in enumerate(self.pacotes):
+            for extensao in pacote.extensoes:
+                self.pacotes_por_extensao.setdefault(extensao, []).append(indice)
+        self.pacotes_por_extensao = {extensao: tuple(indices) for extensao, indices in self.pacotes_por_extensao.items()}
+        self.extensoes = tuple(sorted(self.pacotes_por_extensao))
+        self.ganchos_perfil = []
+        # índices dos pacotes -> detector; extensão -> detector (ou None, sem pacotes)
+        self._detectores = {}
+        self._detector_por_extensao = {}
+        self._hash_regras = None
+        # índices dos pacotes -> hash das suas regras
+        self._hashes_pacotes = {}
+
+    @property
+    def detectores(self) -> list[DetectorVulnerabilidade]:
+        """Detectores já compilados."""
+        return list(self._detectores.values())
+
+    @property
+    def total_regras(self) -> int:
+        return sum(len(pacote.patterns) for pacote in self.pacotes)
+
+    def detector_para(self, file_path: str) -> DetectorVulnerabilidade | None:
+        """Retorna o detector com as regras que se aplicam ao arquivo, ou None se nenhum pacote se aplicar."""
+        extensao = extensao_arquivo(file_path)
+        try:
+            return self._detector_por_extensao[extensao]
+        except KeyError:
+            pass
+        indices = self.pacotes_por_extensao.get(extensao)
+        detector = None
+        if indices is not None:
+            detector = self._detectores.get(indices)
+            if detector is None:
+                detector = self._detectores[indices] = self._criar_detector(indices)
+        self._detector_por_extensao[extensao] = detector
+        return detector
+
+    def _criar_detector(self, indices: tuple) -> DetectorVulnerabilidade:
+        if len(indices) == 1:
+            configuracao = self.pacotes[indices[0]]
+        else:
+            configuracao = ConfiguracaoCombinada(self.pacotes[indice] for indice in indices)
+        detector = DetectorVulnerabilidade(configuracao, **self.opcoes_detector)
+        for gancho in self.ganchos_perfil:
+            detector.adicionar_gancho_perfil(gancho)
+        return detector
+
+    def adicionar_gancho_perfil(self, gancho: GanchoPerfil):
+        """Registra o gancho de perfil nos detectores já compilados e nos que ainda serão."""
+        self.ganchos_perfil.append(gancho)
+        for detector in self._detectores.values():
+            detector.adicionar_gancho_perfil(gancho)
+
+    def retirar_diagnosticos(self) -> list[tuple]:
+        """Retorna e limpa os diagnósticos acumulados por todos os detectores."""
+        diagnosticos = []
+        for detector in self._detectores.values():
+            diagnosticos.extend(detector.retirar_diagnosticos())
+        return diagnosticos
+
+    def obter_hash_regras(self, file_path: str = None) -> str:
+        """
+        Hash do conjunto de pacotes e das extensões a que cada um se aplica.
+        Com 'file_path', apenas dos pacotes que se aplicam ao arquivo (os do
+        detector_para), usado para que o cache de resultados não reaproveite,
+        para um arquivo, achados obtidos com as regras de outra extensão.
+        """
+        if file_path is not None:
+            indices = self.pacotes_por_extensao.get(extensao_arquivo(file_path), ())
+            hash_pacotes = self._hashes_pacotes.get(indices)
+            if hash_pacotes is None:
+                conteudo = json.dumps([[self.pacotes[indice].obter_hash_regras(), self.pacotes[indice].linguagem]
+                                       for indice in indices])
+                hash_pacotes = self._hashes_pacotes[indices] = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+            return hash_pacotes
+        if self._hash_regras is None:
+            conteudo = json.dumps([[pacote.obter_hash_regras(), pacote.linguagem, list(pacote.extensoes)]
+                                   for pacote in self.pacotes])
+            self._hash_regras = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+        return self._hash_regras
+
+    def padroes_e_diagnosticos(self) -> tuple[dict, dict]:
+        """Regras e diagnósticos de todos os pacotes, para o relatório de --lint-rules."""
+        patterns, diagnosticos = {}, {}
+        for pacote in self.pacotes:
+            patterns.update(pacote.patterns)
+            diagnosticos.update(pacote.diagnosticos_regras)
+        return patterns, diagnosticos
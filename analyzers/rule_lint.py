@@ -0,0 +1,358 @@
+import re
+import signal
+import threading
+import time
+
+from re import _parser as sre_parse
+
+# Níveis de risco dos diagnósticos, do mais grave para o menos grave.
+RISCO_ALTO = "alto"
+RISCO_MEDIO = "médio"
+RISCO_BAIXO = "baixo"
+
+_REPETICOES = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT)
+
+# Tamanhos das entradas adversariais; a razão entre os tempos de tamanhos
+# consecutivos estima o crescimento do custo da regra.
+TAMANHOS_ADVERSARIAIS = (2000, 4000, 8000)
+
+# Tempo a partir do qual uma regra é considerada lenta em uma entrada adversarial.
+TEMPO_LENTO_SEGUNDOS = 0.05
+
+# Tempo máximo de cada medição; acima disso a regra é considerada travada.
+TEMPO_MAXIMO_MEDICAO = 2.0
+
+
+class TempoEsgotadoRegra(Exception):
+    """Lançada quando a avaliação de uma regra excede o tempo disponível."""
+
+
+def _eh_ilimitada(op, av) -> bool:
+    return op in _REPETICOES and av[1] == sre_parse.MAXREPEAT
+
+
+def _subsequencias(op, av) -> list:
+    """Retorna as subsequências de um nó da árvore da expressão."""
+    if op in _REPETICOES:
+        return [av[2]]
+    if op == sre_parse.SUBPATTERN:
+        return [av[3]]
+    if op == sre_parse.ATOMIC_GROUP:
+        return [av]
+    if op == sre_parse.BRANCH:
+        return list(av[1])
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [av[1]]
+    return []
+
+
+def _eh_curinga(items) -> bool:
+    """Indica se a sequência é um único '.' ou uma classe negada ampla."""
+    if len(items) != 1:
+        return False
+    op, av = items[0]
+    if op == sre_parse.ANY:
+        return True
+    return op == sre_parse.IN and av and av[0][0] == sre_parse.NEGATE
+
+
+def _verificar_sequencia(items, diagnosticos: list, dentro_de_repeticao: bool):
+    curingas_ilimitados = 0
+    for op, av in items:
+        if _eh_ilimitada(op, av):
+            if dentro_de_repeticao:
+                diagnosticos.append((RISCO_ALTO, "quantificador ilimitado aninhado em outro quantificador "
+                                                 "(risco de backtracking exponencial)"))
+            if _eh_curinga(av[2]):
+                curingas_ilimitados += 1
+            _verificar_sequencia(av[2], diagnosticos, True)
+            continue
+        if op in _REPETICOES:
+            # Repetição limitada com mais de uma ocorrência ainda multiplica os caminhos internos.
+            _verificar_sequencia(av[2], diagnosticos, dentro_de_repeticao or av[1] > 1)
+            continue
+        for sub in _subsequencias(op, av):
+            _verificar_sequencia(sub, diagnosticos, dentro_de_repeticao)
+
+    if curingas_ilimitados > 1:
+        diagnosticos.append((RISCO_MEDIO, f"{curingas_ilimitados} curingas ilimitados ('.*', '.+') na mesma "
+                                          "alternativa (custo polinomial em linhas longas)"))
+    elif curingas_ilimitados == 1:
+        diagnosticos.append((RISCO_BAIXO, "curinga ilimitado ('.*', '.+'); prefira uma classe negada ou um "
+                                          "limite explícito, como [^)]{0,200}"))
+
+
+def analisar_padrao(pattern_str: str) -> list[tuple]:
+    """
+    Analisa estaticamente um padrão e retorna diagnósticos (risco, mensagem)
+    sobre construções propensas a backtracking catastrófico.
+    """
+    try:
+        parsed = sre_parse.parse(pattern_str)
+    except re.error as e:
+        return [(RISCO_ALTO, f"expressão regular inválida: {e}")]
+
+    diagnosticos = []
+    items = list(parsed)
+    alternativas = items[0][1][1] if len(items) == 1 and items[0][0] == sre_parse.BRANCH else [items]
+    for alternativa in alternativas:
+        _verificar_sequencia(list(alternativa), diagnosticos, False)
+
+    # Diagnósticos iguais de alternativas diferentes são informados uma só vez.
+    return list(dict.fromkeys(diagnosticos))
+
+
+def analisar_regras(regras: dict) -> dict:
+    """
+    Aplica analisar_padrao a cada regra (nome -> detalhes) e retorna os
+    diagnósticos das regras com algum problema.
+    """
+    resultado = {}
+    for vul_name, details in regras.items():
+        pattern_str = details.get('pattern', '')
+        if pattern_str:
+            diagnosticos = analisar_padrao(pattern_str)
+            if diagnosticos:
+                resultado[vul_name] = diagnosticos
+    return resultado
+
+
+def _amostra_caractere(items) -> str:
+    """Retorna um caractere aceito pela sequência de um só elemento, ou 'a'."""
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            return chr(av)
+        if op == sre_parse.IN:
+            for sub_op, sub_av in av:
+                if sub_op == sre_parse.LITERAL:
+                    return chr(sub_av)
+                if sub_op == sre_parse.RANGE:
+                    return chr(sub_av[0])
+                if sub_op == sre_parse.CATEGORY:
+                    return " " if "SPACE" in str(sub_av) and "NOT" not in str(sub_av) else "a"
+        if op == sre_parse.SUBPATTERN:
+            return _amostra_caractere(av[3])
+        break
+    return "a"
+
+
+def _prefixo_ate_repeticao(items) -> tuple:
+    """
+    Monta um texto que casa a sequência até o primeiro quantificador
+    ilimitado. Retorna o prefixo e o caractere de preenchimento aceito por
+    esse quantificador (None se a sequência não tiver nenhum).
+    """
+    prefixo = ""
+    for op, av in items:
+        if _eh_ilimitada(op, av):
+            return prefixo, _amostra_caractere(av[2])
+        if op == sre_parse.LITERAL:
+            prefixo += chr(av)
+        elif op == sre_parse.IN:
+            prefixo += _amostra_caractere([(op, av)])
+        elif op in _REPETICOES:
+            texto, preenchimento = _prefixo_ate_repeticao(av[2])
+            if preenchimento is not None:
+                return prefixo + texto, preenchimento
+            prefixo += texto * av[0]
+        elif op in (sre_parse.SUBPATTERN, sre_parse.BRANCH, sre_parse.ATOMIC_GROUP):
+            sub = av[3] if op == sre_parse.SUBPATTERN else (av[1][0] if op == sre_parse.BRANCH else av)
+            texto, preenchimento = _prefixo_ate_repeticao(sub)
+            if preenchimento is not None:
+                return prefixo + texto, preenchimento
+            prefixo += texto
+    return prefixo, None
+
+
+def gerar_entradas_adversariais(pattern_str: str, tamanho: int) -> list[str]:
+    """
+    Gera linhas de aproximadamente 'tamanho' caracteres que levam cada
+    alternativa do padrão até seu quantificador ilimitado e o alimentam sem
+    nunca completar a correspondência, forçando o backtracking.
+    """
+    parsed = list(sre_parse.parse(pattern_str))
+    alternativas = parsed[0][1][1] if len(parsed) == 1 and parsed[0][0] == sre_parse.BRANCH else [parsed]
+    entradas = []
+    for alternativa in alternativas:
+        prefixo, preenchimento = _prefixo_ate_repeticao(list(alternativa))
+        if preenchimento is None:
+            continue
+        entradas.append(prefixo + preenchimento * tamanho)
+        # Um caractere final que nenhuma regra espera impede que âncoras como
+        # '$' aceitem a entrada e obriga a testar todas as divisões possíveis.
+        entradas.append(prefixo + preenchimento * tamanho + "\x00")
+        # O prefixo repetido força uma nova tentativa a partir de cada ocorrência.
+        bloco = prefixo + preenchimento * 8
+        entradas.append(bloco * max(1, tamanho // len(bloco)))
+    return entradas
+
+
+def _alarme_disponivel() -> bool:
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+def _interromper(signum, frame):
+    raise TempoEsgotadoRegra()
+
+
+# Marca a chamada de LimitadorTempo.executar que ainda não retornou.
+_SEM_RESULTADO = object()
+
+
+class LimitadorTempo:
+    """
+    Interrompe funções que excedem um tempo limite, lançando
+    TempoEsgotadoRegra. O tratador de SIGALRM é instalado uma única vez na
+    entrada do bloco 'with' e cada chamada a executar apenas arma o
+    temporizador. A interrupção só é possível na thread principal de sistemas
+    Unix; nos demais casos as funções rodam sem limite e cabe ao chamador
+    verificar o tempo decorrido entre as chamadas. Com habilitado=False o
+    limitador não faz nada.
+
+    Com 'intervalo', o temporizador é armado uma única vez, na entrada do
+    bloco, e dispara a cada 'intervalo' segundos; executar apenas registra o
+    prazo da chamada, interrompida no primeiro disparo após ele. Cada chamada
+    deixa de custar duas chamadas de sistema, e o limite pode ser excedido
+    em até um intervalo.
+
+    Com 'intervalo' e 'limite_amostrado', o código executado diretamente no
+    bloco também pode ser limitado, sem medir cada chamada: o chamador guarda
+    em 'em_andamento' a chave (por exemplo, o nome da regra) do trecho em
+    execução, ou None entre trechos, e cada disparo soma um intervalo ao
+    tempo dessa chave. O disparo que leva a soma a 'limite_amostrado' lança
+    TempoEsgotadoRegra; o tempo de cada chave é, portanto, aproximado.
+    """
+    def __init__(self, habilitado: bool = True, intervalo: float = None, limite_amostrado: float = None):
+        self.ativo = habilitado and _alarme_disponivel()
+        self.intervalo = intervalo
+        self.limite_amostrado = limite_amostrado
+        self.em_andamento = None
+        self._tempos_amostrados = {}
+        self._prazo = None
+        self._tratador_anterior = None
+
+    def __enter__(self):
+        if self.ativo:
+            tratador = _interromper if self.intervalo is None else self._verificar_prazo
+            self._tratador_anterior = signal.signal(signal.SIGALRM, tratador)
+            if self.intervalo is not None:
+                signal.setitimer(signal.ITIMER_REAL, self.intervalo, self.intervalo)
+        return self
+
+    def __exit__(self, *excecao):
+        if self.ativo:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._tratador_anterior)
+            self._prazo = None
+        self.em_andamento = None
+        self._tempos_amostrados = {}
+
+    def _verificar_prazo(self, signum, frame):
+        if self._prazo is not None:
+            if time.perf_counter() >= self._prazo:
+                raise TempoEsgotadoRegra()
+        elif self.em_andamento is not None and self.limite_amostrado is not None:
+            tempo = self._tempos_amostrados.get(self.em_andamento, 0.0) + self.intervalo
+            self._tempos_amostrados[self.em_andamento] = tempo
+            if tempo >= self.limite_amostrado:
+                raise TempoEsgotadoRegra()
+
+    def executar(self, funcao, segundos: float, *args):
+        """
+        Retorna funcao(*args), interrompida após 'segundos' (sem limite se
+        None). O alarme que chega depois que a função retornou, antes de ser
+        desarmado, não descarta o resultado.
+        """
+        if not self.ativo or segundos is None:
+            return funcao(*args)
+        if segundos <= 0:
+            raise TempoEsgotadoRegra()
+        resultado = _SEM_RESULTADO
+        try:
+            if self.intervalo is not None:
+                self._prazo = time.perf_counter() + segundos
+                try:
+                    resultado = funcao(*args)
+                finally:
+                    self._prazo = None
+            else:
+                signal.setitimer(signal.ITIMER_REAL, segundos)
+                try:
+                    resultado = funcao(*args)
+                finally:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+        except TempoEsgotadoRegra:
+            if resultado is _SEM_RESULTADO:
+                raise
+        return resultado
+
+
+def executar_com_limite(funcao, segundos: float):
+    """Executa uma única função com o tempo limite informado (veja LimitadorTempo)."""
+    with LimitadorTempo() as limitador:
+        return limitador.executar(funcao, segundos)
+
+
+def medir_regra(pattern_str: str, tamanhos=TAMANHOS_ADVERSARIAIS) -> dict:
+    """
+    Mede o pior tempo do padrão nas entradas adversariais de cada tamanho.
+    Retorna os tempos por tamanho, a razão de crescimento entre o maior e o
+    menor tamanho (None se a medição foi interrompida já no primeiro
+    tamanho) e se alguma medição foi interrompida por exceder
+    TEMPO_MAXIMO_MEDICAO.
+    """
+    compiled = re.compile(pattern_str)
+    tempos = {}
+    interrompida = False
+    for tamanho in tamanhos:
+        pior = 0.0
+        for entrada in gerar_entradas_adversariais(pattern_str, tamanho):
+            inicio = time.perf_counter()
+            try:
+                executar_com_limite(lambda: sum(1 for _ in compiled.finditer(entrada)), TEMPO_MAXIMO_MEDICAO)
+            except TempoEsgotadoRegra:
+                interrompida = True
+            pior = max(pior, time.perf_counter() - inicio)
+        tempos[tamanho] = pior
+        if interrompida:
+            break
+
+    menor, maior = min(tempos), max(tempos)
+    if len(tempos) < 2:
+        crescimento = None
+    else:
+        crescimento = tempos[maior] / tempos[menor] if tempos[menor] > 0 else 0.0
+    return {"tempos": tempos, "crescimento": crescimento, "interrompida": interrompida,
+            "lenta": interrompida or max(tempos.values()) > TEMPO_LENTO_SEGUNDOS}
+
+
+def exibir_relatorio_regras(regras: dict, diagnosticos: dict, medir: bool = True) -> bool:
+    """
+    Exibe os diagnósticos estáticos e, se solicitado, a medição adversarial de
+    cada regra. Retorna True se alguma regra tiver risco alto ou for lenta.
+    """
+    problema = False
+    print("Verificação de desempenho das regras:")
+    for vul_name, details in regras.items():
+        pattern_str = details.get('pattern', '')
+        if not pattern_str:
+            continue
+        linhas = [f"  [{risco}] {mensagem}" for risco, mensagem in diagnosticos.get(vul_name, [])]
+        problema = problema or any(risco == RISCO_ALTO for risco, _ in diagnosticos.get(vul_name, []))
+
+        if medir and not any(mensagem.startswith("expressão regular inválida") for _, mensagem in diagnosticos.get(vul_name, [])):
+            medicao = medir_regra(pattern_str)
+            maior = max(medicao["tempos"])
+            situacao = "INTERROMPIDA" if medicao["interrompida"] else ("LENTA" if medicao["lenta"] else "ok")
+            if medicao["crescimento"] is None:
+                linhas.append(f"  entrada adversarial de {maior} caracteres: tempo esgotado "
+                              f"(mais de {TEMPO_MAXIMO_MEDICAO:g}s) ({situacao})")
+            else:
+                linhas.append(f"  entrada adversarial de {maior} caracteres: {medicao['tempos'][maior]:.4f}s, "
+                              f"crescimento x{medicao['crescimento']:.1f} ao quadruplicar a entrada ({situacao})")
+            problema = problema or medicao["lenta"]
+
+        print(f"- {vul_name}")
+        for linha in linhas or ["  nenhum problema encontrado"]:
+            print(linha)
+    return problema
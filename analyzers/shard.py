@@ -0,0 +1,222 @@
+import hashlib
+import heapq
+import json
+import os
+from datetime import datetime
+
+from analyzers.vulnerability import Vulnerabilidade
+
+# Versão do formato dos arquivos de fragmento.
+VERSAO_FRAGMENTO = 2
+
+# Custo fixo de cada arquivo (abrir, ler, preparar as regras), em bytes
+# equivalentes, somado ao tamanho no balanceamento entre os shards.
+CUSTO_FIXO_ARQUIVO = 4096
+
+# Nome padrão do fragmento de cada shard e padrão procurado pelo merge em diretórios.
+NOME_FRAGMENTO = "fragmento-{indice}-de-{total}.jsonl"
+PREFIXO_FRAGMENTO = "fragmento-"
+
+
+class ErroFragmento(Exception):
+    """Fragmento ausente, incompleto ou incompatível com os demais."""
+
+
+def interpretar_shard(texto: str) -> tuple[int, int]:
+    """Converte 'i/N' (1 <= i <= N) em (i, N). Lança ValueError se o formato for inválido."""
+    indice, separador, total = texto.partition("/")
+    if not separador or not indice.strip().isdigit() or not total.strip().isdigit():
+        raise ValueError(f"use o formato i/N, como 1/4, não '{texto}'")
+    indice, total = int(indice), int(total)
+    if not 1 <= indice <= total:
+        raise ValueError(f"o índice deve estar entre 1 e {total}, não {indice}")
+    return indice, total
+
+
+def chave_estavel(file_path: str, raiz: str = ".", indice_raiz: int = 0) -> str:
+    """
+    Identifica o arquivo pelo caminho relativo à raiz analisada (o caminho
+    informado na linha de comando, precedido da sua posição entre eles),
+    igual em qualquer máquina com o mesmo checkout e qualquer que seja o
+    diretório de onde o processo foi iniciado.
+    """
+    base = raiz if os.path.isdir(raiz) else os.path.dirname(os.path.abspath(raiz))
+    relativo = os.path.relpath(os.path.abspath(file_path), os.path.abspath(base)).replace(os.sep, "/")
+    return f"{indice_raiz}:{relativo}"
+
+
+def _peso_arquivo(file_path: str) -> int:
+    try:
+        return os.path.getsize(file_path) + CUSTO_FIXO_ARQUIVO
+    except OSError:
+        return CUSTO_FIXO_ARQUIVO
+
+
+def _hash_chave(chave: str) -> str:
+    return hashlib.sha1(chave.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def hash_arquivos(file_paths: list, chaves: dict = None) -> str:
+    """
+    Hash da lista de arquivos descobertos, com suas chaves estáveis (veja
+    chave_estavel; sem 'chaves', relativas ao diretório atual) e tamanhos, em
+    qualquer ordem. Shards com hashes diferentes não dividiram os mesmos
+    arquivos e não podem ser combinados.
+    """
+    chaves = chaves or {}
+    linhas = sorted(f"{chaves.get(file_path) or chave_estavel(file_path)}\0{_peso_arquivo(file_path)}"
+                    for file_path in set(file_paths))
+    return _hash_chave("\n".join(linhas))
+
+
+def selecionar_shard(file_paths: list, indice: int, total: int, chaves: dict = None) -> list:
+    """
+    Retorna os arquivos do shard 'indice' (de 1 a 'total'), na ordem da lista.
+
+    Os arquivos são distribuídos do maior para o menor, cada um para o shard
+    com menos bytes até então (empates pelo hash da chave estável do arquivo,
+    informada em 'chaves' ou, sem ela, relativa ao diretório atual, e pelo
+    número do shard). A divisão depende apenas das chaves e dos tamanhos:
+    processos que descobrem os mesmos arquivos, em qualquer ordem, chegam à
+    mesma divisão, e cada arquivo cai em exatamente um shard.
+    """
+    chaves = chaves or {}
+    ordenados = sorted(((-_peso_arquivo(file_path), _hash_chave(chaves.get(file_path) or chave_estavel(file_path)),
+                         file_path)
+                        for file_path in set(file_paths)))
+    cargas = [(0, shard) for shard in range(1, total + 1)]
+    selecionados = set()
+    for peso_negativo, _, file_path in ordenados:
+        carga, shard = heapq.heappop(cargas)
+        if shard == indice:
+            selecionados.add(file_path)
+        heapq.heappush(cargas, (carga - peso_negativo, shard))
+    return [file_path for file_path in dict.fromkeys(file_paths) if file_path in selecionados]
+
+
+class SaidaFragmento:
+    """
+    Saída contínua com os achados de um shard, em JSONL (um to_dict() por
+    linha). Os achados vão para um arquivo temporário; concluir() acrescenta a
+    linha final com os metadados do shard e só então o move para o caminho
+    definitivo, de modo que um shard interrompido não deixa um fragmento que
+    pareça completo.
+    """
+    def __init__(self, caminho: str, indice: int, total: int, hash_regras: str, hash_arquivos: str = None):
+        self.caminho = caminho
+        self.indice = indice
+        self.total = total
+        self.hash_regras = hash_regras
+        self.hash_arquivos = hash_arquivos
+        self.achados = 0
+        self.temporario = f"{caminho}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.arquivo = open(self.temporario, 'w', encoding='utf-8')
+
+    def escrever(self, vulnerability: Vulnerabilidade):
+        self.arquivo.write(json.dumps(vulnerability.to_dict(), ensure_ascii=False) + "\n")
+        self.achados += 1
+
+    def fechar(self):
+        self.arquivo.close()
+
+    def concluir(self, arquivos_analisados: int):
+        """Grava os metadados e publica o fragmento no caminho definitivo."""
+        if self.arquivo.closed:
+            self.arquivo = open(self.temporario, 'a', encoding='utf-8')
+        metadados = {"versao": VERSAO_FRAGMENTO, "shard": self.indice, "total": self.total,
+                     "regras": self.hash_regras, "arquivos": self.hash_arquivos,
+                     "arquivos_analisados": arquivos_analisados,
+                     "achados": self.achados, "concluido_em": datetime.now().isoformat(timespec="seconds")}
+        self.arquivo.write(json.dumps({"fragmento": metadados}) + "\n")
+        self.arquivo.close()
+        os.replace(self.temporario, self.caminho)
+        print(f"Fragmento do shard {self.indice}/{self.total} gravado em: {self.caminho}")
+
+
+def resolver_fragmentos(caminhos: list) -> list:
+    """Arquivos de fragmento informados; de diretórios, os arquivos 'fragmento-*.jsonl'."""
+    fragmentos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            fragmentos.extend(sorted(os.path.join(caminho, nome) for nome in os.listdir(caminho)
+                                     if nome.startswith(PREFIXO_FRAGMENTO) and nome.endswith(".jsonl")))
+        else:
+            fragmentos.append(caminho)
+    return fragmentos
+
+
+def _ler_fragmento(caminho: str) -> tuple[dict, list]:
+    achados = []
+    metadados = None
+    try:
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            for numero, linha in enumerate(arquivo, 1):
+                if not linha.strip():
+                    continue
+                if metadados is not None:
+                    raise ErroFragmento(f"'{caminho}': conteúdo após os metadados, na linha {numero}")
+                registro = json.loads(linha)
+                if "fragmento" in registro:
+                    metadados = registro["fragmento"]
+                else:
+                    achados.append(registro)
+    except (OSError, ValueError) as e:
+        raise ErroFragmento(f"não foi possível ler '{caminho}': {e}")
+    if metadados is None:
+        raise ErroFragmento(f"'{caminho}' não tem os metadados finais; o shard não terminou")
+    if metadados.get("versao") != VERSAO_FRAGMENTO:
+        raise ErroFragmento(f"'{caminho}' tem um formato de fragmento não suportado")
+    if metadados.get("achados") != len(achados):
+        raise ErroFragmento(f"'{caminho}' está truncado: {len(achados)} de {metadados.get('achados')} achado(s)")
+    return metadados, achados
+
+
+def combinar_fragmentos(caminhos: list) -> tuple[list, list]:
+    """
+    Lê os fragmentos de todos os shards de uma análise e retorna os
+    metadados de cada um e as vulnerabilidades combinadas, sem repetições
+    entre fragmentos e ordenadas por arquivo, linha e tipo, qualquer que seja
+    a ordem dos fragmentos. Lança ErroFragmento se faltar algum shard, se algum estiver
+    repetido ou incompleto, ou se foram gerados com regras diferentes ou a
+    partir de listas de arquivos diferentes (veja hash_arquivos).
+    """
+    if not caminhos:
+        raise ErroFragmento("nenhum fragmento informado")
+    lidos = [(caminho, *_ler_fragmento(caminho)) for caminho in caminhos]
+
+    total = lidos[0][1]["total"]
+    regras = lidos[0][1]["regras"]
+    arquivos = lidos[0][1].get("arquivos")
+    por_shard = {}
+    for caminho, metadados, _ in lidos:
+        if metadados["total"] != total:
+            raise ErroFragmento(f"'{caminho}' é de uma divisão em {metadados['total']} shards, não {total}")
+        if metadados["regras"] != regras:
+            raise ErroFragmento(f"'{caminho}' foi gerado com regras diferentes das de '{lidos[0][0]}'")
+        if metadados.get("arquivos") != arquivos:
+            raise ErroFragmento(f"'{caminho}' dividiu arquivos diferentes dos de '{lidos[0][0]}' (outro checkout, "
+                                "outros caminhos ou filtros de descoberta)")
+        if metadados["shard"] in por_shard:
+            raise ErroFragmento(f"shard {metadados['shard']}/{total} repetido: '{por_shard[metadados['shard']]}' "
+                                f"e '{caminho}'")
+        por_shard[metadados["shard"]] = caminho
+    ausentes = [str(shard) for shard in range(1, total + 1) if shard not in por_shard]
+    if ausentes:
+        raise ErroFragmento(f"faltam os fragmentos do(s) shard(s) {', '.join(ausentes)} de {total}")
+
+    # Um achado presente em mais de um fragmento conta uma vez; repetições
+    # dentro do mesmo fragmento são preservadas, como na análise sem shards.
+    unicos = {}
+    for _, _, achados in lidos:
+        ocorrencias = {}
+        for achado in achados:
+            vulnerabilidade = Vulnerabilidade.from_dict(achado)
+            chave = (vulnerabilidade.file_path, vulnerabilidade.line, vulnerabilidade.type,
+                     vulnerabilidade.code_snippet, vulnerabilidade.severity)
+            ocorrencias.setdefault(chave, []).append(vulnerabilidade)
+        for chave, vulnerabilidades in ocorrencias.items():
+            if len(vulnerabilidades) > len(unicos.get(chave, ())):
+                unicos[chave] = vulnerabilidades
+    combinadas = [vulnerabilidade for chave in sorted(unicos) for vulnerabilidade in unicos[chave]]
+    return [metadados for _, metadados, _ in sorted(lidos, key=lambda lido: lido[1]["shard"])], combinadas
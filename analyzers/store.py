@@ -0,0 +1,270 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from analyzers.baseline import impressao_achado
+from analyzers.vulnerability import Vulnerabilidade
+
+HISTORICO_PADRAO = os.path.join(".analysis_cache", "historico.sqlite")
+
+# Versão do esquema, guardada em PRAGMA user_version.
+VERSAO_HISTORICO = 1
+
+# Achados acumulados em memória antes de cada inserção em lote.
+TAMANHO_LOTE_INSERCAO = 5000
+
+_ESQUEMA = (
+    """CREATE TABLE IF NOT EXISTS execucoes (
+        id INTEGER PRIMARY KEY,
+        iniciada_em TEXT NOT NULL,
+        concluida_em TEXT NOT NULL,
+        rotulo TEXT,
+        hash_regras TEXT NOT NULL,
+        arquivos_analisados INTEGER NOT NULL,
+        total_achados INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_execucoes_concluida ON execucoes (concluida_em)",
+    """CREATE TABLE IF NOT EXISTS arquivos (
+        id INTEGER PRIMARY KEY,
+        caminho TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS regras (
+        id INTEGER PRIMARY KEY,
+        nome TEXT NOT NULL,
+        severidade TEXT NOT NULL,
+        UNIQUE (nome, severidade)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_regras_severidade ON regras (severidade)",
+    """CREATE TABLE IF NOT EXISTS achados (
+        execucao_id INTEGER NOT NULL REFERENCES execucoes (id) ON DELETE CASCADE,
+        arquivo_id INTEGER NOT NULL REFERENCES arquivos (id),
+        regra_id INTEGER NOT NULL REFERENCES regras (id),
+        linha INTEGER NOT NULL,
+        trecho TEXT NOT NULL,
+        impressao TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_achados_execucao_impressao ON achados (execucao_id, impressao)",
+    "CREATE INDEX IF NOT EXISTS idx_achados_regra ON achados (regra_id, execucao_id)",
+    "CREATE INDEX IF NOT EXISTS idx_achados_arquivo ON achados (arquivo_id)",
+    "CREATE INDEX IF NOT EXISTS idx_achados_impressao ON achados (impressao)",
+)
+
+
+class ErroHistorico(Exception):
+    """Banco de histórico inválido ou execução inexistente."""
+
+
+def caminho_relativo(file_path: str) -> str:
+    """Caminho relativo ao diretório atual, com '/', como é guardado no histórico."""
+    try:
+        relativo = os.path.relpath(os.path.abspath(file_path))
+    except ValueError:  # Outra unidade no Windows.
+        relativo = os.path.abspath(file_path)
+    return relativo.replace(os.sep, "/")
+
+
+class HistoricoAchados:
+    """
+    Histórico de análises em SQLite: execuções, arquivos, regras e achados,
+    com índices por regra, severidade, arquivo e impressão digital (a mesma
+    da baseline, que não depende da linha). Permite comparar execuções e
+    acompanhar a evolução dos achados sem reanalisar o código.
+    """
+    def __init__(self, caminho: str, somente_leitura: bool = False):
+        self.caminho = caminho
+        try:
+            if somente_leitura:
+                if not os.path.exists(caminho):
+                    raise ErroHistorico(f"histórico '{caminho}' não encontrado")
+                caminho_uri = "file:" + os.path.abspath(caminho).replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+                self.conexao = sqlite3.connect(caminho_uri, uri=True, timeout=30)
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+                self.conexao = sqlite3.connect(caminho, timeout=30)
+                self.conexao.execute("PRAGMA journal_mode=WAL")
+            self.conexao.execute("PRAGMA foreign_keys=ON")
+            versao = self.conexao.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.Error as e:
+            raise ErroHistorico(f"'{caminho}' não é um banco SQLite válido: {e}")
+
+        if versao not in (0, VERSAO_HISTORICO) or (somente_leitura and versao == 0):
+            self.conexao.close()
+            raise ErroHistorico(f"'{caminho}' não é um histórico de achados na versão {VERSAO_HISTORICO}")
+        if not somente_leitura and versao == 0:
+            for comando in _ESQUEMA:
+                self.conexao.execute(comando)
+            self.conexao.execute(f"PRAGMA user_version = {VERSAO_HISTORICO}")
+            self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.close()
+
+    def execucoes(self, limite: int = None) -> list[tuple]:
+        """(id, concluída em, rótulo, arquivos analisados, total de achados) das execuções, da mais antiga à mais recente."""
+        consulta = ("SELECT id, concluida_em, rotulo, arquivos_analisados, total_achados FROM execucoes "
+                    "ORDER BY id DESC")
+        parametros = ()
+        if limite:
+            consulta += " LIMIT ?"
+            parametros = (limite,)
+        return list(reversed(self.conexao.execute(consulta, parametros).fetchall()))
+
+    def resolver_execucao(self, referencia: str = None, antes_de: datetime = None) -> int:
+        """
+        Retorna o id de uma execução: um número, 'ultima' (padrão) ou
+        'penultima'; com antes_de, a última concluída até essa data.
+        Lança ErroHistorico se ela não existir.
+        """
+        if antes_de is not None:
+            linha = self.conexao.execute("SELECT id FROM execucoes WHERE concluida_em <= ? ORDER BY id DESC LIMIT 1",
+                                         (antes_de.isoformat(timespec="seconds"),)).fetchone()
+            if linha is None:
+                raise ErroHistorico(f"nenhuma execução concluída até {antes_de:%Y-%m-%d %H:%M}")
+            return linha[0]
+        referencia = referencia or "ultima"
+        if referencia in ("ultima", "penultima"):
+            deslocamento = 0 if referencia == "ultima" else 1
+            linha = self.conexao.execute("SELECT id FROM execucoes ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                         (deslocamento,)).fetchone()
+        elif referencia.isdigit():
+            linha = self.conexao.execute("SELECT id FROM execucoes WHERE id = ?", (int(referencia),)).fetchone()
+        else:
+            raise ErroHistorico(f"execução inválida: '{referencia}' (use um número, 'ultima' ou 'penultima')")
+        if linha is None:
+            raise ErroHistorico(f"execução '{referencia}' não encontrada")
+        return linha[0]
+
+    def comparar_regras(self, base: int, atual: int) -> list[tuple]:
+        """(regra, severidade, achados na base, achados na atual) das regras cuja contagem mudou, maiores aumentos primeiro."""
+        return self.conexao.execute("""
+            SELECT r.nome, r.severidade,
+                   SUM(a.execucao_id = :base) AS antes, SUM(a.execucao_id = :atual) AS depois
+            FROM achados a JOIN regras r ON r.id = a.regra_id
+            WHERE a.execucao_id IN (:base, :atual)
+            GROUP BY r.id
+            HAVING antes != depois
+            ORDER BY depois - antes DESC, r.nome
+        """, {"base": base, "atual": atual}).fetchall()
+
+    def achados_novos(self, base: int, atual: int, limite: int = None) -> list[tuple]:
+        """
+        Achados da execução 'atual' cuja impressão digital não aparece na
+        'base' (ou aparece menos vezes): (regra, severidade, arquivo, primeira
+        linha, trecho, ocorrências a mais), ordenados por arquivo e linha.
+        Trocar as execuções retorna os achados corrigidos.
+        """
+        consulta = """
+            WITH base AS (SELECT impressao, COUNT(*) AS n FROM achados WHERE execucao_id = :base GROUP BY impressao),
+                 atual AS (SELECT impressao, COUNT(*) AS n FROM achados WHERE execucao_id = :atual GROUP BY impressao),
+                 novos AS (SELECT atual.impressao, atual.n - COALESCE(base.n, 0) AS n
+                           FROM atual LEFT JOIN base ON base.impressao = atual.impressao
+                           WHERE atual.n > COALESCE(base.n, 0))
+            SELECT r.nome, r.severidade, f.caminho, MIN(a.linha), a.trecho, novos.n
+            FROM novos
+            JOIN achados a ON a.execucao_id = :atual AND a.impressao = novos.impressao
+            JOIN regras r ON r.id = a.regra_id
+            JOIN arquivos f ON f.id = a.arquivo_id
+            GROUP BY novos.impressao
+            ORDER BY f.caminho, MIN(a.linha), r.nome
+        """
+        parametros = {"base": base, "atual": atual}
+        if limite:
+            consulta += " LIMIT :limite"
+            parametros["limite"] = limite
+        return self.conexao.execute(consulta, parametros).fetchall()
+
+    def tendencia(self, limite: int = 10, regra: str = None) -> list[tuple]:
+        """
+        (id, concluída em, rótulo, severidade, achados) das últimas execuções,
+        opcionalmente apenas de uma regra. Execuções sem achados aparecem com
+        severidade None e contagem 0.
+        """
+        return self.conexao.execute("""
+            SELECT e.id, e.concluida_em, e.rotulo, r.severidade, COUNT(r.id)
+            FROM (SELECT * FROM execucoes ORDER BY id DESC LIMIT :limite) e
+            LEFT JOIN achados a ON a.execucao_id = e.id
+            LEFT JOIN regras r ON r.id = a.regra_id AND (:regra IS NULL OR r.nome = :regra)
+            GROUP BY e.id, r.severidade
+            ORDER BY e.id, r.severidade
+        """, {"limite": limite, "regra": regra}).fetchall()
+
+
+class SaidaHistorico:
+    """
+    Saída contínua que registra os achados de uma análise no histórico. Na
+    análise, escrever() apenas acumula o achado; as inserções são feitas em
+    lotes de TAMANHO_LOTE_INSERCAO, em uma única transação por execução,
+    confirmada em concluir(). Uma análise que não chega a concluir() não
+    deixa nenhum registro.
+    """
+    def __init__(self, caminho: str, hash_regras: str, rotulo: str = None):
+        self.historico = HistoricoAchados(caminho)
+        self.conexao = self.historico.conexao
+        self.hash_regras = hash_regras
+        self.rotulo = rotulo
+        self.iniciada_em = datetime.now().isoformat(timespec="seconds")
+        self.total = 0
+        self._pendentes = []
+        self._ids_arquivos = {}
+        self._ids_regras = {}
+        self.execucao_id = self.conexao.execute(
+            "INSERT INTO execucoes (iniciada_em, concluida_em, rotulo, hash_regras, arquivos_analisados, "
+            "total_achados) VALUES (?, ?, ?, ?, 0, 0)",
+            (self.iniciada_em, self.iniciada_em, rotulo, hash_regras)).lastrowid
+
+    def escrever(self, vulnerability: Vulnerabilidade):
+        self._pendentes.append((vulnerability.file_path, vulnerability.type, vulnerability.severity,
+                                vulnerability.line, vulnerability.code_snippet))
+        if len(self._pendentes) >= TAMANHO_LOTE_INSERCAO:
+            self._inserir_pendentes()
+
+    def _id_arquivo(self, caminho: str) -> int:
+        arquivo_id = self._ids_arquivos.get(caminho)
+        if arquivo_id is None:
+            self.conexao.execute("INSERT OR IGNORE INTO arquivos (caminho) VALUES (?)", (caminho,))
+            arquivo_id = self.conexao.execute("SELECT id FROM arquivos WHERE caminho = ?", (caminho,)).fetchone()[0]
+            self._ids_arquivos[caminho] = arquivo_id
+        return arquivo_id
+
+    def _id_regra(self, nome: str, severidade: str) -> int:
+        regra_id = self._ids_regras.get((nome, severidade))
+        if regra_id is None:
+            self.conexao.execute("INSERT OR IGNORE INTO regras (nome, severidade) VALUES (?, ?)", (nome, severidade))
+            regra_id = self.conexao.execute("SELECT id FROM regras WHERE nome = ? AND severidade = ?",
+                                            (nome, severidade)).fetchone()[0]
+            self._ids_regras[(nome, severidade)] = regra_id
+        return regra_id
+
+    def _inserir_pendentes(self):
+        linhas = []
+        for file_path, vul_type, severity, line, code_snippet in self._pendentes:
+            relativo = caminho_relativo(file_path)
+            linhas.append((self.execucao_id, self._id_arquivo(relativo), self._id_regra(vul_type, severity), line,
+                           code_snippet, impressao_achado(vul_type, relativo, code_snippet)))
+        self.conexao.executemany("INSERT INTO achados (execucao_id, arquivo_id, regra_id, linha, trecho, impressao) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", linhas)
+        self.total += len(linhas)
+        self._pendentes = []
+
+    def fechar(self):
+        """Insere os achados pendentes, ainda sem confirmar a execução."""
+        if self._pendentes:
+            self._inserir_pendentes()
+
+    def concluir(self, arquivos_analisados: int):
+        """Confirma a execução no histórico e fecha o banco."""
+        self.fechar()
+        self.conexao.execute("UPDATE execucoes SET concluida_em = ?, arquivos_analisados = ?, total_achados = ? "
+                             "WHERE id = ?", (datetime.now().isoformat(timespec="seconds"), arquivos_analisados,
+                                              self.total, self.execucao_id))
+        self.conexao.commit()
+        self.historico.fechar()
+        print(f"Execução {self.execucao_id} registrada no histórico: {self.historico.caminho}")
+
+
+def interpretar_desde(texto: str) -> datetime:
+    """Converte '7d', '12h' ou uma data ISO ('2024-05-01') no instante correspondente. Lança ValueError."""
+    unidades = {"d": "days", "h": "hours", "w": "weeks"}
+    if texto[-1:].lower() in unidades and texto[:-1].isdigit():
+        return datetime.now() - timedelta(**{unidades[texto[-1].lower()]: int(texto[:-1])})
+    return datetime.fromisoformat(texto)
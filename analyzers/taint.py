@@ -0,0 +1,682 @@
+import hashlib
+import os
+import re
+
+from analyzers.cache import calcular_hash_conteudo
+from analyzers.lexer import (ABRE_TAG, COMENTARIO, FECHA_TAG, HEREDOC, HTML, IDENTIFICADOR, INTERPOLACAO, OPERADOR,
+                             STRING, VARIAVEL, TokensPHP, tokenizar)
+
+# Variáveis cujo conteúdo vem do usuário, usadas quando a regra não define 'fontes'.
+FONTES_PADRAO = ("$_GET", "$_POST", "$_REQUEST", "$_COOKIE", "$_FILES")
+
+# Funções cujo resultado nunca carrega a entrada original (números, booleanos
+# e hashes), para todas as regras.
+SANITIZADORES_GERAIS = (
+    "intval", "floatval", "doubleval", "boolval", "isset", "empty", "is_numeric", "is_int", "is_string",
+    "is_array", "ctype_digit", "ctype_alnum", "ctype_alpha", "count", "sizeof", "strlen", "mb_strlen", "abs",
+    "round", "ceil", "floor", "max", "min", "md5", "sha1", "crc32", "hash", "password_hash", "in_array",
+    "array_key_exists", "uniqid",
+)
+
+# Construções da linguagem que recebem uma expressão sem parênteses e que
+# podem ser usadas como sink.
+CONSTRUCOES_SINK = ("echo", "print", "include", "include_once", "require", "require_once")
+INCLUSOES = ("include", "include_once", "require", "require_once")
+
+# Sink especial para strings entre crases, executadas como comando do shell.
+SINK_CRASE = "`"
+
+# Repetições máximas do ponto fixo dentro de um escopo (laços) e entre as
+# funções de um arquivo (chamadas recursivas ou antes da declaração).
+MAX_ITERACOES_ESCOPO = 3
+MAX_ITERACOES_FUNCOES = 5
+
+# Origem de um rótulo que veio diretamente de uma fonte; rótulos vindos de
+# parâmetros usam o índice do parâmetro.
+ORIGEM_FONTE = -1
+
+_CONVERSOES = {"int", "integer", "float", "double", "bool", "boolean"}
+_CONTROLE = {"if", "elseif", "while", "for", "switch", "catch", "declare", "match", "foreach", "list", "array",
+             "unset", "function", "fn", "use"}
+_ATRIBUICOES = {"=", ".=", "+=", "-=", "*=", "/=", "%=", "**=", "??=", "|=", "&=", "^=", "<<=", ">>="}
+_ABERTURAS = {"(", "[", "{"}
+_FECHAMENTOS = {")", "]", "}"}
+_FIM_DE_EXPRESSAO = {";", ")", "]", "}"}
+_PREFIXOS_METODO = {"->": "->", "?->": "->", "::": "::"}
+_OPERADORES_UNARIOS = {"-", "+", "!", "@", "~", "&"}
+
+
+class RegraTaint:
+    """Fontes, sinks e sanitizadores de uma regra de fluxo de dados (campo 'taint' da configuração)."""
+    __slots__ = ("nome", "fontes", "sinks", "sanitizadores")
+
+    def __init__(self, nome: str, sinks, sanitizadores=(), fontes=FONTES_PADRAO):
+        self.nome = nome
+        self.fontes = tuple(fontes)
+        # Sinks de método são escritos como '->nome' ou '::nome'; os demais são
+        # funções ou construções da linguagem.
+        self.sinks = tuple(_normalizar_sink(sink) for sink in sinks)
+        # Sanitizadores valem tanto para funções quanto para métodos de mesmo nome.
+        self.sanitizadores = tuple(_normalizar_sink(nome_funcao).lstrip("->:") for nome_funcao in sanitizadores)
+
+
+def _normalizar_sink(sink: str) -> str:
+    sink = sink.strip()
+    for prefixo, normalizado in _PREFIXOS_METODO.items():
+        if sink.startswith(prefixo):
+            return normalizado + sink[len(prefixo):].lower()
+    return sink.lstrip("\\").lower()
+
+
+class ResumoFuncao:
+    """
+    Resumo de uma função: os rótulos que chegam ao valor de retorno, na forma
+    (regra, origem), com origem ORIGEM_FONTE para dados lidos de uma fonte
+    dentro da função ou o índice do parâmetro que os repassa; e os pares
+    (regra, índice do parâmetro) dos parâmetros que alcançam um sink.
+    """
+    __slots__ = ("retorno", "sinks")
+
+    def __init__(self, retorno=frozenset(), sinks=frozenset()):
+        self.retorno = frozenset(retorno)
+        self.sinks = frozenset(sinks)
+
+    def unir(self, outro: "ResumoFuncao") -> "ResumoFuncao":
+        return ResumoFuncao(self.retorno | outro.retorno, self.sinks | outro.sinks)
+
+    def __eq__(self, outro):
+        return isinstance(outro, ResumoFuncao) and self.retorno == outro.retorno and self.sinks == outro.sinks
+
+    def __hash__(self):
+        return hash((self.retorno, self.sinks))
+
+
+class ResumoArquivo:
+    """
+    Resultado da análise de um arquivo: as funções que ele oferece a quem o
+    inclui (próprias e incluídas), as variáveis globais contaminadas ao fim
+    do código de nível superior, os achados (regra, linha) e os arquivos
+    incluídos, direta ou indiretamente, com o hash de seus conteúdos.
+    """
+    __slots__ = ("hash_conteudo", "funcoes", "globais", "achados", "inclusoes", "dependencias", "impressao")
+
+    def __init__(self, hash_conteudo: str, funcoes: dict, globais: dict, achados: list, inclusoes: dict,
+                 dependencias: dict):
+        self.hash_conteudo = hash_conteudo
+        self.funcoes = funcoes
+        self.globais = globais
+        self.achados = achados
+        # caminho incluído diretamente -> impressão do resumo usado na análise
+        self.inclusoes = inclusoes
+        self.dependencias = dependencias
+        # Muda apenas quando muda o que o arquivo oferece a quem o inclui.
+        self.impressao = hashlib.sha256(repr((
+            sorted((nome, sorted(resumo.retorno), sorted(resumo.sinks)) for nome, resumo in funcoes.items()),
+            sorted((nome, sorted(rotulos)) for nome, rotulos in globais.items()),
+        )).encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class _Arquivo:
+    """Tokens significativos de um arquivo e as estruturas derivadas usadas pelos escopos."""
+
+    def __init__(self, motor: "MotorTaint", codigo: str, caminho: str | None, tokens: TokensPHP = None):
+        self.motor = motor
+        self.caminho = caminho
+        self.tokens = tokens if tokens is not None else tokenizar(codigo)
+        self.sig = [token for token in self.tokens.tokens if token[0] not in (COMENTARIO, HTML)]
+        self.par = self._parear_delimitadores()
+        # índice do token 'function' -> índice seguinte ao fim do corpo
+        self.corpos = {}
+        # (nome ou None para funções anônimas, parâmetros, início e fim do corpo)
+        self.declaracoes = []
+        # índice do token de inclusão -> caminho resolvido
+        self.inclusoes = {}
+        self.funcoes = {}
+        self.resumos_incluidos = {}
+        # (regra, deslocamento) dos sinks alcançados por dados de uma fonte
+        self.achados = set()
+        self._coletar_declaracoes_e_inclusoes()
+
+    def _parear_delimitadores(self) -> dict:
+        par = {}
+        pilha = []
+        for i, (tipo, texto, _) in enumerate(self.sig):
+            if tipo != OPERADOR:
+                continue
+            if texto in _ABERTURAS:
+                pilha.append(i)
+            elif texto in _FECHAMENTOS and pilha:
+                par[pilha.pop()] = i
+        for i in pilha:
+            par[i] = len(self.sig)
+        return par
+
+    def eh(self, i: int, texto: str) -> bool:
+        return i < len(self.sig) and self.sig[i][0] == OPERADOR and self.sig[i][1] == texto
+
+    def fim_expressao(self, i: int, limite: int, virgula: bool = True) -> int:
+        """Índice do token que encerra a expressão iniciada em i, no mesmo nível de parênteses."""
+        while i < limite:
+            tipo, texto, _ = self.sig[i]
+            if tipo == OPERADOR:
+                if texto in _ABERTURAS:
+                    i = self.par[i] + 1
+                    continue
+                if texto in _FIM_DE_EXPRESSAO or (virgula and texto == ","):
+                    return i
+            elif tipo == FECHA_TAG:
+                return i
+            i += 1
+        return limite
+
+    def fim_termo(self, i: int, limite: int) -> int:
+        """Índice seguinte ao termo iniciado em i: variável, chamada ou grupo, com acessos encadeados."""
+        while i < limite and self.sig[i][0] == OPERADOR and self.sig[i][1] in _OPERADORES_UNARIOS:
+            i += 1
+        if i >= limite:
+            return limite
+        i = self.par[i] + 1 if self.sig[i][0] == OPERADOR and self.sig[i][1] in _ABERTURAS else i + 1
+        while i < limite:
+            tipo, texto, _ = self.sig[i]
+            if tipo == OPERADOR and texto in ("[", "("):
+                i = self.par[i] + 1
+            elif tipo == OPERADOR and texto in _PREFIXOS_METODO and i + 1 < limite:
+                i += 2
+            else:
+                break
+        return i
+
+    def _coletar_declaracoes_e_inclusoes(self):
+        sig = self.sig
+        diretorio = os.path.dirname(self.caminho) if self.caminho else None
+        for i, (tipo, texto, _) in enumerate(sig):
+            if tipo != IDENTIFICADOR:
+                continue
+            palavra = texto.lower()
+            if palavra == "function":
+                self._registrar_declaracao(i)
+            elif palavra in INCLUSOES and diretorio is not None:
+                caminho = self._resolver_inclusao(i + 1, self.fim_expressao(i + 1, len(sig), virgula=False), diretorio)
+                if caminho is not None:
+                    self.inclusoes[i] = caminho
+
+    def _registrar_declaracao(self, i: int):
+        sig = self.sig
+        j = i + 1
+        if self.eh(j, "&"):
+            j += 1
+        nome = None
+        if j + 1 < len(sig) and sig[j][0] == IDENTIFICADOR and self.eh(j + 1, "("):
+            nome = sig[j][1].lower()
+            j += 1
+        if not self.eh(j, "("):
+            return
+        fecha = self.par[j]
+        parametros = []
+        esperando = True
+        k = j + 1
+        while k < fecha:
+            tipo, texto, _ = sig[k]
+            if tipo == OPERADOR and texto in _ABERTURAS:
+                k = self.par[k] + 1
+                continue
+            if tipo == OPERADOR and texto == ",":
+                esperando = True
+            elif tipo == VARIAVEL and esperando:
+                parametros.append(texto)
+                esperando = False
+            k += 1
+
+        # Pula 'use (...)' e o tipo de retorno até o corpo; métodos abstratos não têm corpo.
+        k = fecha + 1
+        while k < len(sig) and not (self.eh(k, "{") or self.eh(k, ";")):
+            k = self.par[k] + 1 if self.eh(k, "(") else k + 1
+        if self.eh(k, "{"):
+            self.corpos[i] = self.par[k] + 1
+            self.declaracoes.append((nome, tuple(parametros), k + 1, self.par[k]))
+
+    def _resolver_inclusao(self, inicio: int, fim: int, diretorio: str) -> str | None:
+        """
+        Resolve o caminho de um include/require formado apenas por strings
+        literais, __DIR__ e dirname(__FILE__), relativo ao arquivo que inclui.
+        Caminhos dinâmicos retornam None.
+        """
+        partes = []
+        i = inicio
+        while i < fim:
+            tipo, texto, _ = self.sig[i]
+            if tipo == STRING and texto[:1] in ("'", '"') and "$" not in texto and len(texto) >= 2:
+                partes.append(texto[1:-1])
+            elif tipo == IDENTIFICADOR and texto.upper() == "__DIR__":
+                partes.append(diretorio)
+            elif (tipo == IDENTIFICADOR and texto.lower() == "dirname" and self.eh(i + 1, "(") and i + 3 < fim
+                  and self.sig[i + 2][1].upper() == "__FILE__" and self.eh(i + 3, ")")):
+                partes.append(diretorio)
+                i += 3
+            elif not (tipo == OPERADOR and texto in (".", "(", ")")):
+                return None
+            i += 1
+        if not partes:
+            return None
+        caminho = os.path.normpath(os.path.join(diretorio, "".join(partes)))
+        return caminho if os.path.isfile(caminho) else None
+
+
+class _Escopo:
+    """Rótulos das variáveis de um escopo (função, função anônima ou nível superior do arquivo)."""
+
+    def __init__(self, arquivo: _Arquivo, parametros: tuple = ()):
+        self.arquivo = arquivo
+        self.motor = arquivo.motor
+        self.variaveis = {}
+        for indice, parametro in enumerate(parametros):
+            self.variaveis[parametro] = frozenset((regra, indice) for regra in self.motor.nomes_regras)
+        self.retorno = set()
+        self.sinks = set()
+        self.alterado = False
+        # Variáveis já lidas na passada atual; só uma alteração em alguma delas
+        # (um laço, por exemplo) exige percorrer o escopo novamente.
+        self._lidas = set()
+
+    def executar(self, inicio: int, fim: int):
+        """Percorre o escopo até que os rótulos das variáveis se estabilizem."""
+        for _ in range(MAX_ITERACOES_ESCOPO):
+            self.alterado = False
+            self._lidas.clear()
+            self._percorrer(inicio, fim)
+            if not self.alterado:
+                break
+
+    def resumo(self) -> ResumoFuncao:
+        return ResumoFuncao(self.retorno, self.sinks)
+
+    def contaminar(self, variavel: str, rotulos):
+        if not rotulos or variavel in self.motor.fontes:
+            return
+        atuais = self.variaveis.get(variavel, frozenset())
+        novos = atuais | rotulos
+        if len(novos) != len(atuais):
+            self.variaveis[variavel] = novos
+            if variavel in self._lidas:
+                self.alterado = True
+
+    def _rotulos_variavel(self, variavel: str):
+        self._lidas.add(variavel)
+        return self.motor.fontes.get(variavel) or self.variaveis.get(variavel, frozenset())
+
+    def _sink(self, regra: str, rotulos, deslocamento: int):
+        for regra_rotulo, origem in rotulos:
+            if regra_rotulo != regra:
+                continue
+            if origem == ORIGEM_FONTE:
+                self.arquivo.achados.add((regra, deslocamento))
+            else:
+                self.sinks.add((regra, origem))
+
+    def _percorrer(self, inicio: int, fim: int):
+        arquivo = self.arquivo
+        sig, par = arquivo.sig, arquivo.par
+        i = inicio
+        while i < fim:
+            if i in arquivo.corpos:
+                i = arquivo.corpos[i]
+                continue
+            tipo, texto, deslocamento = sig[i]
+            if tipo == VARIAVEL:
+                i = self._atribuicao(i, fim)
+                continue
+            if tipo == ABRE_TAG and texto == "<?=":
+                j = arquivo.fim_expressao(i + 1, fim, virgula=False)
+                self._construcao("echo", self.rotulos(i + 1, j), deslocamento)
+                i = j
+                continue
+            if tipo == IDENTIFICADOR:
+                palavra = texto.lower()
+                if palavra in CONSTRUCOES_SINK or palavra == "return":
+                    j = arquivo.fim_expressao(i + 1, fim, virgula=False)
+                    rotulos = self.rotulos(i + 1, j)
+                    if palavra == "return":
+                        self.retorno |= rotulos
+                    else:
+                        self._construcao(palavra, rotulos, deslocamento)
+                    if i in arquivo.inclusoes:
+                        self._incluir(arquivo.inclusoes[i])
+                    i = j
+                    continue
+                if palavra == "foreach" and arquivo.eh(i + 1, "("):
+                    self._foreach(i + 1)
+                    i = par[i + 1] + 1
+                    continue
+                if palavra == "list" and arquivo.eh(i + 1, "(") and self._destruturacao(i + 1, fim):
+                    i = par[i + 1] + 1
+                    continue
+                if arquivo.eh(i + 1, "(") and palavra not in _CONTROLE:
+                    self.rotulos(i, par[i + 1] + 1)
+                    i = par[i + 1] + 1
+                    continue
+            elif tipo == OPERADOR and texto == "[" and self._destruturacao(i, fim):
+                i = par[i] + 1
+                continue
+            elif tipo == STRING and texto[:1] == SINK_CRASE:
+                self.rotulos(i, i + 1)
+            i += 1
+
+    def _atribuicao(self, i: int, fim: int) -> int:
+        """Trata '$var[...]->prop = expr' e retorna onde a varredura continua."""
+        arquivo = self.arquivo
+        sig = arquivo.sig
+        j = i + 1
+        while j < fim:
+            tipo, texto, _ = sig[j]
+            if tipo == OPERADOR and texto == "[":
+                j = arquivo.par[j] + 1
+            elif tipo == OPERADOR and texto in _PREFIXOS_METODO and j + 1 < fim and sig[j + 1][0] in (IDENTIFICADOR, VARIAVEL):
+                j += 2
+            else:
+                break
+        if j < fim and sig[j][0] == OPERADOR and sig[j][1] in _ATRIBUICOES:
+            fim_valor = arquivo.fim_expressao(j + 1, fim)
+            self.contaminar(sig[i][1], self.rotulos(j + 1, fim_valor))
+            return fim_valor
+        return i + 1
+
+    def _destruturacao(self, abertura: int, fim: int) -> bool:
+        """Trata '[$a, $b] = expr' e 'list($a, $b) = expr'."""
+        arquivo = self.arquivo
+        fecha = arquivo.par[abertura]
+        if not arquivo.eh(fecha + 1, "="):
+            return False
+        fim_valor = arquivo.fim_expressao(fecha + 2, fim)
+        rotulos = self.rotulos(fecha + 2, fim_valor)
+        for tipo, texto, _ in arquivo.sig[abertura + 1:fecha]:
+            if tipo == VARIAVEL:
+                self.contaminar(texto, rotulos)
+        return True
+
+    def _foreach(self, abertura: int):
+        """Em 'foreach (expr as $chave => $valor)', chave e valor recebem os rótulos de expr."""
+        arquivo = self.arquivo
+        fecha = arquivo.par[abertura]
+        i = abertura + 1
+        while i < fecha:
+            tipo, texto, _ = arquivo.sig[i]
+            if tipo == OPERADOR and texto in _ABERTURAS:
+                i = arquivo.par[i] + 1
+                continue
+            if tipo == IDENTIFICADOR and texto.lower() == "as":
+                rotulos = self.rotulos(abertura + 1, i)
+                for tipo_alvo, alvo, _ in arquivo.sig[i + 1:fecha]:
+                    if tipo_alvo == VARIAVEL:
+                        self.contaminar(alvo, rotulos)
+                return
+            i += 1
+
+    def _incluir(self, caminho: str):
+        resumo = self.arquivo.resumos_incluidos.get(caminho)
+        if resumo is not None:
+            for variavel, rotulos in resumo.globais.items():
+                self.contaminar(variavel, rotulos)
+
+    def _construcao(self, palavra: str, rotulos, deslocamento: int):
+        for regra in self.motor.regras_por_sink.get(palavra, ()):
+            self._sink(regra, rotulos, deslocamento)
+
+    def rotulos(self, inicio: int, fim: int) -> set:
+        """Rótulos do valor da expressão entre os índices informados."""
+        arquivo = self.arquivo
+        sig, par = arquivo.sig, arquivo.par
+        rotulos = set()
+        i = inicio
+        while i < fim:
+            tipo, texto, deslocamento = sig[i]
+            if tipo == VARIAVEL:
+                rotulos |= self._rotulos_variavel(texto)
+            elif tipo == STRING or tipo == HEREDOC:
+                if (texto[0] in ('"', SINK_CRASE) if tipo == STRING else "'" not in texto[:texto.find("\n")]):
+                    interpolados = set()
+                    for variavel in INTERPOLACAO.finditer(texto):
+                        interpolados |= self._rotulos_variavel(variavel.group())
+                    if texto[0] == SINK_CRASE:
+                        self._construcao(SINK_CRASE, interpolados, deslocamento)
+                    rotulos |= interpolados
+            elif tipo == IDENTIFICADOR:
+                palavra = texto.lower()
+                if i in arquivo.corpos:
+                    i = arquivo.corpos[i]
+                    continue
+                if arquivo.eh(i + 1, "(") and palavra not in ("function", "fn"):
+                    rotulos |= self._chamada(i, par[i + 1])
+                    i = par[i + 1] + 1
+                    continue
+                if palavra in CONSTRUCOES_SINK:
+                    restante = self.rotulos(i + 1, fim)
+                    self._construcao(palavra, restante, deslocamento)
+                    rotulos |= restante
+                    break
+            elif (tipo == OPERADOR and texto == "(" and i + 2 < fim and sig[i + 1][0] == IDENTIFICADOR
+                  and sig[i + 1][1].lower() in _CONVERSOES and arquivo.eh(i + 2, ")")):
+                i = arquivo.fim_termo(i + 3, fim)
+                continue
+            i += 1
+        return rotulos
+
+    def _argumentos(self, abertura: int, fecha: int) -> list:
+        argumentos = []
+        inicio = abertura + 1
+        while inicio < fecha:
+            fim = self.arquivo.fim_expressao(inicio, fecha)
+            argumentos.append(self.rotulos(inicio, fim))
+            inicio = fim + 1
+        return argumentos
+
+    def _chamada(self, i: int, fecha: int) -> set:
+        """Avalia uma chamada: verifica sinks, aplica sanitizadores e o resumo da função chamada."""
+        sig = self.arquivo.sig
+        motor = self.motor
+        tipo, texto, deslocamento = sig[i]
+        nome = texto.rsplit("\\", 1)[-1].lower()
+        anterior = sig[i - 1] if i > 0 else None
+        prefixo = ""
+        if anterior is not None and anterior[0] == OPERADOR:
+            prefixo = _PREFIXOS_METODO.get(anterior[1], "")
+        argumentos = self._argumentos(i + 1, fecha)
+
+        regras_sink = motor.regras_por_sink.get(prefixo + nome, ())
+        for regra in regras_sink:
+            for rotulos in argumentos:
+                self._sink(regra, rotulos, deslocamento)
+        if nome in SANITIZADORES_GERAIS and not prefixo:
+            return set()
+
+        instanciacao = anterior is not None and anterior[0] == IDENTIFICADOR and anterior[1].lower() == "new"
+        resumo = None if instanciacao else self.arquivo.funcoes.get(nome)
+        if resumo is None:
+            # Funções desconhecidas repassam os rótulos dos argumentos, exceto
+            # sinks, cujo retorno (resultado de consulta, saída de comando) não
+            # é a própria entrada.
+            resultado = set() if regras_sink else set().union(*argumentos)
+        else:
+            resultado = {rotulo for rotulo in resumo.retorno if rotulo[1] == ORIGEM_FONTE}
+            for indice, rotulos in enumerate(argumentos):
+                for regra, origem in rotulos:
+                    if (regra, indice) in resumo.retorno:
+                        resultado.add((regra, origem))
+                    if (regra, indice) in resumo.sinks:
+                        self._sink(regra, ((regra, origem),), deslocamento)
+
+        sanitizadas = motor.regras_por_sanitizador.get(nome)
+        if sanitizadas:
+            resultado = {rotulo for rotulo in resultado if rotulo[0] not in sanitizadas}
+        return resultado
+
+
+class MotorTaint:
+    """
+    Análise de fluxo de dados entre fontes (entrada do usuário) e sinks, por
+    arquivo, com resumos por função reaproveitados entre arquivos ligados por
+    include/require.
+
+    A análise é propositalmente leve: os rótulos de cada variável só crescem
+    (não há remoção por reatribuição nem distinção entre ramos), laços são
+    tratados repetindo o escopo até estabilizar e métodos são resolvidos
+    apenas pelo nome. O código de nível superior de um arquivo incluído é
+    analisado isoladamente; suas variáveis contaminadas passam a quem o inclui.
+
+    Os resumos ficam em memória, indexados pelo caminho do arquivo. Um resumo
+    só é recalculado quando muda o conteúdo do arquivo ou a impressão de
+    algum resumo incluído por ele.
+    """
+    def __init__(self, regras: list[RegraTaint]):
+        self.regras = list(regras)
+        self.nomes_regras = [regra.nome for regra in self.regras]
+        # fonte -> rótulos que ela introduz
+        fontes = {}
+        for regra in self.regras:
+            for fonte in regra.fontes:
+                fontes.setdefault(fonte, set()).add((regra.nome, ORIGEM_FONTE))
+        self.fontes = {fonte: frozenset(rotulos) for fonte, rotulos in fontes.items()}
+        self.regras_por_sink = {}
+        self.regras_por_sanitizador = {}
+        for regra in self.regras:
+            for sink in regra.sinks:
+                self.regras_por_sink.setdefault(sink, []).append(regra.nome)
+            for sanitizador in regra.sanitizadores:
+                self.regras_por_sanitizador.setdefault(sanitizador, set()).add(regra.nome)
+
+        # Prefiltros de relevante(): as fontes, as inclusões e os sinks com as inclusões.
+        self._prefiltro_fontes = self._prefiltro(self.fontes)
+        self._prefiltro_inclusoes = self._prefiltro(INCLUSOES)
+        self._prefiltro_sinks = self._prefiltro(set(INCLUSOES) | set(self.regras_por_sink))
+
+        # caminho -> ResumoArquivo
+        self._resumos = {}
+        # caminho -> (mtime, tamanho, hash do conteúdo) dos arquivos lidos do disco
+        self._estado_disco = {}
+        self.recalculados = 0
+
+    @staticmethod
+    def _prefiltro(nomes) -> re.Pattern:
+        termos = sorted(re.escape(nome.lstrip("->:")) for nome in nomes if nome != SINK_CRASE)
+        if SINK_CRASE in nomes:
+            termos.append(SINK_CRASE)
+        return re.compile("|".join(termos), re.IGNORECASE)
+
+    def relevante(self, codigo: str) -> bool:
+        """
+        Indica se o código pode ter achados: menciona uma inclusão (que pode
+        trazer fontes, funções e sinks de outro arquivo) ou, sem inclusões,
+        uma fonte e um sink. Caso contrário não há o que analisar.
+        """
+        if self._prefiltro_fontes.search(codigo) is not None:
+            return self._prefiltro_sinks.search(codigo) is not None
+        return self._prefiltro_inclusoes.search(codigo) is not None
+
+    def analisar(self, codigo: str, caminho: str = None, tokens: TokensPHP = None) -> ResumoArquivo:
+        """
+        Analisa o código de um arquivo e retorna seu resumo, com os achados em
+        'achados'. Sem caminho, inclusões não são resolvidas e nada é guardado.
+        'tokens' evita tokenizar de novo um código que já passou pelo
+        analisador léxico.
+        """
+        if caminho is None:
+            return self._calcular(codigo, None, calcular_hash_conteudo(codigo), (), tokens)
+        return self._resumo(os.path.abspath(caminho), codigo, (), tokens)
+
+    def _resumo(self, caminho: str, codigo: str | None, em_andamento: tuple,
+                tokens: TokensPHP = None) -> ResumoArquivo | None:
+        if codigo is None:
+            hash_conteudo, codigo = self._conteudo_em_disco(caminho)
+            if hash_conteudo is None:
+                return None
+        else:
+            hash_conteudo = calcular_hash_conteudo(codigo)
+
+        em_andamento = em_andamento + (caminho,)
+        anterior = self._resumos.get(caminho)
+        if anterior is not None and anterior.hash_conteudo == hash_conteudo and all(
+                dependencia in em_andamento or getattr(self._resumo(dependencia, None, em_andamento), "impressao", None) == impressao
+                for dependencia, impressao in anterior.inclusoes.items()):
+            return anterior
+
+        if codigo is None:
+            codigo = self._ler(caminho)
+            if codigo is None:
+                return None
+            hash_conteudo = calcular_hash_conteudo(codigo)
+        resumo = self._calcular(codigo, caminho, hash_conteudo, em_andamento, tokens)
+        self._resumos[caminho] = resumo
+        return resumo
+
+    def _calcular(self, codigo: str, caminho: str | None, hash_conteudo: str, em_andamento: tuple,
+                  tokens: TokensPHP = None) -> ResumoArquivo:
+        self.recalculados += 1
+        arquivo = _Arquivo(self, codigo, caminho, tokens)
+
+        inclusoes = {}
+        dependencias = {}
+        for incluido in dict.fromkeys(arquivo.inclusoes.values()):
+            if incluido in em_andamento:
+                continue
+            resumo = self._resumo(incluido, None, em_andamento)
+            if resumo is None:
+                continue
+            arquivo.resumos_incluidos[incluido] = resumo
+            arquivo.funcoes.update(resumo.funcoes)
+            inclusoes[incluido] = resumo.impressao
+            dependencias[incluido] = resumo.hash_conteudo
+            dependencias.update(resumo.dependencias)
+
+        # As funções do próprio arquivo partem de resumos vazios, que só crescem
+        # a cada iteração; assim os achados acumulados nunca precisam ser desfeitos.
+        externas = dict(arquivo.funcoes)
+        proprias = {nome: ResumoFuncao() for nome, _, _, _ in arquivo.declaracoes if nome is not None}
+        arquivo.funcoes = {**externas, **proprias}
+        for _ in range(MAX_ITERACOES_FUNCOES):
+            novas = {}
+            for nome, parametros, inicio, fim in arquivo.declaracoes:
+                escopo = _Escopo(arquivo, parametros)
+                escopo.executar(inicio, fim)
+                if nome is not None:
+                    novas[nome] = novas[nome].unir(escopo.resumo()) if nome in novas else escopo.resumo()
+            if novas == proprias:
+                break
+            proprias = novas
+            arquivo.funcoes = {**externas, **proprias}
+
+        nivel_superior = _Escopo(arquivo)
+        nivel_superior.executar(0, len(arquivo.sig))
+        globais = {}
+        for variavel, rotulos in nivel_superior.variaveis.items():
+            rotulos = frozenset(rotulo for rotulo in rotulos if rotulo[1] == ORIGEM_FONTE)
+            if rotulos:
+                globais[variavel] = rotulos
+
+        ordem = {nome: indice for indice, nome in enumerate(self.nomes_regras)}
+        achados = sorted({(regra, arquivo.tokens.linha(deslocamento)) for regra, deslocamento in arquivo.achados},
+                         key=lambda achado: (ordem[achado[0]], achado[1]))
+        return ResumoArquivo(hash_conteudo, arquivo.funcoes, globais, achados, inclusoes, dependencias)
+
+    def _conteudo_em_disco(self, caminho: str) -> tuple:
+        """
+        Retorna (hash, conteúdo) de um arquivo incluído. Se o arquivo não mudou
+        desde a última leitura, o conteúdo não é lido novamente e vem como None.
+        """
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            return None, None
+        conhecido = self._estado_disco.get(caminho)
+        if conhecido is not None and conhecido[:2] == (estado.st_mtime_ns, estado.st_size):
+            return conhecido[2], None
+        codigo = self._ler(caminho)
+        return (None, None) if codigo is None else (self._estado_disco[caminho][2], codigo)
+
+    def _ler(self, caminho: str) -> str | None:
+        try:
+            estado = os.stat(caminho)
+            with open(caminho, 'r', encoding='utf-8', errors='replace') as arquivo:
+                codigo = arquivo.read()
+        except OSError:
+            return None
+        self._estado_disco[caminho] = (estado.st_mtime_ns, estado.st_size, calcular_hash_conteudo(codigo))
+        return codigo
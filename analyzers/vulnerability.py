@@ -1,8 +1,34 @@
 import os
+import unicodedata
+
+# Severidades das regras, da mais grave para a menos grave; severidades
+# desconhecidas ficam abaixo de todas.
+ORDEM_SEVERIDADE = {"Crítica": 0, "Alta": 1, "Média": 2, "Baixa": 3, "Informativa": 4}
+
+
+def _sem_acentos(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", texto) if not unicodedata.combining(c)).lower()
+
+
+def interpretar_severidade(texto: str) -> str:
+    """Converte 'alta', 'critica', 'Média'... no nome da severidade. Lança ValueError se não existir."""
+    for severidade in ORDEM_SEVERIDADE:
+        if _sem_acentos(severidade) == _sem_acentos(texto.strip()):
+            return severidade
+    raise ValueError(f"severidade inválida: '{texto}' (use {', '.join(ORDEM_SEVERIDADE)})")
+
+
+def severidade_atinge(severidade: str, minima: str) -> bool:
+    """Indica se a severidade é igual ou mais grave que 'minima'."""
+    return ORDEM_SEVERIDADE.get(severidade, len(ORDEM_SEVERIDADE)) <= ORDEM_SEVERIDADE[minima]
+
+
 class Vulnerabilidade:
     """
     Representa uma vulnerabilidade de segurança encontrada no código.
     """
+    __slots__ = ("type", "description", "severity", "line", "code_snippet", "suggestion", "file_path")
+
     def __init__(self, vul_type: str, description: str, severity: str,
                  line: int, code_snippet: str, suggestion: str, file_path: str):
         self.type = vul_type
@@ -12,7 +38,11 @@ class Vulnerabilidade:
         self.code_snippet = code_snippet
         self.suggestion = suggestion
         self.file_path = file_path
-        self.file_name = os.path.basename(file_path)
+
+    @property
+    def file_name(self) -> str:
+        """Nome do arquivo, derivado de file_path quando solicitado."""
+        return os.path.basename(self.file_path)
 
     def __str__(self):
         return (f"Tipo: {self.type}\n"
@@ -34,4 +64,17 @@ class Vulnerabilidade:
             "suggestion": self.suggestion,
             "file_path": self.file_path,
             "file_name": self.file_name 
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Vulnerabilidade":
+        """Recria uma vulnerabilidade a partir do dicionário gerado por to_dict()."""
+        return cls(
+            vul_type=data["type"],
+            description=data["description"],
+            severity=data["severity"],
+            line=data["line"],
+            code_snippet=data["code_snippet"],
+            suggestion=data["suggestion"],
+            file_path=data["file_path"]
+        )
@@ -0,0 +1,295 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from analyzers.discovery import ARQUIVOS_IGNORE_PADRAO, EXTENSOES_PHP, descobrir_arquivos_php
+from analyzers.vulnerability import Vulnerabilidade
+
+# Intervalo entre as verificações quando o inotify não está disponível.
+INTERVALO_VERIFICACAO = 0.5
+
+# Uma sequência de gravações é tratada de uma vez: a análise começa quando
+# nenhum evento chega por ESPERA_RAJADA segundos, ou após ESPERA_MAXIMA_RAJADA.
+ESPERA_RAJADA = 0.1
+ESPERA_MAXIMA_RAJADA = 1.0
+
+# Constantes do inotify(7).
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_MASCARA_INOTIFY = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+                    | _IN_MOVE_SELF | _IN_ONLYDIR)
+_CABECALHO_EVENTO = struct.Struct("iIII")
+
+
+def _estado_arquivo(file_path: str) -> tuple | None:
+    """(mtime em ns, tamanho) do arquivo, ou None se ele não existir mais."""
+    try:
+        estado = os.stat(file_path)
+    except OSError:
+        return None
+    return estado.st_mtime_ns, estado.st_size
+
+
+class _Inotify:
+    """Acesso mínimo ao inotify do Linux pela libc, sem dependências externas."""
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.descritor = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.descritor < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        # descritor do watch -> diretório observado
+        self.diretorios = {}
+
+    def observar(self, diretorio: str):
+        """Observa o diretório. Lança OSError se não for possível (ex.: limite de watches atingido)."""
+        descritor_watch = self.libc.inotify_add_watch(self.descritor, os.fsencode(diretorio), _MASCARA_INOTIFY)
+        if descritor_watch < 0:
+            erro = ctypes.get_errno()
+            raise OSError(erro, f"{os.strerror(erro)}: '{diretorio}'")
+        self.diretorios[descritor_watch] = diretorio
+
+    def ler(self, tempo_limite: float) -> list[tuple] | None:
+        """
+        Espera até tempo_limite segundos e retorna os eventos disponíveis como
+        (diretório ou None, nome, máscara), ou None se nenhum chegou.
+        """
+        if not select.select([self.descritor], [], [], tempo_limite)[0]:
+            return None
+        try:
+            dados = os.read(self.descritor, 64 * 1024)
+        except BlockingIOError:
+            return []
+        eventos = []
+        posicao = 0
+        while posicao + _CABECALHO_EVENTO.size <= len(dados):
+            descritor_watch, mascara, _, tamanho = _CABECALHO_EVENTO.unpack_from(dados, posicao)
+            posicao += _CABECALHO_EVENTO.size
+            nome = os.fsdecode(dados[posicao:posicao + tamanho].split(b"\0", 1)[0])
+            posicao += tamanho
+            if mascara & _IN_IGNORED:
+                self.diretorios.pop(descritor_watch, None)
+                continue
+            eventos.append((self.diretorios.get(descritor_watch), nome, mascara))
+        return eventos
+
+    def fechar(self):
+        os.close(self.descritor)
+
+
+class ObservadorArquivos:
+    """
+    Acompanha os arquivos descobertos em um conjunto de caminhos (com as
+    mesmas opções de descobrir_arquivos_php) e informa quais foram criados,
+    alterados ou removidos.
+
+    No Linux usa o inotify: a espera não consome processamento e apenas os
+    arquivos citados nos eventos são verificados. Nos demais sistemas, ou se
+    o inotify falhar, compara a cada INTERVALO_VERIFICACAO segundos a data de
+    modificação e o tamanho dos arquivos conhecidos e dos diretórios
+    percorridos. Nos dois casos a descoberta completa só é refeita quando a
+    estrutura muda (diretórios, arquivos novos, .gitignore/.analysisignore).
+    """
+    def __init__(self, caminhos: list, opcoes_descoberta: dict = None, usar_inotify: bool = True):
+        self.caminhos = list(caminhos)
+        self.opcoes_descoberta = dict(opcoes_descoberta or {})
+        self.extensoes = tuple(self.opcoes_descoberta.get("extensoes", EXTENSOES_PHP))
+        self.arquivos_ignore = set(self.opcoes_descoberta.get("arquivos_ignore", ARQUIVOS_IGNORE_PADRAO))
+        # caminho -> (mtime em ns, tamanho), na ordem da descoberta
+        self.arquivos = {}
+        # diretório percorrido -> mtime em ns (usado sem inotify)
+        self.diretorios = {}
+        # caminho normalizado -> caminho como gerado pela descoberta
+        self._normalizados = {}
+        self.inotify = None
+        if usar_inotify and sys.platform.startswith("linux"):
+            try:
+                self.inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"Aviso: inotify indisponível ({e}); verificando as alterações a cada "
+                      f"{INTERVALO_VERIFICACAO}s.", file=sys.stderr)
+        self.modo = "inotify" if self.inotify is not None else "verificação periódica"
+
+    def iniciar(self) -> list:
+        """Descobre os arquivos dos caminhos e retorna-os, na ordem da descoberta."""
+        self.arquivos = {}
+        for file_path in self._descobrir():
+            estado = _estado_arquivo(file_path)
+            if estado is not None:
+                self.arquivos[file_path] = estado
+        return list(self.arquivos)
+
+    def _descobrir(self) -> list:
+        arquivos = []
+        diretorios = []
+        for caminho in self.caminhos:
+            arquivos.extend(descobrir_arquivos_php(caminho, diretorios=diretorios, **self.opcoes_descoberta))
+            if os.path.isfile(caminho):
+                # O arquivo pode ser substituído (gravação com renomeação) sem que seu diretório seja percorrido.
+                diretorios.append(os.path.dirname(caminho) or ".")
+        arquivos = list(dict.fromkeys(arquivos))
+        self._normalizados = {os.path.normpath(file_path): file_path for file_path in arquivos}
+        if self.inotify is not None:
+            observados = set(self.inotify.diretorios.values())
+            for diretorio in dict.fromkeys(diretorios):
+                if diretorio in observados:
+                    continue
+                try:
+                    self.inotify.observar(diretorio)
+                except OSError as e:
+                    print(f"Aviso: Não foi possível observar '{diretorio}' com inotify ({e}); verificando as "
+                          f"alterações a cada {INTERVALO_VERIFICACAO}s.", file=sys.stderr)
+                    self.inotify.fechar()
+                    self.inotify = None
+                    self.modo = "verificação periódica"
+                    break
+        self.diretorios = {}
+        for diretorio in diretorios:
+            try:
+                self.diretorios[diretorio] = os.stat(diretorio).st_mtime_ns
+            except OSError:
+                pass
+        return arquivos
+
+    def aguardar(self, parar=None) -> tuple[list, list]:
+        """
+        Bloqueia até que algum arquivo observado seja criado, alterado ou
+        removido e retorna (criados ou alterados, removidos). Eventos que
+        chegam em sequência, como os de um editor que grava vários arquivos,
+        são reunidos em uma única resposta. Retorna ([], []) quando 'parar'
+        (um threading.Event) é sinalizado.
+        """
+        while parar is None or not parar.is_set():
+            if self.inotify is not None:
+                candidatos, estrutura = self._esperar_eventos()
+            else:
+                candidatos, estrutura = self._verificar_periodicamente(parar)
+            if candidatos or estrutura:
+                alterados, removidos = self._comparar(candidatos, estrutura)
+                if alterados or removidos:
+                    return alterados, removidos
+        return [], []
+
+    def _esperar_eventos(self) -> tuple[set, bool]:
+        eventos = self.inotify.ler(INTERVALO_VERIFICACAO)
+        if eventos is None:
+            return set(), False
+        candidatos = set()
+        estrutura = self._interpretar_eventos(eventos, candidatos)
+        limite = time.monotonic() + ESPERA_MAXIMA_RAJADA
+        while time.monotonic() < limite:
+            eventos = self.inotify.ler(ESPERA_RAJADA)
+            if eventos is None:
+                break
+            estrutura = self._interpretar_eventos(eventos, candidatos) or estrutura
+        return candidatos, estrutura
+
+    def _interpretar_eventos(self, eventos: list, candidatos: set) -> bool:
+        """Acrescenta a 'candidatos' os arquivos conhecidos citados e indica se a estrutura mudou."""
+        estrutura = False
+        for diretorio, nome, mascara in eventos:
+            if mascara & _IN_Q_OVERFLOW or not nome or mascara & _IN_ISDIR:
+                estrutura = True
+                continue
+            if diretorio is None:
+                continue
+            file_path = self._normalizados.get(os.path.normpath(os.path.join(diretorio, nome)))
+            if file_path is not None:
+                candidatos.add(file_path)
+            elif nome in self.arquivos_ignore or (nome.lower().endswith(self.extensoes)
+                                                  and mascara & (_IN_CREATE | _IN_MOVED_TO | _IN_CLOSE_WRITE)):
+                estrutura = True
+        return estrutura
+
+    def _verificar_periodicamente(self, parar) -> tuple[set, bool]:
+        if parar is not None:
+            parar.wait(INTERVALO_VERIFICACAO)
+        else:
+            time.sleep(INTERVALO_VERIFICACAO)
+        for diretorio, mtime in self.diretorios.items():
+            try:
+                if os.stat(diretorio).st_mtime_ns != mtime:
+                    return set(), True
+            except OSError:
+                return set(), True
+        return set(self.arquivos), False
+
+    def _comparar(self, candidatos: set, estrutura: bool) -> tuple[list, list]:
+        """
+        Atualiza o estado dos arquivos e retorna os criados ou alterados e os
+        removidos. Sem mudança de estrutura, apenas os candidatos são verificados.
+        """
+        if estrutura:
+            caminhos = self._descobrir()
+            candidatos = set(caminhos)
+        else:
+            caminhos = list(self.arquivos)
+        atuais = {}
+        alterados = []
+        for file_path in caminhos:
+            anterior = self.arquivos.get(file_path)
+            estado = _estado_arquivo(file_path) if file_path in candidatos else anterior
+            if estado is None:
+                continue
+            atuais[file_path] = estado
+            if estado != anterior:
+                alterados.append(file_path)
+        removidos = [file_path for file_path in self.arquivos if file_path not in atuais]
+        self.arquivos = atuais
+        return alterados, removidos
+
+    def fechar(self):
+        if self.inotify is not None:
+            self.inotify.fechar()
+            self.inotify = None
+
+
+class AchadosPorArquivo:
+    """
+    Saída contínua que mantém as vulnerabilidades agrupadas por arquivo,
+    permitindo substituir as de um arquivo reanalisado sem refazer os demais.
+    """
+    def __init__(self):
+        self.por_arquivo = {}
+
+    def escrever(self, vulnerability: Vulnerabilidade):
+        self.por_arquivo.setdefault(vulnerability.file_path, []).append(vulnerability)
+
+    def fechar(self):
+        pass
+
+    def limpar_arquivo(self, file_path: str) -> int:
+        """Descarta as vulnerabilidades do arquivo, mantendo sua posição, e retorna quantas eram."""
+        anteriores = self.por_arquivo.get(file_path)
+        if anteriores is None:
+            return 0
+        self.por_arquivo[file_path] = []
+        return len(anteriores)
+
+    def remover(self, file_path: str) -> int:
+        """Descarta o arquivo e suas vulnerabilidades e retorna quantas eram."""
+        return len(self.por_arquivo.pop(file_path, ()))
+
+    def contar(self, file_path: str) -> int:
+        return len(self.por_arquivo.get(file_path, ()))
+
+    @property
+    def total(self) -> int:
+        return sum(len(vulnerabilidades) for vulnerabilidades in self.por_arquivo.values())
+
+    def vulnerabilidades(self):
+        """Todas as vulnerabilidades, na ordem em que os arquivos foram analisados pela primeira vez."""
+        for vulnerabilidades in self.por_arquivo.values():
+            yield from vulnerabilidades
@@ -0,0 +1,263 @@
+"""
+Benchmarks do analisador com um corpus PHP sintético e reprodutível.
+
+Exemplos:
+    python benchmark.py --files 500 --lines 300 --output bench.json
+    python benchmark.py --pathological-lines 5 --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from config import Configuracao
+from analyzers.detector import DetectorVulnerabilidade
+from script import AnalisadorEstatico, collect_php_files_from_path
+
+VUL_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Vul', 'php_vulnerabilities.json')
+
+# Linhas que disparam as regras distribuídas com a ferramenta.
+LINHAS_VULNERAVEIS = [
+    "echo ($_GET['nome']);",
+    "$_POST['campo'] = $valor;",
+    "$resultado = mysql_query($sql);",
+    "$r = mysqli_query($conn, \"SELECT * FROM t WHERE id = \" . $_GET['id']);",
+    "eval($codigo);",
+    "$saida = shell_exec('ls ' . $dir);",
+    "system($comando);",
+    "include($_GET['pagina']);",
+    "$dados = unserialize($entrada);",
+    "$hash = md5($senha);",
+    "$id = $_REQUEST['user_id'];",
+]
+
+# Fragmentos usados para compor linhas comuns, sem ocorrências.
+FRAGMENTOS_NEUTROS = [
+    "$valor", "$this->servico", "->calcular(", "$a, $b", ")", ";", "return", "array(", "'chave' => $item",
+    "if ($total > 0) {", "}", "foreach ($itens as $item) {", "$lista[] = $item;", "// comentário",
+    "$texto = sprintf('%s', $nome);", "$contador++;",
+]
+
+
+def _linha_neutra(rng: random.Random, comprimento: int) -> str:
+    partes = []
+    tamanho = 0
+    while tamanho < comprimento:
+        fragmento = rng.choice(FRAGMENTOS_NEUTROS)
+        partes.append(fragmento)
+        tamanho += len(fragmento) + 1
+    return "    " + " ".join(partes)
+
+
+def _linha_patologica(rng: random.Random, comprimento: int) -> str:
+    """
+    Linhas longas que exercitam os piores casos das regras: aberturas sem
+    fechamento para padrões com '.*', e código minificado em uma só linha.
+    """
+    tipo = rng.randrange(3)
+    if tipo == 0:
+        return "unserialize(" + "a" * comprimento
+    if tipo == 1:
+        return "mysqli_query($c, " + "$_GET[x" * (comprimento // 7)
+    instrucoes = []
+    while sum(len(i) for i in instrucoes) < comprimento:
+        instrucoes.append(rng.choice(FRAGMENTOS_NEUTROS + LINHAS_VULNERAVEIS))
+    return "".join(instrucoes)
+
+
+def gerar_corpus(diretorio: str, arquivos: int = 200, linhas: int = 200, comprimento_linha: int = 80,
+                 densidade: float = 0.02, linhas_patologicas: int = 0, comprimento_patologico: int = 20000,
+                 semente: int = 42) -> list[str]:
+    """
+    Gera um corpus PHP sintético e reprodutível no diretório informado.
+    'densidade' é a fração de linhas vulneráveis; 'linhas_patologicas' é a
+    quantidade de linhas longas e adversariais distribuídas pelo corpus.
+    Retorna a lista de arquivos gerados.
+    """
+    rng = random.Random(semente)
+    os.makedirs(diretorio, exist_ok=True)
+    caminhos = []
+    for indice in range(arquivos):
+        subdiretorio = os.path.join(diretorio, f"modulo_{indice % 10}")
+        os.makedirs(subdiretorio, exist_ok=True)
+        caminho = os.path.join(subdiretorio, f"arquivo_{indice}.php")
+        conteudo = ["<?php"]
+        for _ in range(linhas):
+            if rng.random() < densidade:
+                conteudo.append("    " + rng.choice(LINHAS_VULNERAVEIS))
+            else:
+                conteudo.append(_linha_neutra(rng, comprimento_linha))
+        conteudo.append("?>")
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write("\n".join(conteudo))
+        caminhos.append(caminho)
+
+    for _ in range(linhas_patologicas):
+        caminho = rng.choice(caminhos)
+        with open(caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.write("\n" + _linha_patologica(rng, comprimento_patologico))
+    return caminhos
+
+
+def _cronometrar(funcao, repeticoes: int) -> dict:
+    """Executa a função várias vezes, com a saída padrão suprimida, e resume os tempos."""
+    tempos = []
+    for _ in range(repeticoes):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append(time.perf_counter() - inicio)
+    return {
+        "segundos_min": min(tempos),
+        "segundos_mediana": statistics.median(tempos),
+        "segundos_media": statistics.mean(tempos),
+        "repeticoes": repeticoes,
+        "resultado": resultado,
+    }
+
+
+def executar_benchmarks(args) -> dict:
+    diretorio_temporario = tempfile.mkdtemp(prefix="analysis_bench_")
+    try:
+        diretorio_corpus = os.path.join(diretorio_temporario, "corpus")
+        diretorio_relatorios = os.path.join(diretorio_temporario, "report")
+        caminhos = gerar_corpus(diretorio_corpus, args.files, args.lines, args.line_length, args.density,
+                                args.pathological_lines, args.pathological_length, args.seed)
+        tamanho_total = sum(os.path.getsize(caminho) for caminho in caminhos)
+
+        conteudos = []
+        for caminho in caminhos:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                conteudos.append((caminho, arquivo.read()))
+
+        detector = DetectorVulnerabilidade(Configuracao(VUL_CONFIG_PATH), fluxo_de_dados=args.taint)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analisador = AnalisadorEstatico(VUL_CONFIG_PATH, diretorio_saida=diretorio_relatorios,
+                                            fluxo_de_dados=args.taint)
+
+        resultados = {}
+        medicao = _cronometrar(lambda: len(collect_php_files_from_path(diretorio_corpus)), args.repeat)
+        resultados["collect_php_files_from_path"] = medicao
+
+        medicao = _cronometrar(lambda: sum(len(detector.analyze_php_code(codigo, caminho))
+                                           for caminho, codigo in conteudos), args.repeat)
+        medicao["mb_por_segundo"] = tamanho_total / 1024 / 1024 / medicao["segundos_min"]
+        resultados["DetectorVulnerabilidade.analyze_php_code"] = medicao
+
+        medicao = _cronometrar(lambda: len(analisador.analisar_multiplos_arquivos_php(caminhos, generate_reports=False,
+                                                                                      jobs=args.jobs)),
+                               args.repeat)
+        medicao["arquivos_por_segundo"] = len(caminhos) / medicao["segundos_min"]
+        resultados["AnalisadorEstatico.analisar_multiplos_arquivos_php"] = medicao
+
+        # O relatório fica preenchido pela última análise acima.
+        relatorio = analisador.relatorio
+        resultados["GeradorRelatorio.gerar_html"] = _cronometrar(
+            lambda: relatorio.gerar_html("benchmark.html"), args.repeat)
+        resultados["GeradorRelatorio.gerar_pdf"] = _cronometrar(
+            lambda: relatorio.gerar_pdf("benchmark.pdf"), args.repeat)
+        # Os geradores retornam False quando Jinja2 ou ReportLab não estão instalados.
+        for nome in ("GeradorRelatorio.gerar_html", "GeradorRelatorio.gerar_pdf"):
+            resultados[nome]["disponivel"] = resultados[nome]["resultado"] is not False
+
+        return {
+            "metadados": {
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "parametros": {
+                    "arquivos": args.files,
+                    "linhas": args.lines,
+                    "comprimento_linha": args.line_length,
+                    "densidade": args.density,
+                    "linhas_patologicas": args.pathological_lines,
+                    "comprimento_patologico": args.pathological_length,
+                    "semente": args.seed,
+                    "jobs": args.jobs,
+                    "fluxo_de_dados": args.taint,
+                },
+                "bytes_corpus": tamanho_total,
+            },
+            "resultados": resultados,
+        }
+    finally:
+        shutil.rmtree(diretorio_temporario, ignore_errors=True)
+
+
+def comparar(atual: dict, anterior: dict, tolerancia: float):
+    """
+    Exibe a variação do tempo mínimo de cada medição em relação a uma
+    execução anterior. Retorna True se alguma piorou além da tolerância.
+    """
+    regressao = False
+    print("\nComparação com a execução anterior (tempo mínimo):")
+    for nome, medicao in atual["resultados"].items():
+        anterior_medicao = anterior.get("resultados", {}).get(nome)
+        if not medicao.get("disponivel", True):
+            print(f"- {nome}: indisponível nesta execução")
+            continue
+        if not anterior_medicao or not anterior_medicao.get("disponivel", True) or not anterior_medicao["segundos_min"]:
+            print(f"- {nome}: sem medição anterior")
+            continue
+        variacao = medicao["segundos_min"] / anterior_medicao["segundos_min"] - 1
+        marcador = ""
+        if variacao > tolerancia:
+            marcador = "  <-- REGRESSÃO"
+            regressao = True
+        print(f"- {nome}: {anterior_medicao['segundos_min']:.4f}s -> {medicao['segundos_min']:.4f}s "
+              f"({variacao:+.1%}){marcador}")
+    return regressao
+
+
+def _criar_parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks do analisador com corpus PHP sintético.")
+    parser.add_argument("--files", type=int, default=200, help="Quantidade de arquivos do corpus (padrão: 200).")
+    parser.add_argument("--lines", type=int, default=200, help="Linhas por arquivo (padrão: 200).")
+    parser.add_argument("--line-length", type=int, default=80, help="Comprimento aproximado das linhas (padrão: 80).")
+    parser.add_argument("--density", type=float, default=0.02, help="Fração de linhas vulneráveis (padrão: 0.02).")
+    parser.add_argument("--pathological-lines", type=int, default=0,
+                        help="Quantidade de linhas longas e adversariais no corpus (padrão: 0).")
+    parser.add_argument("--pathological-length", type=int, default=20000,
+                        help="Comprimento das linhas adversariais (padrão: 20000).")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador do corpus (padrão: 42).")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições de cada medição (padrão: 3).")
+    parser.add_argument("--jobs", type=int, default=1, help="Processos usados na análise completa (padrão: 1).")
+    parser.add_argument("--taint", action="store_true",
+                        help="Inclui a análise de fluxo de dados (--taint do script.py) nas medições.")
+    parser.add_argument("--output", help="Arquivo JSON onde os resultados serão gravados.")
+    parser.add_argument("--compare", help="Arquivo JSON de uma execução anterior para comparação.")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Piora relativa aceita antes de acusar regressão (padrão: 0.10).")
+    return parser
+
+
+if __name__ == "__main__":
+    args = _criar_parser_argumentos().parse_args()
+    resultado = executar_benchmarks(args)
+
+    print(f"Corpus: {args.files} arquivo(s), {resultado['metadados']['bytes_corpus'] / 1024 / 1024:.1f} MB")
+    for nome, medicao in resultado["resultados"].items():
+        if not medicao.get("disponivel", True):
+            print(f"- {nome}: indisponível (dependência não instalada)")
+            continue
+        print(f"- {nome}: mín {medicao['segundos_min']:.4f}s, mediana {medicao['segundos_mediana']:.4f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        if comparar(resultado, anterior, args.tolerance):
+            sys.exit(1)
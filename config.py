@@ -1,15 +1,142 @@
+import hashlib
 import json
+import marshal
 import os
 import sys
 
+from analyzers.discovery import EXTENSOES_PHP
+from analyzers.rule_lint import RISCO_ALTO, analisar_regras, exibir_relatorio_regras
+
+# Versão do formato do cache de regras; altere ao mudar o conteúdo guardado
+# ou a forma como os metadados são calculados.
+VERSAO_CACHE_REGRAS = 2
+
+# Linguagem dos pacotes de regras no formato antigo (apenas a lista de regras).
+# As regras 'token' e 'taint' e a remoção de comentários usam o analisador
+# léxico de PHP e só valem em pacotes dessa linguagem.
+LINGUAGEM_PHP = "php"
+
+
+def caminho_cache_regras(vulnerabilities_config_path: str) -> str:
+    """
+    Arquivo do cache de metadados das regras: fica em '__pycache__', ao lado do
+    JSON, como o bytecode do Python, e é específico da versão do interpretador.
+    """
+    diretorio, nome = os.path.split(os.path.abspath(vulnerabilities_config_path))
+    return os.path.join(diretorio, "__pycache__", f"{nome}.{sys.implementation.cache_tag}.regras")
+
+
+def _normalizar_extensoes(extensoes) -> tuple:
+    """Extensões em minúsculas e com o ponto inicial, sem repetições."""
+    normalizadas = []
+    for extensao in extensoes:
+        extensao = extensao.strip().lower()
+        extensao = extensao if extensao.startswith(".") else "." + extensao
+        if extensao not in normalizadas:
+            normalizadas.append(extensao)
+    return tuple(normalizadas)
+
+
 class Configuracao:
     """
     Gerencia as configurações do analisador estático, incluindo os padrões de vulnerabilidades.
+    Cada arquivo é um pacote de regras: uma lista de regras (pacote PHP, para
+    os arquivos EXTENSOES_PHP) ou um objeto {"linguagem": ..., "extensoes":
+    [...], "regras": [...]} que indica a quais arquivos as regras se aplicam.
+    Ao carregar, os padrões passam por uma verificação estática de construções
+    propensas a backtracking catastrófico; as de risco alto são avisadas no
+    console quando verificar_regras é True.
+
+    Com usar_cache, as regras já validadas, seus diagnósticos, o hash e as
+    palavras-chave extraídas pelo detector são guardados com marshal em
+    caminho_cache_regras(). O cache vale enquanto a data de modificação e o
+    tamanho do JSON forem os mesmos ou, se mudarem, enquanto o hash do
+    conteúdo for o mesmo; caso contrário o JSON é lido e validado de novo.
     """
-    def __init__(self, vulnerabilities_config_path: str):
+    def __init__(self, vulnerabilities_config_path: str, verificar_regras: bool = True, usar_cache: bool = True):
         self.vulnerabilities_config_path = vulnerabilities_config_path
         self.patterns = {}  # Dicionário para armazenar os padrões de vulnerabilidades
-        self._carregar_configuracoes()
+        self.linguagem = LINGUAGEM_PHP
+        self.extensoes = EXTENSOES_PHP
+        # (padrão, flags) -> palavras-chave extraídas pelo detector (ou None), guardadas no cache.
+        self.palavras_chave_padroes = {}
+        self.usar_cache = usar_cache
+        self._hash_regras = None
+        self._hash_arquivo = None
+        self._assinatura_arquivo = None
+        if not (usar_cache and self._carregar_cache_regras()):
+            self._carregar_configuracoes()
+            # nome da regra -> [(risco, mensagem)] das regras com algum diagnóstico
+            self.diagnosticos_regras = analisar_regras(self.patterns)
+            self.salvar_cache_regras()
+        if verificar_regras:
+            self._avisar_regras_arriscadas()
+
+    def _carregar_cache_regras(self) -> bool:
+        """Carrega as regras do cache, se ele corresponder ao JSON atual. Retorna False caso contrário."""
+        caminho_cache = caminho_cache_regras(self.vulnerabilities_config_path)
+        try:
+            estado = os.stat(self.vulnerabilities_config_path)
+            with open(caminho_cache, 'rb') as arquivo:
+                dados = marshal.load(arquivo)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if not isinstance(dados, dict) or dados.get("versao") != VERSAO_CACHE_REGRAS:
+            return False
+
+        assinatura = (estado.st_mtime_ns, estado.st_size)
+        if dados["assinatura_arquivo"] != assinatura:
+            # Arquivo tocado ou copiado sem mudar o conteúdo: o hash decide.
+            try:
+                with open(self.vulnerabilities_config_path, 'rb') as arquivo:
+                    conteudo = arquivo.read()
+            except OSError:
+                return False
+            if hashlib.sha256(conteudo).hexdigest() != dados["hash_arquivo"]:
+                return False
+
+        self.patterns = dados["patterns"]
+        self.diagnosticos_regras = dados["diagnosticos_regras"]
+        self.palavras_chave_padroes = dados["palavras_chave_padroes"]
+        self.linguagem = dados["linguagem"]
+        self.extensoes = dados["extensoes"]
+        self._hash_regras = dados["hash_regras"]
+        self._hash_arquivo = dados["hash_arquivo"]
+        self._assinatura_arquivo = assinatura
+        if dados["assinatura_arquivo"] != assinatura:
+            self.salvar_cache_regras()
+        return True
+
+    def salvar_cache_regras(self):
+        """
+        Grava o cache de metadados das regras. Falhas de gravação (por exemplo,
+        diretório sem permissão de escrita) são ignoradas: o cache é opcional.
+        """
+        if not self.usar_cache or self._assinatura_arquivo is None:
+            return
+        caminho_cache = caminho_cache_regras(self.vulnerabilities_config_path)
+        dados = {
+            "versao": VERSAO_CACHE_REGRAS,
+            "assinatura_arquivo": self._assinatura_arquivo,
+            "hash_arquivo": self._hash_arquivo,
+            "hash_regras": self.obter_hash_regras(),
+            "patterns": self.patterns,
+            "diagnosticos_regras": self.diagnosticos_regras,
+            "palavras_chave_padroes": self.palavras_chave_padroes,
+            "linguagem": self.linguagem,
+            "extensoes": self.extensoes,
+        }
+        temporario = f"{caminho_cache}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(caminho_cache), exist_ok=True)
+            with open(temporario, 'wb') as arquivo:
+                marshal.dump(dados, arquivo)
+            os.replace(temporario, caminho_cache)
+        except (OSError, ValueError):
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
 
     def _carregar_configuracoes(self):
         """
@@ -20,9 +147,27 @@ class Configuracao:
             sys.exit(1)
         
         try:
-            with open(self.vulnerabilities_config_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                self.patterns = {item['vulnerability']: item for item in data}
+            estado = os.stat(self.vulnerabilities_config_path)
+            with open(self.vulnerabilities_config_path, 'rb') as file:
+                conteudo = file.read()
+            data = json.loads(conteudo.decode('utf-8'))
+            if isinstance(data, dict):
+                self.linguagem = str(data.get('linguagem', LINGUAGEM_PHP)).lower()
+                extensoes = data.get('extensoes')
+                if extensoes is None and self.linguagem == LINGUAGEM_PHP:
+                    extensoes = EXTENSOES_PHP
+                if not isinstance(extensoes, (list, tuple)) or not extensoes \
+                        or not all(isinstance(extensao, str) and extensao.strip() for extensao in extensoes):
+                    print(f"Erro: O pacote de regras '{self.vulnerabilities_config_path}' deve informar as "
+                          "extensões dos arquivos em 'extensoes' (ex.: [\".js\", \".mjs\"]).", file=sys.stderr)
+                    sys.exit(1)
+                self.extensoes = _normalizar_extensoes(extensoes)
+                data = data.get('regras', [])
+            self.patterns = {item['vulnerability']: item for item in data}
+            if self.linguagem != LINGUAGEM_PHP:
+                self._descartar_regras_php()
+            self._hash_arquivo = hashlib.sha256(conteudo).hexdigest()
+            self._assinatura_arquivo = (estado.st_mtime_ns, estado.st_size)
         except json.JSONDecodeError:
             print(f"Erro: O arquivo '{self.vulnerabilities_config_path}' não é um JSON válido.", file=sys.stderr)
             sys.exit(1)
@@ -30,6 +175,18 @@ class Configuracao:
             print(f"Erro ao carregar configurações de vulnerabilidades de '{self.vulnerabilities_config_path}': {e}", file=sys.stderr)
             sys.exit(1)
 
+    def _descartar_regras_php(self):
+        for vul_name in [nome for nome, item in self.patterns.items() if 'token' in item or 'taint' in item]:
+            print(f"Aviso: Regra '{vul_name}' ignorada: os campos 'token' e 'taint' só valem em pacotes de "
+                  f"regras PHP, e '{self.vulnerabilities_config_path}' é de '{self.linguagem}'.", file=sys.stderr)
+            del self.patterns[vul_name]
+
+    def _avisar_regras_arriscadas(self):
+        for vul_name, diagnosticos in self.diagnosticos_regras.items():
+            for risco, mensagem in diagnosticos:
+                if risco == RISCO_ALTO:
+                    print(f"Aviso: Regra '{vul_name}': {mensagem}.", file=sys.stderr)
+
     def obter_padrao_vulnerabilidade(self, vulnerability_name: str) -> dict:
         """
         Retorna os detalhes de um padrão de vulnerabilidade pelo seu nome.
@@ -43,6 +200,59 @@ class Configuracao:
         """
         return list(self.patterns.values())
 
+    def obter_hash_regras(self) -> str:
+        """
+        Retorna um hash SHA-256 do conjunto de regras carregado, independente
+        da formatação do arquivo JSON. Muda sempre que alguma regra muda.
+        """
+        if self._hash_regras is None:
+            conteudo = json.dumps(self.obter_todos_padroes_vulnerabilidades(), sort_keys=True, ensure_ascii=False)
+            self._hash_regras = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+        return self._hash_regras
+
+
+class ConfiguracaoCombinada:
+    """
+    Várias Configuracao (pacotes de regras) vistas como uma só, com a mesma
+    interface usada pelo detector, para os arquivos aos quais mais de um
+    pacote se aplica. Em nomes de regra repetidos, prevalece o último pacote.
+    """
+    def __init__(self, configuracoes: list):
+        self.configuracoes = list(configuracoes)
+        self.patterns = {}
+        self.diagnosticos_regras = {}
+        self.palavras_chave_padroes = {}
+        for configuracao in self.configuracoes:
+            self.patterns.update(configuracao.patterns)
+            self.diagnosticos_regras.update(configuracao.diagnosticos_regras)
+            self.palavras_chave_padroes.update(configuracao.palavras_chave_padroes)
+        # O arquivo é lido como PHP se algum dos pacotes for de PHP (ex.: modelos .phtml).
+        linguagens = [configuracao.linguagem for configuracao in self.configuracoes]
+        self.linguagem = LINGUAGEM_PHP if LINGUAGEM_PHP in linguagens else linguagens[0]
+        self._hash_regras = None
+
+    def salvar_cache_regras(self):
+        """Devolve a cada pacote as palavras-chave extraídas de seus padrões e grava os caches alterados."""
+        for configuracao in self.configuracoes:
+            padroes = {item.get('pattern') for item in configuracao.patterns.values()}
+            novas = {chave: valor for chave, valor in self.palavras_chave_padroes.items()
+                     if chave[0] in padroes and chave not in configuracao.palavras_chave_padroes}
+            if novas:
+                configuracao.palavras_chave_padroes.update(novas)
+                configuracao.salvar_cache_regras()
+
+    def obter_padrao_vulnerabilidade(self, vulnerability_name: str) -> dict:
+        return self.patterns.get(vulnerability_name, {})
+
+    def obter_todos_padroes_vulnerabilidades(self) -> list:
+        return list(self.patterns.values())
+
+    def obter_hash_regras(self) -> str:
+        if self._hash_regras is None:
+            conteudo = json.dumps([configuracao.obter_hash_regras() for configuracao in self.configuracoes])
+            self._hash_regras = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+        return self._hash_regras
+
 if __name__ == "__main__":
     # Assumindo que 'Vul' está no mesmo nível que 'config.py'
     config_file_path = os.path.join('Vul', 'php_vulnerabilities.json')
@@ -60,4 +270,7 @@ if __name__ == "__main__":
     if sql_vul:
         print(f"  Mensagem: {sql_vul.get('message', 'N/A')}")
     else:
-        print("  Vulnerabilidade 'SQL Injection' não encontrada.")
\ No newline at end of file
+        print("  Vulnerabilidade 'SQL Injection' não encontrada.")
+
+    print()
+    exibir_relatorio_regras(config.patterns, config.diagnosticos_regras)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import sys
+
+# Apenas o módulo do servidor, que usa somente a biblioteca padrão: o cliente
+# não carrega as regras, o Jinja2 nem o ReportLab.
+from analyzers.daemon import ENCERRAR, ESTADO, ErroDaemon, endereco_padrao, enviar_requisicao
+
+USO = "python daemon_client.py [caminho...] [--socket ENDERECO] [--stdin CAMINHO] [--json] [--status] [--stop]"
+
+
+def _criar_parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(usage=USO, description="Cliente do servidor de análise iniciado com "
+                                                             "'python script.py --daemon'.")
+    parser.add_argument("paths", nargs="*", help="Arquivos ou diretórios a analisar.")
+    parser.add_argument("--socket", default=endereco_padrao(), metavar="ENDERECO",
+                        help=f"Socket Unix ou 'host:porta' do servidor (padrão: {endereco_padrao()}).")
+    parser.add_argument("--stdin", metavar="CAMINHO",
+                        help="Analisa o código lido da entrada padrão como se fosse o arquivo informado "
+                             "(ex.: o buffer ainda não salvo de um editor).")
+    parser.add_argument("--json", action="store_true", help="Exibe a resposta do servidor em JSON.")
+    parser.add_argument("--status", action="store_true", help="Exibe o estado do servidor e encerra.")
+    parser.add_argument("--stop", action="store_true", help="Encerra o servidor.")
+    parser.add_argument("--timeout", type=float, default=None, metavar="SEGUNDOS",
+                        help="Tempo máximo de espera pela resposta (padrão: sem limite).")
+    return parser
+
+
+def main() -> int:
+    """
+    Retorna 0 se não houver achados, 1 se houver achados e 2 em caso de erro,
+    o que permite usar o cliente diretamente em hooks de pre-commit.
+    """
+    args = _criar_parser_argumentos().parse_args()
+
+    if args.status or args.stop:
+        requisicao = {"comando": ESTADO if args.status else ENCERRAR}
+    else:
+        if not args.paths and not args.stdin:
+            print("Erro: Nenhum arquivo, diretório ou --stdin informado.", file=sys.stderr)
+            print(f"Uso: {USO}", file=sys.stderr)
+            return 2
+        # O servidor tem seu próprio diretório de trabalho.
+        requisicao = {"arquivos": [os.path.abspath(caminho) for caminho in args.paths]}
+        if args.stdin:
+            requisicao["buffers"] = [{"caminho": os.path.abspath(args.stdin), "conteudo": sys.stdin.read()}]
+
+    try:
+        resposta = enviar_requisicao(args.socket, requisicao, args.timeout)
+    except ErroDaemon as e:
+        print(f"Erro: {e}. Inicie o servidor com 'python script.py --daemon'.", file=sys.stderr)
+        return 2
+
+    if args.json or args.status:
+        print(json.dumps(resposta, ensure_ascii=False, indent=2))
+    if not resposta.get("ok"):
+        if not args.json:
+            print(f"Erro: {resposta.get('erro')}", file=sys.stderr)
+        return 2
+    if args.status or args.stop:
+        return 0
+
+    if not args.json:
+        for erro in resposta["erros"]:
+            print(erro, file=sys.stderr)
+        for diagnostico in resposta["diagnosticos"]:
+            print(f"Aviso: Regra '{diagnostico['regra']}' em '{diagnostico['arquivo']}': {diagnostico['mensagem']}.",
+                  file=sys.stderr)
+        # Formato arquivo:linha, reconhecido pelos editores.
+        for achado in resposta["achados"]:
+            print(f"{achado['file_path']}:{achado['line']}: {achado['type']} (Severidade: {achado['severity']})")
+        print(f"{len(resposta['achados'])} vulnerabilidade(s) em {resposta['arquivos_analisados']} arquivo(s) "
+              f"analisado(s) em {resposta['segundos'] * 1000:.0f} ms.", file=sys.stderr)
+    if resposta["erros"]:
+        return 2
+    return 1 if resposta["achados"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,37 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 import os
+import queue
 import threading
 import subprocess
+import time
 
 from script import AnalisadorEstatico
+from analyzers.discovery import descobrir_arquivos_php
+from analyzers.registry import DIRETORIO_REGRAS_PADRAO
+
+# Intervalo entre as leituras da fila de eventos da análise e quantidade
+# máxima de eventos tratados por leitura, para que a janela continue respondendo.
+INTERVALO_ATUALIZACAO_MS = 100
+MAX_EVENTOS_POR_ATUALIZACAO = 500
+
+CORES_SEVERIDADE = {"Crítica": "red", "Alta": "red", "Média": "orange", "Baixa": "blue"}
+
+
+class SaidaFilaGUI:
+    """
+    Saída contínua do relatório que repassa cada vulnerabilidade, assim que
+    é encontrada, à fila de eventos lida pela thread da interface.
+    """
+    def __init__(self, fila: queue.Queue):
+        self.fila = fila
+
+    def escrever(self, vulnerability):
+        self.fila.put(("achado", vulnerability))
+
+    def fechar(self):
+        pass
+
 
 class SecurityAnalyzerGUI:
     def __init__(self, master):
@@ -12,18 +39,28 @@ class SecurityAnalyzerGUI:
         master.title("Analisador de Vulnerabilidades PHP")
         master.geometry("800x600")
 
-        vul_config_json_path = os.path.join(os.path.dirname(__file__), 'Vul', 'php_vulnerabilities.json')
         output_report_dir = "report"
 
         try:
-            self.analyzer = AnalisadorEstatico(vul_config_json_path, diretorio_saida=output_report_dir)
+            self.analyzer = AnalisadorEstatico(DIRETORIO_REGRAS_PADRAO, diretorio_saida=output_report_dir)
         except Exception as e:
             messagebox.showerror("Erro de Inicialização", f"Não foi possível inicializar o analisador: {e}")
             master.destroy()
             return
 
+        # Arquivos e pastas selecionados; as pastas são percorridas durante a análise.
         self.selected_files = []
 
+        # Eventos produzidos pela thread de análise: ("mensagem", texto, cor),
+        # ("achado", vulnerabilidade), ("progresso", arquivos analisados),
+        # ("erro", texto) e ("fim",). Apenas a thread do Tk altera os widgets.
+        self.fila = queue.Queue()
+        self.analyzer.saidas_adicionais.append(SaidaFilaGUI(self.fila))
+        self.analyzer.ao_analisar_arquivo = lambda file_path, analisados: self.fila.put(("progresso", analisados))
+        self.total_arquivos = None
+        self.inicio_analise = None
+        self.observando = False
+
         self.top_frame = tk.Frame(master, padx=10, pady=10)
         self.top_frame.pack(fill=tk.X)
 
@@ -42,9 +79,12 @@ class SecurityAnalyzerGUI:
         self.btn_add_files = tk.Button(self.top_frame, text="Adicionar Arquivos PHP", command=self.add_files)
         self.btn_add_files.pack(side=tk.LEFT, padx=5)
 
+        self.btn_add_folder = tk.Button(self.top_frame, text="Adicionar Pasta", command=self.add_folder)
+        self.btn_add_folder.pack(side=tk.LEFT, padx=5)
+
         self.btn_clear_files = tk.Button(self.top_frame, text="Limpar Lista", command=self.clear_files)
         self.btn_clear_files.pack(side=tk.LEFT, padx=5)
-        
+
         self.label_output = tk.Label(self.middle_frame, text="Sugestão:")
         self.label_output.pack(anchor=tk.W)
 
@@ -58,33 +98,106 @@ class SecurityAnalyzerGUI:
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.text_output.config(yscrollcommand=self.scrollbar.set)
 
+        for color in ("red", "orange", "green", "blue"):
+            self.text_output.tag_config(color, foreground=color)
+
+        self.progress_bar = ttk.Progressbar(self.middle_frame, orient=tk.HORIZONTAL, mode="determinate")
+        self.progress_bar.pack(fill=tk.X, pady=(5, 0))
+
+        self.label_progress = tk.Label(self.middle_frame, text="")
+        self.label_progress.pack(anchor=tk.W)
+
         self.generate_reports_var = tk.BooleanVar(value=True)
         self.chk_generate_reports = tk.Checkbutton(self.bottom_frame, text="Gerar Relatórios (HTML/PDF)", variable=self.generate_reports_var)
         self.chk_generate_reports.pack(side=tk.LEFT, padx=5)
 
+        # Após a análise, reanalisa os arquivos alterados até "Cancelar".
+        self.watch_var = tk.BooleanVar(value=False)
+        self.chk_watch = tk.Checkbutton(self.bottom_frame, text="Observar Alterações", variable=self.watch_var)
+        self.chk_watch.pack(side=tk.LEFT, padx=5)
+
         self.btn_analyze = tk.Button(self.bottom_frame, text="Iniciar Análise", command=self.start_analysis_thread, bg="green", fg="white")
         self.btn_analyze.pack(side=tk.LEFT, padx=5)
 
+        self.btn_cancel = tk.Button(self.bottom_frame, text="Cancelar", command=self.cancel_analysis, state=tk.DISABLED)
+        self.btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.btn_open_reports = tk.Button(self.bottom_frame, text="Abrir Relatórios", command=self.open_reports_folder, state=tk.DISABLED)
         self.btn_open_reports.pack(side=tk.RIGHT, padx=5)
 
+        self.master.after(INTERVALO_ATUALIZACAO_MS, self._drain_queue)
+
     def _log_message(self, message: str, color: str = "black"):
-        """Método auxiliar para adicionar mensagens ao Text widget."""
+        """
+        Enfileira uma mensagem para o Text widget. Pode ser chamado de
+        qualquer thread; o texto aparece na próxima leitura da fila.
+        """
+        self.fila.put(("mensagem", message, color))
+
+    def _drain_queue(self):
+        """
+        Trata os eventos acumulados desde a última leitura, com uma única
+        inserção no Text widget, e agenda a próxima leitura.
+        """
+        partes = []
+        for _ in range(MAX_EVENTOS_POR_ATUALIZACAO):
+            try:
+                evento = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            tipo = evento[0]
+            if tipo == "mensagem":
+                partes.extend((evento[1] + "\n", evento[2]))
+            elif tipo == "achado":
+                partes.extend(self._format_vulnerability(evento[1]))
+            elif tipo == "progresso":
+                self._update_progress(evento[1])
+            elif tipo == "erro":
+                partes.extend((f"Erro durante a análise: {evento[1]}\n", "red"))
+                self._insert_text(partes)
+                partes = []
+                messagebox.showerror("Erro de Análise", f"Ocorreu um erro durante a análise: {evento[1]}")
+            elif tipo == "fim":
+                self._insert_text(partes)
+                partes = []
+                self._finish_analysis()
+        self._insert_text(partes)
+        self.master.after(INTERVALO_ATUALIZACAO_MS, self._drain_queue)
+
+    def _insert_text(self, partes: list):
+        """Insere de uma vez os pares (texto, tag) no Text widget."""
+        if not partes:
+            return
         self.text_output.config(state=tk.NORMAL)
-        self.text_output.insert(tk.END, message + "\n", color)
+        self.text_output.insert(tk.END, *partes)
         self.text_output.see(tk.END)
         self.text_output.config(state=tk.DISABLED)
 
-        self.text_output.tag_config("red", foreground="red")
-        self.text_output.tag_config("orange", foreground="orange")
-        self.text_output.tag_config("green", foreground="green")
-        self.text_output.tag_config("blue", foreground="blue")
+    @staticmethod
+    def _format_vulnerability(vul) -> tuple:
+        texto = (f"Tipo: {vul.type}\n"
+                 f"Arquivo: {os.path.basename(vul.file_path)}\n"
+                 f"Linha: {vul.line}\n"
+                 f"Severidade: {vul.severity}\n"
+                 f"Sugestão: {vul.suggestion}\n"
+                 f"Trecho: '{vul.code_snippet}'\n"
+                 f"{'-' * 40}\n")
+        return texto, CORES_SEVERIDADE.get(vul.severity, "black")
 
+    def _update_progress(self, analisados: int):
+        decorrido = max(time.monotonic() - self.inicio_analise, 1e-6)
+        if self.total_arquivos:
+            self.progress_bar.config(value=analisados)
+            texto = f"{analisados} de {self.total_arquivos} arquivo(s)"
+        else:
+            texto = f"{analisados} arquivo(s)"
+        self.label_progress.config(text=f"{texto} - {analisados / decorrido:.1f} arquivo(s)/s - {decorrido:.1f}s")
 
     def add_files(self):
         files = filedialog.askopenfilenames(
-            title="Selecione Arquivos PHP para Análise",
-            filetypes=[("Arquivos PHP", "*.php"), ("Todos os Arquivos", "*.*")]
+            title="Selecione Arquivos para Análise",
+            filetypes=[("Arquivos com regras", " ".join(f"*{extensao}" for extensao in self.analyzer.registro.extensoes)),
+                       ("Todos os Arquivos", "*.*")]
         )
         if files:
             for f in files:
@@ -93,6 +206,13 @@ class SecurityAnalyzerGUI:
                     self.listbox_files.insert(tk.END, os.path.basename(f))
             self.btn_analyze.config(state=tk.NORMAL)
 
+    def add_folder(self):
+        folder = filedialog.askdirectory(title="Selecione uma Pasta para Análise")
+        if folder and folder not in self.selected_files:
+            self.selected_files.append(folder)
+            self.listbox_files.insert(tk.END, f"[pasta] {folder}")
+            self.btn_analyze.config(state=tk.NORMAL)
+
     def clear_files(self):
         self.selected_files = []
         self.listbox_files.delete(0, tk.END)
@@ -101,6 +221,8 @@ class SecurityAnalyzerGUI:
         self.text_output.config(state=tk.NORMAL)
         self.text_output.delete(1.0, tk.END)
         self.text_output.config(state=tk.DISABLED)
+        self.progress_bar.config(value=0)
+        self.label_progress.config(text="")
 
     def start_analysis_thread(self):
         if not self.selected_files:
@@ -109,67 +231,123 @@ class SecurityAnalyzerGUI:
 
         self.btn_analyze.config(state=tk.DISABLED, text="Analisando...")
         self.btn_add_files.config(state=tk.DISABLED)
+        self.btn_add_folder.config(state=tk.DISABLED)
         self.btn_clear_files.config(state=tk.DISABLED)
         self.btn_open_reports.config(state=tk.DISABLED)
-        self.chk_generate_reports.config(state=tk.DISABLED) 
+        self.chk_generate_reports.config(state=tk.DISABLED)
+        self.chk_watch.config(state=tk.DISABLED)
+        self.btn_cancel.config(state=tk.NORMAL)
 
         self.text_output.config(state=tk.NORMAL)
         self.text_output.delete(1.0, tk.END)
         self.text_output.config(state=tk.DISABLED)
-        
+
+        # Com pastas na lista, o total de arquivos só é conhecido ao fim da descoberta.
+        caminhos = list(self.selected_files)
+        self.total_arquivos = None if any(os.path.isdir(caminho) for caminho in caminhos) else len(caminhos)
+        if self.total_arquivos:
+            self.progress_bar.config(mode="determinate", maximum=self.total_arquivos, value=0)
+        else:
+            self.progress_bar.config(mode="indeterminate", value=0)
+            self.progress_bar.start(INTERVALO_ATUALIZACAO_MS)
+        self.label_progress.config(text="")
+        self.inicio_analise = time.monotonic()
+        self.analyzer.interromper.clear()
+
         self._log_message("Iniciando análise de segurança...\n", "blue")
-        
-        analysis_thread = threading.Thread(target=self.run_analysis)
+
+        self.observando = self.watch_var.get()
+        analysis_thread = threading.Thread(target=self.run_analysis,
+                                           args=(caminhos, self.generate_reports_var.get(), self.observando),
+                                           daemon=True)
         analysis_thread.start()
 
-    def run_analysis(self):
-        try:
-            self._log_message(f"Analisando {len(self.selected_files)} arquivo(s)...")
-            
-            vulnerabilities_found_overall = self.analyzer.analisar_multiplos_arquivos_php(
-                self.selected_files,
-                generate_reports=self.generate_reports_var.get() # Passa a opção
-            )
-            
-            if vulnerabilities_found_overall:
-                self._log_message("\n--- Vulnerabilidades Encontradas ---", "red")
-                for vul in vulnerabilities_found_overall:
-                    color = "black"
-                    if vul.severity == "Crítica" or vul.severity == "Alta":
-                        color = "red"
-                    elif vul.severity == "Média":
-                        color = "orange"
-                    elif vul.severity == "Baixa":
-                        color = "blue"
-                    self._log_message(
-                        f"Tipo: {vul.type}\n"
-                        f"Arquivo: {os.path.basename(vul.file_path)}\n"
-                        f"Linha: {vul.line}\n"
-                        f"Severidade: {vul.severity}\n"
-                        f"Sugestão: {vul.suggestion}\n"
-                        f"Trecho: '{vul.code_snippet}'\n"
-                        f"{'-' * 40}", color
-                    )
-                self._log_message("\nAnálise concluída. Relatórios gerados.", "green")
+    def cancel_analysis(self):
+        self.analyzer.interromper.set()
+        self.btn_cancel.config(state=tk.DISABLED)
+        if self.observando:
+            self._log_message("Encerrando a observação...", "orange")
+        else:
+            self._log_message("Cancelando a análise após o arquivo atual...", "orange")
+
+    def _iterate_files(self, caminhos: list):
+        """
+        Gera os arquivos selecionados e, à medida que são encontrados, os
+        arquivos das pastas com extensões atendidas pelos pacotes de regras.
+        """
+        extensoes = self.analyzer.registro.extensoes
+        for caminho in caminhos:
+            if os.path.isdir(caminho):
+                yield from descobrir_arquivos_php(caminho, extensoes=extensoes)
             else:
-                self._log_message("\nNenhuma vulnerabilidade encontrada.", "green")
-                self._log_message("Análise concluída. Nenhum relatório gerado pois não há vulnerabilidades.", "green")
+                yield caminho
 
+    def run_analysis(self, caminhos: list, generate_reports: bool, observar: bool = False):
+        """
+        Executa a análise fora da thread do Tk; a comunicação com a janela
+        passa pela fila. Com 'observar', continua reanalisando os arquivos
+        alterados até o cancelamento.
+        """
+        try:
+            self._log_message(f"Analisando {len(caminhos)} item(ns) selecionado(s)...")
+            if observar:
+                self.analyzer.observar_alteracoes(caminhos, generate_reports=generate_reports,
+                                                  ao_atualizar=self._on_watch_update)
+            else:
+                self.analyzer.analisar_multiplos_arquivos_php(self._iterate_files(caminhos),
+                                                              generate_reports=generate_reports)
         except Exception as e:
-            self._log_message(f"Erro durante a análise: {e}", "red")
-            messagebox.showerror("Erro de Análise", f"Ocorreu um erro durante a análise: {e}")
+            self.fila.put(("erro", str(e)))
         finally:
-            self.btn_analyze.config(state=tk.NORMAL, text="Iniciar Análise")
-            self.btn_add_files.config(state=tk.NORMAL)
-            self.btn_clear_files.config(state=tk.NORMAL)
-            self.chk_generate_reports.config(state=tk.NORMAL) 
-            self.btn_open_reports.config(state=tk.NORMAL if self.generate_reports_var.get() and vulnerabilities_found_overall else tk.DISABLED) # Ativa se relatórios foram gerados
-            
+            self.fila.put(("fim",))
+
+    def _on_watch_update(self, reanalisados: list, removidos: list, total: int):
+        """Chamado pela thread de análise após cada atualização da observação."""
+        partes = [f"{len(reanalisados)} arquivo(s) reanalisado(s)"]
+        if removidos:
+            partes.append(f"{len(removidos)} removido(s)")
+        self._log_message(f"Alteração detectada: {', '.join(partes)}; {total} vulnerabilidade(s) no total.\n",
+                          "blue")
+
+    def _finish_analysis(self):
+        """Restaura os controles e exibe o resumo ao término ou cancelamento da análise."""
+        self.progress_bar.stop()
+        analisados = self.analyzer.arquivos_analisados
+        if self.total_arquivos is None:
+            self.progress_bar.config(mode="determinate", maximum=max(analisados, 1), value=analisados)
+        self._update_progress(analisados)
+
+        total = self.analyzer.relatorio.total_vulnerabilidades
+        relatorios_gerados = bool(self.generate_reports_var.get() and total and not self.analyzer.interrompida)
+        if self.observando:
+            # Os relatórios da observação são regravados a cada atualização.
+            total = self.analyzer.achados_observados.total if self.analyzer.achados_observados else 0
+            relatorios_gerados = bool(self.generate_reports_var.get() and self.analyzer.achados_observados)
+            self._insert_text([f"\nObservação encerrada: {total} vulnerabilidade(s) nos arquivos observados.\n",
+                               "green"])
+        elif self.analyzer.interrompida:
+            self._insert_text([f"\nAnálise cancelada após {analisados} arquivo(s). Relatórios não gerados.\n", "orange"])
+        elif total:
+            resumo = f"\nAnálise concluída: {total} vulnerabilidade(s) em {analisados} arquivo(s)."
+            self._insert_text([resumo + (" Relatórios gerados.\n" if relatorios_gerados else "\n"), "green"])
+        else:
+            self._insert_text(["\nNenhuma vulnerabilidade encontrada.\n"
+                               "Análise concluída. Nenhum relatório gerado pois não há vulnerabilidades.\n", "green"])
+
+        self.btn_analyze.config(state=tk.NORMAL, text="Iniciar Análise")
+        self.btn_add_files.config(state=tk.NORMAL)
+        self.btn_add_folder.config(state=tk.NORMAL)
+        self.btn_clear_files.config(state=tk.NORMAL)
+        self.chk_generate_reports.config(state=tk.NORMAL)
+        self.chk_watch.config(state=tk.NORMAL)
+        self.btn_cancel.config(state=tk.DISABLED)
+        self.btn_open_reports.config(state=tk.NORMAL if relatorios_gerados else tk.DISABLED) # Ativa se relatórios foram gerados
+
     def open_reports_folder(self):
         report_path = self.analyzer.diretorio_saida
         if os.path.exists(report_path):
             try:
-                os.startfile(report_path) 
+                os.startfile(report_path)
             except AttributeError:
                 if os.sys.platform == "darwin":
                     subprocess.Popen(["open", report_path])
@@ -184,4 +362,4 @@ class SecurityAnalyzerGUI:
 if __name__ == "__main__":
     root = tk.Tk()
     app = SecurityAnalyzerGUI(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
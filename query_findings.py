@@ -0,0 +1,147 @@
+import argparse
+import json
+import sys
+
+from analyzers.store import HISTORICO_PADRAO, ErroHistorico, HistoricoAchados, interpretar_desde
+from analyzers.vulnerability import ORDEM_SEVERIDADE
+
+USO = "python query_findings.py [--db ARQUIVO] {runs,diff,trend} ..."
+
+
+def _criar_parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(usage=USO, description="Consulta o histórico de achados gravado com "
+                                                             "'python script.py ... --store'.")
+    parser.add_argument("--db", default=HISTORICO_PADRAO, metavar="ARQUIVO",
+                        help=f"Banco do histórico (padrão: {HISTORICO_PADRAO}).")
+    parser.add_argument("--json", action="store_true", help="Exibe o resultado em JSON.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    runs = comandos.add_parser("runs", help="Lista as execuções registradas.")
+    runs.add_argument("--last", type=int, default=20, metavar="N", help="Quantidade de execuções (padrão: 20).")
+
+    diff = comandos.add_parser("diff", help="Compara duas execuções: regras com mais ou menos achados, "
+                                            "achados novos e corrigidos.")
+    diff.add_argument("base", nargs="?", default=None,
+                      help="Execução de referência: id, 'ultima' ou 'penultima' (padrão: penultima).")
+    diff.add_argument("atual", nargs="?", default="ultima", help="Execução comparada (padrão: ultima).")
+    diff.add_argument("--since", metavar="QUANDO",
+                      help="Usa como referência a última execução concluída até essa data ('7d', '12h', "
+                           "'2w' ou uma data ISO, como 2024-05-01).")
+    diff.add_argument("--limit", type=int, default=50, metavar="N",
+                      help="Máximo de achados novos e corrigidos listados (padrão: 50; 0 para todos).")
+
+    trend = comandos.add_parser("trend", help="Achados por severidade nas últimas execuções.")
+    trend.add_argument("--last", type=int, default=10, metavar="N", help="Quantidade de execuções (padrão: 10).")
+    trend.add_argument("--rule", metavar="REGRA", help="Considera apenas os achados da regra informada.")
+    return parser
+
+
+def _listar_execucoes(historico: HistoricoAchados, args) -> int:
+    execucoes = historico.execucoes(args.last)
+    if args.json:
+        print(json.dumps([{"id": id_execucao, "concluida_em": concluida_em, "rotulo": rotulo,
+                           "arquivos_analisados": arquivos, "achados": achados}
+                          for id_execucao, concluida_em, rotulo, arquivos, achados in execucoes],
+                         ensure_ascii=False, indent=2))
+        return 0
+    if not execucoes:
+        print("Nenhuma execução registrada.")
+    for id_execucao, concluida_em, rotulo, arquivos, achados in execucoes:
+        print(f"{id_execucao:>5}  {concluida_em}  {arquivos:>7} arquivo(s)  {achados:>7} achado(s)"
+              + (f"  {rotulo}" if rotulo else ""))
+    return 0
+
+
+def _comparar(historico: HistoricoAchados, args) -> int:
+    """Retorna 1 se a execução atual tiver achados novos, como o daemon_client.py, para uso em CI."""
+    atual = historico.resolver_execucao(args.atual)
+    if args.since:
+        try:
+            desde = interpretar_desde(args.since)
+        except ValueError:
+            raise ErroHistorico(f"data inválida em --since: '{args.since}'")
+        base = historico.resolver_execucao(antes_de=desde)
+    else:
+        base = historico.resolver_execucao(args.base or "penultima")
+    limite = args.limit or None
+    regras = historico.comparar_regras(base, atual)
+    novos = historico.achados_novos(base, atual, limite)
+    corrigidos = historico.achados_novos(atual, base, limite)
+
+    if args.json:
+        def achados(linhas):
+            return [{"regra": regra, "severidade": severidade, "arquivo": arquivo, "linha": linha, "trecho": trecho,
+                     "ocorrencias": ocorrencias}
+                    for regra, severidade, arquivo, linha, trecho, ocorrencias in linhas]
+        print(json.dumps({"base": base, "atual": atual,
+                          "regras": [{"regra": regra, "severidade": severidade, "antes": antes, "depois": depois}
+                                     for regra, severidade, antes, depois in regras],
+                          "novos": achados(novos), "corrigidos": achados(corrigidos)}, ensure_ascii=False, indent=2))
+        return 1 if novos else 0
+
+    print(f"Comparando a execução {base} com a execução {atual}.")
+    if regras:
+        print("\nRegras com contagem alterada:")
+        for regra, severidade, antes, depois in regras:
+            print(f"  {depois - antes:+6d}  {regra} ({severidade}): {antes} -> {depois}")
+    else:
+        print("\nNenhuma regra com contagem alterada.")
+    for titulo, linhas in (("Achados novos", novos), ("Achados corrigidos", corrigidos)):
+        print(f"\n{titulo}: {len(linhas)}{' (limitado)' if limite and len(linhas) == limite else ''}")
+        for regra, severidade, arquivo, linha, trecho, ocorrencias in linhas:
+            repeticoes = f" (x{ocorrencias})" if ocorrencias > 1 else ""
+            print(f"  {arquivo}:{linha}: {regra} (Severidade: {severidade}){repeticoes}: {trecho}")
+    return 1 if novos else 0
+
+
+def _exibir_tendencia(historico: HistoricoAchados, args) -> int:
+    # id -> [concluída em, rótulo, {severidade: achados}]
+    execucoes = {}
+    for id_execucao, concluida_em, rotulo, severidade, achados in historico.tendencia(args.last, args.rule):
+        contagens = execucoes.setdefault(id_execucao, [concluida_em, rotulo, {}])[2]
+        if severidade is not None:
+            contagens[severidade] = achados
+    severidades = sorted({severidade for _, _, contagens in execucoes.values() for severidade in contagens},
+                         key=lambda s: (ORDEM_SEVERIDADE.get(s, len(ORDEM_SEVERIDADE)), s))
+    if args.json:
+        print(json.dumps([{"id": id_execucao, "concluida_em": concluida_em, "rotulo": rotulo, "severidades": contagens,
+                           "total": sum(contagens.values())}
+                          for id_execucao, (concluida_em, rotulo, contagens) in execucoes.items()],
+                         ensure_ascii=False, indent=2))
+        return 0
+    if not execucoes:
+        print("Nenhuma execução registrada.")
+        return 0
+    if args.rule:
+        print(f"Regra: {args.rule}")
+    print(f"{'id':>5}  {'concluída em':<19}  " + "  ".join(f"{s:>11}" for s in severidades) + f"  {'total':>7}")
+    anterior = None
+    for id_execucao, (concluida_em, rotulo, contagens) in execucoes.items():
+        total = sum(contagens.values())
+        variacao = f" ({total - anterior:+d})" if anterior is not None and total != anterior else ""
+        print(f"{id_execucao:>5}  {concluida_em:<19}  " + "  ".join(f"{contagens.get(s, 0):>11}" for s in severidades)
+              + f"  {total:>7}{variacao}" + (f"  {rotulo}" if rotulo else ""))
+        anterior = total
+    return 0
+
+
+def main() -> int:
+    """Retorna 0 em caso de sucesso, 1 se 'diff' encontrar achados novos e 2 em caso de erro."""
+    args = _criar_parser_argumentos().parse_args()
+    try:
+        historico = HistoricoAchados(args.db, somente_leitura=True)
+    except (ErroHistorico, OSError) as e:
+        print(f"Erro: Não foi possível abrir o histórico: {e}", file=sys.stderr)
+        return 2
+    comandos = {"runs": _listar_execucoes, "diff": _comparar, "trend": _exibir_tendencia}
+    try:
+        return comandos[args.comando](historico, args)
+    except ErroHistorico as e:
+        print(f"Erro: {e}.", file=sys.stderr)
+        return 2
+    finally:
+        historico.fechar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,57 +1,228 @@
+import html
+import json
 import os
-from typing import List
-from analyzers.vulnerability import Vulnerabilidade 
+from importlib.util import find_spec
+from analyzers.vulnerability import ORDEM_SEVERIDADE, Vulnerabilidade
+from analyzers.findings import TabelaAchados
 from datetime import datetime
 
 # Para geração de HTML e PDF, você precisaria instalar Jinja2 e ReportLab:
 # pip install Jinja2 reportlab
+#
+# As bibliotecas só são importadas na primeira geração de relatório
+# (_carregar_jinja2 e _carregar_reportlab): juntas, levam mais tempo para
+# carregar que uma análise curta inteira, e execuções com --no-report, o
+# servidor de análise e os hooks de pre-commit não as usam. Aqui apenas se
+# verifica se estão instaladas.
 
-try:
-    from jinja2 import Environment, FileSystemLoader
-    JINJA2_AVAILABLE = True
-except ImportError:
-    JINJA2_AVAILABLE = False
+JINJA2_AVAILABLE = find_spec("jinja2") is not None
+if not JINJA2_AVAILABLE:
     print("Aviso: Jinja2 não encontrado. A geração de relatórios HTML não estará disponível.", file=os.sys.stderr)
 
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER
-    from reportlab.lib import colors
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+REPORTLAB_AVAILABLE = find_spec("reportlab") is not None
+if not REPORTLAB_AVAILABLE:
     print("Aviso: ReportLab não encontrado. A geração de relatórios PDF não estará disponível.", file=os.sys.stderr)
 
 
+def _carregar_jinja2() -> bool:
+    """Importa o Jinja2 no escopo do módulo; retorna False se a importação falhar."""
+    global Environment, FileSystemLoader
+    try:
+        from jinja2 import Environment, FileSystemLoader
+    except ImportError as e:
+        print(f"Erro: Não foi possível importar o Jinja2: {e}", file=os.sys.stderr)
+        return False
+    return True
+
+
+def _carregar_reportlab() -> bool:
+    """Importa o ReportLab no escopo do módulo; retorna False se a importação falhar."""
+    global letter, SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    global getSampleStyleSheet, ParagraphStyle, TA_CENTER, colors
+    try:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib import colors
+    except ImportError as e:
+        print(f"Erro: Não foi possível importar o ReportLab: {e}", file=os.sys.stderr)
+        return False
+    return True
+
+
+def _escapar(texto: str) -> str:
+    """Escapa '&', '<' e '>' para a marcação dos parágrafos do ReportLab."""
+    return html.escape(texto, quote=False)
+
+# Ocorrências detalhadas por regra no PDF; as demais aparecem apenas como
+# contagem por arquivo, limitada a LIMITE_ARQUIVOS_RESUMO_PDF arquivos.
+LIMITE_OCORRENCIAS_POR_REGRA_PDF = 500
+LIMITE_ARQUIVOS_RESUMO_PDF = 200
+# Tabelas longas são divididas em blocos: o ReportLab quebra uma tabela entre
+# páginas recalculando-a inteira, o que fica quadrático em tabelas grandes.
+LINHAS_POR_TABELA_PDF = 100
+TAMANHO_MAXIMO_TRECHO_PDF = 300
+
+# Achados exibidos por página no relatório HTML, paginado no navegador.
+ACHADOS_POR_PAGINA_HTML = 100
+
+
+class SaidaJSONL:
+    """
+    Grava cada vulnerabilidade como uma linha JSON assim que ela é adicionada
+    ao relatório, sem mantê-la em memória.
+    """
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        # Buffer de linha: cada achado fica visível no arquivo assim que é gravado.
+        self.arquivo = open(caminho, 'w', encoding='utf-8', buffering=1)
+
+    def escrever(self, vulnerability: Vulnerabilidade):
+        self.arquivo.write(json.dumps(vulnerability.to_dict(), ensure_ascii=False) + "\n")
+
+    def fechar(self):
+        self.arquivo.close()
+        print(f"Achados em JSONL gravados em: {self.caminho}")
+
+
+class SaidaSARIF:
+    """
+    Grava as vulnerabilidades em um documento SARIF 2.1.0 à medida que são
+    adicionadas. Os resultados são escritos imediatamente; a descrição das
+    regras, que é pequena, é acumulada e escrita ao fechar o documento.
+    """
+    NIVEIS = {
+        "Crítica": "error",
+        "Alta": "error",
+        "Média": "warning",
+        "Baixa": "note",
+        "Informativa": "note",
+    }
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.regras = {}
+        self.total_resultados = 0
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        self.arquivo = open(caminho, 'w', encoding='utf-8', buffering=1)
+        self.arquivo.write('{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", '
+                           '"version": "2.1.0", "runs": [{"results": [\n')
+
+    def escrever(self, vulnerability: Vulnerabilidade):
+        if vulnerability.type not in self.regras:
+            self.regras[vulnerability.type] = {
+                "id": vulnerability.type,
+                "shortDescription": {"text": vulnerability.type},
+                "fullDescription": {"text": vulnerability.description},
+                "help": {"text": vulnerability.suggestion},
+                "properties": {"severity": vulnerability.severity},
+            }
+        resultado = {
+            "ruleId": vulnerability.type,
+            "level": self.NIVEIS.get(vulnerability.severity, "warning"),
+            "message": {"text": vulnerability.description},
+            "locations": [{
+                "physicalLocation": {
+                    "artifactLocation": {"uri": vulnerability.file_path.replace(os.sep, "/")},
+                    "region": {"startLine": vulnerability.line, "snippet": {"text": vulnerability.code_snippet}},
+                }
+            }],
+        }
+        separador = ",\n" if self.total_resultados else ""
+        self.arquivo.write(separador + json.dumps(resultado, ensure_ascii=False))
+        self.total_resultados += 1
+
+    def fechar(self):
+        ferramenta = {"driver": {"name": "AnalysisSecCode",
+                                 "informationUri": "https://github.com/pwviptbl/AnalysisSecCode",
+                                 "rules": list(self.regras.values())}}
+        self.arquivo.write('\n], "tool": ' + json.dumps(ferramenta, ensure_ascii=False) + '}]}\n')
+        self.arquivo.close()
+        print(f"Relatório SARIF gerado em: {self.caminho}")
+
+
 class GeradorRelatorio :
     """
     Gerencia e gera relatórios de vulnerabilidades encontradas.
+
+    As vulnerabilidades são guardadas em uma TabelaAchados compacta, e os
+    objetos Vulnerabilidade são recriados apenas quando acessados.
+    Saídas contínuas (JSONL, SARIF) recebem cada vulnerabilidade assim que
+    ela é adicionada. Com manter_em_memoria=False as vulnerabilidades não
+    são guardadas na lista, e o uso de memória não cresce com o número de
+    achados; os relatórios HTML/PDF podem ser gerados depois a partir do
+    arquivo JSONL com carregar_jsonl().
     """
-    def __init__(self, diretorio_saida: str = "report"):
-        self.vulnerabilities: List[Vulnerabilidade] = []
+    def __init__(self, diretorio_saida: str = "report", manter_em_memoria: bool = True):
+        self.vulnerabilities = TabelaAchados()
+        self.manter_em_memoria = manter_em_memoria
+        self.saidas = []
+        self.total_vulnerabilidades = 0
         self.diretorio_saida = diretorio_saida
         os.makedirs(self.diretorio_saida, exist_ok=True)
 
+        # Criado na primeira geração de relatório HTML.
         self.template_env = None
-        if JINJA2_AVAILABLE:
+
+    def _obter_ambiente_templates(self):
+        """Importa o Jinja2 e cria o ambiente de templates na primeira chamada."""
+        if self.template_env is None and JINJA2_AVAILABLE and _carregar_jinja2():
             template_path = os.path.join(os.path.dirname(__file__), 'templates')
             if os.path.exists(template_path):
                 self.template_env = Environment(loader=FileSystemLoader(template_path))
             else:
                 print(f"Aviso: Pasta de templates '{template_path}' não encontrada. A geração de relatórios HTML pode falhar.", file=os.sys.stderr)
-
+        return self.template_env
 
     def adicionar_vulnerabilidade(self, vulnerability: Vulnerabilidade):
         """
-        Adiciona uma vulnerabilidade à lista para o relatório.
+        Adiciona uma vulnerabilidade à lista para o relatório e a repassa às
+        saídas contínuas registradas.
+        """
+        self.total_vulnerabilidades += 1
+        for saida in self.saidas:
+            saida.escrever(vulnerability)
+        if self.manter_em_memoria:
+            self.vulnerabilities.adicionar(vulnerability)
+
+    def adicionar_saida(self, saida):
+        """
+        Registra uma saída contínua (por exemplo SaidaJSONL ou SaidaSARIF),
+        que recebe cada vulnerabilidade adicionada a partir de agora.
+        """
+        self.saidas.append(saida)
+
+    def fechar_saidas(self):
+        """Finaliza e remove todas as saídas contínuas registradas."""
+        for saida in self.saidas:
+            saida.fechar()
+        self.saidas = []
+
+    def limpar(self):
+        """Descarta as vulnerabilidades acumuladas para iniciar uma nova análise."""
+        self.vulnerabilities = TabelaAchados()
+        self.total_vulnerabilidades = 0
+
+    def carregar_jsonl(self, caminho: str):
+        """
+        Carrega para a memória as vulnerabilidades gravadas por uma SaidaJSONL,
+        permitindo gerar os relatórios HTML/PDF depois da análise.
         """
-        self.vulnerabilities.append(vulnerability)
+        self.vulnerabilities = TabelaAchados()
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                if linha.strip():
+                    self.vulnerabilities.adicionar(Vulnerabilidade.from_dict(json.loads(linha)))
+        self.total_vulnerabilidades = len(self.vulnerabilities)
 
-    def get_vulnerabilities(self) -> List[Vulnerabilidade]:
+    def get_vulnerabilities(self) -> TabelaAchados:
         """
-        Retorna a lista de vulnerabilidades adicionadas.
+        Retorna as vulnerabilidades adicionadas, como uma sequência que cria
+        cada objeto Vulnerabilidade sob demanda.
         """
         return self.vulnerabilities
 
@@ -59,21 +230,34 @@ class GeradorRelatorio :
         """
         Gera o relatório em formato HTML.
         Requer Jinja2 e um template HTML.
+
+        Os achados são gravados, na forma colunar de TabelaAchados.colunas(),
+        em um arquivo de dados ao lado do HTML ('<nome>.dados.js'), que a
+        página carrega para paginar e filtrar os achados no navegador. O
+        arquivo é um script, e não JSON puro, para que o relatório também
+        funcione aberto diretamente do disco (file://), onde o navegador
+        bloqueia fetch().
         """
-        if not JINJA2_AVAILABLE or not self.template_env:
+        if not JINJA2_AVAILABLE or not self._obter_ambiente_templates():
             print("Erro: Jinja2 não está disponível ou o diretório de templates não foi configurado. Não é possível gerar relatório HTML.", file=os.sys.stderr)
             return False
 
         try:
-            template = self.template_env.get_template('report_template.html') 
-            
-            vulnerabilities_data = [v.to_dict() for v in self.vulnerabilities]
+            template = self.template_env.get_template('report_template.html')
+
+            output_file_path = os.path.join(self.diretorio_saida, filename)
+            data_file_path = os.path.splitext(output_file_path)[0] + ".dados.js"
+            with open(data_file_path, 'w', encoding='utf-8') as f:
+                f.write("carregarRelatorio(")
+                json.dump(self.vulnerabilities.colunas(), f, ensure_ascii=False, separators=(',', ':'))
+                f.write(");\n")
 
-            html_content = template.render(vulnerabilities=vulnerabilities_data,
+            html_content = template.render(total_vulnerabilities=len(self.vulnerabilities),
+                                           data_file=os.path.basename(data_file_path),
+                                           page_size=ACHADOS_POR_PAGINA_HTML,
                                            report_title="Relatório de Análise de Vulnerabilidades PHP",
-                                           report_datetime=datetime.now().strftime("%Y-%m-%d %H:%M:%S")) 
+                                           report_datetime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
-            output_file_path = os.path.join(self.diretorio_saida, filename)
             with open(output_file_path, 'w', encoding='utf-8') as f:
                 f.write(html_content)
             print(f"Relatório HTML gerado em: {output_file_path}")
@@ -86,8 +270,14 @@ class GeradorRelatorio :
         """
         Gera o relatório em formato PDF.
         Requer ReportLab.
+
+        Os achados são agrupados por regra, em ordem de severidade, com a
+        descrição e a sugestão uma única vez e uma tabela (arquivo, linha,
+        trecho) dividida em blocos. Cada regra detalha no máximo
+        LIMITE_OCORRENCIAS_POR_REGRA_PDF ocorrências; as demais são resumidas
+        pela quantidade por arquivo. O relatório HTML traz todos os achados.
         """
-        if not REPORTLAB_AVAILABLE:
+        if not REPORTLAB_AVAILABLE or not _carregar_reportlab():
             print("Erro: ReportLab não está disponível. Não é possível gerar relatório PDF.", file=os.sys.stderr)
             return False
 
@@ -95,21 +285,27 @@ class GeradorRelatorio :
             output_file_path = os.path.join(self.diretorio_saida, filename)
             doc = SimpleDocTemplate(output_file_path, pagesize=letter)
             styles = getSampleStyleSheet()
-            story = []
+            estilo_celula = ParagraphStyle('Celula', parent=styles['Normal'], fontSize=7, leading=9)
+            estilo_codigo = ParagraphStyle('CelulaCodigo', parent=estilo_celula, fontName='Courier')
+            story = [Paragraph("Relatório de Análise de Vulnerabilidades PHP", styles['Title']),
+                     Paragraph(f"Gerado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
+                     Spacer(1, 12)]
 
             if not self.vulnerabilities:
                 story.append(Paragraph("Nenhuma vulnerabilidade encontrada.", styles['Normal']))
             else:
-                for vul in self.vulnerabilities:
-                    story.append(Paragraph(f"<b>Tipo:</b> {vul.type}", styles['Normal']))
-                    story.append(Paragraph(f"<b>Severidade:</b> <font color='{self._obter_cor_severidade(vul.severity)}'>{vul.severity}</font>", styles['Normal']))
-                    story.append(Paragraph(f"<b>Arquivo:</b> {vul.file_name}", styles['Normal'])) 
-                    story.append(Paragraph(f"<b>Linha:</b> {vul.line}", styles['Normal']))
-                    story.append(Paragraph(f"<b>Descrição:</b> {vul.description}", styles['Normal']))
-                    story.append(Paragraph(f"<b>Trecho de Código:</b> <code>{vul.code_snippet}</code>", styles['Normal']))
-                    story.append(Paragraph(f"<b>Sugestão de Correção:</b> {vul.suggestion}", styles['Normal']))
-                    story.append(Spacer(1, 0.2 * 10))
-                    story.append(Paragraph("-" * 50, styles['Normal']))
+                grupos = sorted(self.vulnerabilities.agrupar(),
+                                key=lambda grupo: ORDEM_SEVERIDADE.get(grupo[0][2], len(ORDEM_SEVERIDADE)))
+                story.append(Paragraph(f"<b>Total:</b> {len(self.vulnerabilities)} vulnerabilidade(s) "
+                                       f"de {len(grupos)} tipo(s).", styles['Normal']))
+                story.append(Spacer(1, 6))
+                resumo = [[Paragraph(_escapar(vul_type), estilo_celula), self._texto_severidade_pdf(severity, estilo_celula),
+                           str(sum(len(ocorrencias) for _, ocorrencias in arquivos)), str(len(arquivos))]
+                          for (vul_type, _, severity, _), arquivos in grupos]
+                story.extend(self._tabelas_pdf(["Tipo", "Severidade", "Ocorrências", "Arquivos"], resumo,
+                                               [258, 70, 70, 70]))
+                for regra, arquivos in grupos:
+                    story.extend(self._secao_regra_pdf(regra, arquivos, styles, estilo_celula, estilo_codigo))
 
             doc.build(story)
             print(f"Relatório PDF gerado em: {output_file_path}")
@@ -118,6 +314,69 @@ class GeradorRelatorio :
             print(f"Erro ao gerar relatório PDF: {e}", file=os.sys.stderr)
             return False
 
+    def _secao_regra_pdf(self, regra: tuple, arquivos: list, styles, estilo_celula, estilo_codigo) -> list:
+        """Monta a seção do PDF de uma regra: cabeçalho, ocorrências detalhadas e resumo das excedentes."""
+        vul_type, description, severity, suggestion = regra
+        total = sum(len(ocorrencias) for _, ocorrencias in arquivos)
+        elementos = [
+            Spacer(1, 12),
+            Paragraph(_escapar(vul_type), styles['Heading2']),
+            Paragraph(f"<b>Severidade:</b> <font color='{self._obter_cor_severidade(severity)}'>{_escapar(severity)}</font>"
+                      f" &nbsp; <b>Ocorrências:</b> {total} em {len(arquivos)} arquivo(s)", styles['Normal']),
+            Paragraph(f"<b>Descrição:</b> {_escapar(description)}", styles['Normal']),
+            Paragraph(f"<b>Sugestão de Correção:</b> {_escapar(suggestion)}", styles['Normal']),
+            Spacer(1, 6),
+        ]
+
+        linhas = []
+        omitidas = []
+        restantes = LIMITE_OCORRENCIAS_POR_REGRA_PDF
+        for caminho, ocorrencias in arquivos:
+            detalhadas = ocorrencias[:restantes]
+            restantes -= len(detalhadas)
+            celula_arquivo = Paragraph(_escapar(caminho), estilo_celula) if detalhadas else None
+            for linha, trecho in detalhadas:
+                if len(trecho) > TAMANHO_MAXIMO_TRECHO_PDF:
+                    trecho = trecho[:TAMANHO_MAXIMO_TRECHO_PDF] + "..."
+                linhas.append([celula_arquivo, str(linha), Paragraph(_escapar(trecho), estilo_codigo)])
+            if len(detalhadas) < len(ocorrencias):
+                omitidas.append((caminho, len(ocorrencias) - len(detalhadas)))
+        elementos.extend(self._tabelas_pdf(["Arquivo", "Linha", "Trecho de Código"], linhas, [170, 40, 258]))
+
+        if omitidas:
+            quantidade = sum(ocorrencias for _, ocorrencias in omitidas)
+            elementos.append(Spacer(1, 6))
+            elementos.append(Paragraph(
+                f"Outras {quantidade} ocorrência(s) em {len(omitidas)} arquivo(s) não foram detalhadas (limite de "
+                f"{LIMITE_OCORRENCIAS_POR_REGRA_PDF} por tipo); consulte o relatório HTML.", styles['Normal']))
+            resumo = [[Paragraph(_escapar(caminho), estilo_celula), str(ocorrencias)]
+                      for caminho, ocorrencias in omitidas[:LIMITE_ARQUIVOS_RESUMO_PDF]]
+            elementos.extend(self._tabelas_pdf(["Arquivo", "Ocorrências"], resumo, [398, 70]))
+            if len(omitidas) > LIMITE_ARQUIVOS_RESUMO_PDF:
+                elementos.append(Paragraph(f"... e mais {len(omitidas) - LIMITE_ARQUIVOS_RESUMO_PDF} arquivo(s).",
+                                           styles['Normal']))
+        return elementos
+
+    @staticmethod
+    def _tabelas_pdf(cabecalho: list, linhas: list, larguras: list) -> list:
+        """Divide as linhas em tabelas de até LINHAS_POR_TABELA_PDF linhas, cada uma com o cabeçalho."""
+        estilo = TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        tabelas = []
+        for inicio in range(0, len(linhas), LINHAS_POR_TABELA_PDF):
+            tabela = Table([cabecalho] + linhas[inicio:inicio + LINHAS_POR_TABELA_PDF], colWidths=larguras, repeatRows=1)
+            tabela.setStyle(estilo)
+            tabelas.append(tabela)
+        return tabelas
+
+    def _texto_severidade_pdf(self, severity: str, estilo):
+        return Paragraph(f"<font color='{self._obter_cor_severidade(severity)}'>{_escapar(severity)}</font>", estilo)
+
     def _obter_cor_severidade(self, severity: str) -> str:
         """Retorna uma cor HTML baseada na severidade para PDF."""
         severity_map = {
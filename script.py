@@ -1,56 +1,224 @@
+import argparse
 import os
 import sys
+import threading
+import time
 from datetime import datetime
+from itertools import chain, islice
 
 # Importa as classes que criamos
-from config import Configuracao
-from analyzers.detector import DetectorVulnerabilidade
-from analyzers.vulnerability import Vulnerabilidade
-from report_generator import GeradorRelatorio 
+from analyzers.detector import DetectorVulnerabilidade, limitar_ocorrencias
+from analyzers.registry import DIRETORIO_REGRAS_PADRAO, RegistroRegras
+from analyzers.vulnerability import ORDEM_SEVERIDADE, Vulnerabilidade, interpretar_severidade, severidade_atinge
+from analyzers.cache import CacheAnalise, calcular_hash_conteudo
+from analyzers.profiling import PerfilAnalise, carregar_gancho
+from analyzers.rule_lint import exibir_relatorio_regras
+from analyzers.discovery import ARQUIVOS_IGNORE_PADRAO, DIRETORIOS_IGNORADOS_PADRAO, descobrir_arquivos_php
+from analyzers.git_diff import CONTEXTO_PADRAO, ErroGit, obter_alteracoes
+from analyzers.daemon import ErroDaemon, ServidorAnalise, endereco_padrao
+from analyzers.baseline import Baseline, GravadorBaseline
+from analyzers.shard import (NOME_FRAGMENTO, ErroFragmento, SaidaFragmento, chave_estavel, combinar_fragmentos,
+                             hash_arquivos, interpretar_shard, resolver_fragmentos, selecionar_shard)
+from analyzers.store import HISTORICO_PADRAO, ErroHistorico, SaidaHistorico
+from analyzers.watch import AchadosPorArquivo, ObservadorArquivos
+from analyzers.large_files import (POLITICA_IGNORAR, POLITICAS_ARQUIVOS_GRANDES, TAMANHO_MAXIMO_PADRAO,
+                                  ArquivoIgnorado, LeitorArquivos)
+from report_generator import GeradorRelatorio, SaidaJSONL, SaidaSARIF
 
 # Função para coletar arquivos PHP de um caminho (arquivo ou diretório)
-def collect_php_files_from_path(path: str) -> list[str]:
-    php_files = []
-    if os.path.isfile(path) and path.lower().endswith('.php'):
-        # Se o caminho for um arquivo PHP, adiciona ele mesmo
-        php_files.append(path)
-    elif os.path.isdir(path):
-        # Se o caminho for um diretório, percorre ele e adiciona todos os arquivos PHP
-        for root, _, files in os.walk(path):
-            for file in files:
-                if file.lower().endswith('.php'):
-                    php_files.append(os.path.join(root, file))
-    return php_files
+def collect_php_files_from_path(path: str, **opcoes_descoberta) -> list[str]:
+    # Mantida para compatibilidade; a descoberta em fluxo está em analyzers/discovery.py
+    return list(descobrir_arquivos_php(path, **opcoes_descoberta))
 
 
 class AnalisadorEstatico:
     """
     Orquestra o processo de análise estática de código PHP,
     detectando vulnerabilidades e gerando relatórios.
+    'vul_config_path' é um pacote de regras, um diretório de pacotes (como
+    Vul/) ou uma lista deles; cada arquivo é analisado apenas com as regras
+    dos pacotes da sua extensão (veja RegistroRegras).
     """
-    def __init__(self, vul_config_path: str, diretorio_saida: str = "report"):
-        self.configuracao = Configuracao(vul_config_path)
-        self.detector = DetectorVulnerabilidade(self.configuracao)
-        self.relatorio = GeradorRelatorio (diretorio_saida)
+    def __init__(self, vul_config_path: str, diretorio_saida: str = "report", modo_buffer: bool = False,
+                 cache_path: str = None, cache_max_mb: float = 256, cache_max_age_days: float = 30,
+                 jsonl_path: str = None, sarif_path: str = None, tempo_limite_regra: float = None,
+                 ignorar_comentarios: bool = True, severidade_minima: str = None,
+                 limite_ocorrencias_regra: int = None, tamanho_maximo_arquivo: int = None,
+                 politica_arquivos_grandes: str = POLITICA_IGNORAR, ignorar_gerados: bool = False,
+                 fluxo_de_dados: bool = False, baseline: Baseline = None,
+                 gravador_baseline: GravadorBaseline = None):
+        self.vul_config_path = vul_config_path
+        # Com baseline, o limite de ocorrências por regra só é aplicado depois
+        # que os achados conhecidos são descartados (veja _registrar_achados),
+        # para que eles não ocupem o limite; sem ela, o próprio detector deixa
+        # de avaliar a regra que atinge o limite.
+        self.limite_ocorrencias_regra = limite_ocorrencias_regra or None
+        self.opcoes_detector = {"modo_buffer": modo_buffer, "tempo_limite_regra": tempo_limite_regra,
+                                "ignorar_comentarios": ignorar_comentarios, "severidade_minima": severidade_minima,
+                                "limite_ocorrencias_regra": None if baseline is not None or gravador_baseline is not None
+                                else self.limite_ocorrencias_regra,
+                                "fluxo_de_dados": fluxo_de_dados}
+        self.registro = RegistroRegras(vul_config_path, self.opcoes_detector)
+        # Arquivos maiores que tamanho_maximo_arquivo seguem a política informada
+        # (veja LeitorArquivos); os lidos em partes não passam pelo cache.
+        self.opcoes_leitura = {"tamanho_maximo": tamanho_maximo_arquivo, "politica": politica_arquivos_grandes,
+                               "ignorar_gerados": ignorar_gerados}
+        self.leitor = LeitorArquivos(**self.opcoes_leitura)
+        # Com saída JSONL os achados não ficam em memória: são gravados à medida
+        # que aparecem e relidos do arquivo apenas para gerar os relatórios.
+        self.jsonl_path = jsonl_path
+        self.sarif_path = sarif_path
+        self.relatorio = GeradorRelatorio (diretorio_saida, manter_em_memoria=not jsonl_path)
         self.diretorio_saida = diretorio_saida
 
+        # Cache persistente de resultados, aberto durante cada análise de múltiplos arquivos.
+        self.cache_path = cache_path
+        self.cache_limites = {"tamanho_maximo_mb": cache_max_mb, "idade_maxima_dias": cache_max_age_days}
+        self.cache = None
+        # Hash das regras dos pacotes de cada extensão -> assinatura no cache.
+        self._assinaturas = {}
+        # (caminho do arquivo, nome da regra, mensagem) das regras interrompidas na última análise.
+        self.diagnosticos = []
+        self.arquivos_analisados = 0
+        # Caminho -> RecorteDiff durante uma análise restrita às alterações do git.
+        self.recortes_diff = None
+        # Achados conhecidos (Baseline) descartados antes de chegar ao relatório,
+        # ou, ao atualizar a baseline, o GravadorBaseline que registra todos eles.
+        self.baseline = baseline
+        self.gravador_baseline = gravador_baseline
+        # Com severidade_falha, o primeiro achado dessa severidade ou mais grave
+        # (achado_falha) encerra a análise, sem gerar relatórios.
+        self.severidade_falha = None
+        self.achado_falha = None
+        # Durante observar_alteracoes: caminho absoluto de cada arquivo -> arquivos
+        # incluídos (absolutos) dos quais seus achados dependem.
+        self.dependencias_por_arquivo = None
+        # Vulnerabilidades de cada arquivo observado, atualizadas a cada alteração.
+        self.achados_observados = None
+
+        # Saídas contínuas registradas em cada análise, além de JSONL/SARIF
+        # (por exemplo, a fila da interface gráfica).
+        self.saidas_adicionais = []
+        # Chamado após cada arquivo com (caminho, arquivos analisados até então).
+        self.ao_analisar_arquivo = None
+        # Sinalizado por outra thread para encerrar a análise no próximo arquivo;
+        # quem sinaliza deve limpá-lo antes de iniciar uma nova análise.
+        self.interromper = threading.Event()
+        self.interrompida = False
+
     def analisar_arquivo_php(self, file_path: str):
         """
         Analisa um único arquivo PHP em busca de vulnerabilidades.
+        Durante uma análise de alterações do git, apenas os trechos alterados
+        (com a janela de contexto) são avaliados e só são mantidos os achados
+        em linhas adicionadas ou modificadas.
         """
-        if not os.path.exists(file_path):
-            print(f"Erro: Arquivo '{file_path}' não encontrado.", file=sys.stderr)
+        detector = self.registro.detector_para(file_path)
+        if detector is None:
+            print(f"Aviso: Nenhum pacote de regras se aplica a '{file_path}'. Ignorando.", file=sys.stderr)
             return
+        recorte = self.recortes_diff.get(file_path) if self.recortes_diff else None
+        partes = None
+        if recorte is not None and recorte.conteudo is not None:
+            print(f"Iniciando análise de: {file_path}")
+            php_code = recorte.conteudo
+        else:
+            if not os.path.exists(file_path):
+                print(f"Erro: Arquivo '{file_path}' não encontrado.", file=sys.stderr)
+                return
 
-        print(f"Iniciando análise de: {file_path}")
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                php_code = file.read()
-        except Exception as e:
-            print(f"Erro ao ler o arquivo '{file_path}': {e}", file=sys.stderr)
+            print(f"Iniciando análise de: {file_path}")
+            try:
+                php_code, partes = self.leitor.ler(file_path)
+            except ArquivoIgnorado as e:
+                print(f"Aviso: Arquivo '{file_path}' ignorado: {e}.", file=sys.stderr)
+                return
+            except Exception as e:
+                print(f"Erro ao ler o arquivo '{file_path}': {e}", file=sys.stderr)
+                return
+
+        if partes is not None:
+            try:
+                achados = detector.detectar_achados_partes(partes, file_path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Erro ao ler o arquivo '{file_path}': {e}", file=sys.stderr)
+                return
+            finally:
+                self._registrar_diagnosticos(detector.retirar_diagnosticos())
+                self._registrar_dependencias(file_path, detector.retirar_dependencias())
+            if recorte is not None:
+                achados = [achado for achado in achados if recorte.linha_alterada(achado[1])]
+            self._registrar_achados(file_path, achados)
+            return
+        if recorte is None:
+            self._registrar_achados(file_path, self._detectar(detector, php_code, file_path))
             return
+        achados = self._detectar(detector, recorte.aplicar(php_code), file_path)
+        self._registrar_achados(file_path, [achado for achado in achados if recorte.linha_alterada(achado[1])])
+
+    def _detectar(self, detector: DetectorVulnerabilidade, php_code: str, file_path: str) -> list[tuple]:
+        """
+        Retorna os achados compactos do código, reaproveitando o resultado
+        armazenado no cache quando o mesmo conteúdo já foi analisado com as
+        mesmas regras e nenhum arquivo incluído por ele mudou. Resultados com
+        regras interrompidas pelo tempo limite não são armazenados.
+        """
+        if self.cache is None:
+            achados = detector.detectar_achados(php_code, file_path)
+            self._registrar_diagnosticos(detector.retirar_diagnosticos())
+            self._registrar_dependencias(file_path, detector.retirar_dependencias())
+            return achados
+
+        hash_conteudo = calcular_hash_conteudo(php_code)
+        assinatura = self._assinatura_regras(file_path)
+        achados = self.cache.obter(hash_conteudo, assinatura, file_path)
+        if achados is None:
+            achados = detector.detectar_achados(php_code, file_path)
+            diagnosticos = detector.retirar_diagnosticos()
+            dependencias = detector.retirar_dependencias()
+            self._registrar_diagnosticos(diagnosticos)
+            if not diagnosticos:
+                self.cache.armazenar(hash_conteudo, assinatura, achados, file_path, dependencias)
+            self._registrar_dependencias(file_path, dependencias)
+        elif self.dependencias_por_arquivo is not None:
+            self._registrar_dependencias(file_path, self.cache.obter_dependencias(hash_conteudo, assinatura))
+        return achados
+
+    def _assinatura_regras(self, file_path: str) -> str:
+        """Assinatura no cache das regras que se aplicam ao arquivo, com as opções do detector."""
+        hash_regras = self.registro.obter_hash_regras(file_path)
+        assinatura = self._assinaturas.get(hash_regras)
+        if assinatura is None:
+            assinatura = self._assinaturas[hash_regras] = CacheAnalise.assinatura_regras(hash_regras,
+                                                                                         self.opcoes_detector)
+        return assinatura
 
-        vulnerabilidades_encontradas = self.detector.analyze_php_code(php_code, file_path)
+    def _registrar_dependencias(self, file_path: str, dependencias: dict):
+        if self.dependencias_por_arquivo is not None:
+            self.dependencias_por_arquivo[os.path.abspath(file_path)] = {
+                os.path.abspath(dependencia) for dependencia in dependencias}
+
+    def _registrar_diagnosticos(self, diagnosticos: list[tuple]):
+        """Exibe e acumula os diagnósticos das regras interrompidas durante a análise."""
+        for file_path, vul_name, mensagem in diagnosticos:
+            print(f"Aviso: Regra '{vul_name}' em '{file_path}': {mensagem}.", file=sys.stderr)
+        self.diagnosticos.extend(diagnosticos)
+
+    def _registrar_achados(self, file_path: str, achados: list[tuple]):
+        """
+        Converte os achados compactos de um arquivo em vulnerabilidades,
+        adiciona-as ao relatório e exibe o resumo no console. Os achados que
+        constam da baseline são descartados antes da conversão, e só então é
+        aplicado o limite de ocorrências por regra; ao atualizar a baseline,
+        todos os achados são registrados nela.
+        """
+        if self.gravador_baseline is not None:
+            self.gravador_baseline.registrar(file_path, achados)
+        elif self.baseline is not None:
+            achados = self.baseline.filtrar(file_path, achados)
+        if achados and self.limite_ocorrencias_regra:
+            achados = limitar_ocorrencias(achados, self.limite_ocorrencias_regra)
+        vulnerabilidades_encontradas = self.registro.detector_para(file_path).criar_vulnerabilidades(achados, file_path)
 
         if vulnerabilidades_encontradas:
             print(f"Vulnerabilidades encontradas em {file_path}:")
@@ -60,87 +228,703 @@ class AnalisadorEstatico:
         else:
             print(f"Nenhuma vulnerabilidade encontrada em {file_path}.")
 
-    def analisar_multiplos_arquivos_php(self, file_paths: list, generate_reports: bool = True) -> list:
+        if self.severidade_falha is not None and self.achado_falha is None:
+            for vul in vulnerabilidades_encontradas:
+                if severidade_atinge(vul.severity, self.severidade_falha):
+                    self.achado_falha = vul
+                    self.interrompida = True
+                    print(f"Falha rápida: {vul.type} (Severidade: {vul.severity}) em {vul.file_path}:{vul.line}. "
+                          "Encerrando a análise.")
+                    break
+
+    def analisar_multiplos_arquivos_php(self, file_paths, generate_reports: bool = True, jobs: int = 1) -> list:
         """
         Analisa uma lista de arquivos PHP em busca de vulnerabilidades.
         Se generate_reports for True, gera os relatórios HTML/PDF.
-        Retorna a lista de todas as vulnerabilidades encontradas.
+        Com jobs maior que 1, os arquivos são analisados em um pool de processos
+        e os resultados são incorporados ao relatório na ordem da lista.
+        'file_paths' também pode ser um gerador, como o de descobrir_arquivos_php:
+        a análise começa no primeiro arquivo, sem esperar a descoberta terminar.
+        Retorna a lista de todas as vulnerabilidades encontradas. Com saída
+        JSONL a lista só é preenchida quando os relatórios são gerados.
+        Sinalizar 'interromper' encerra a análise antes do próximo arquivo;
+        nesse caso os relatórios não são gerados. O mesmo ocorre com
+        severidade_falha definida, no primeiro arquivo com um achado dessa
+        severidade ou mais grave.
         """
-        self.relatorio.vulnerabilities = []
-        
-        if not file_paths:
+        self.relatorio.limpar()
+        self.diagnosticos = []
+        self.arquivos_analisados = 0
+        self.interrompida = False
+        self.achado_falha = None
+        if self.baseline is not None:
+            self.baseline.iniciar()
+        if self.gravador_baseline is not None:
+            self.gravador_baseline.limpar()
+
+        # Os dois primeiros arquivos decidem entre abortar, analisar em
+        # sequência ou usar o pool, sem consumir o restante do gerador.
+        iterador = iter(file_paths)
+        iniciais = list(islice(iterador, 2))
+        if not iniciais:
             print("Nenhum arquivo para analisar. Abortando.")
             return []
+        self._analisar_lote(chain(iniciais, iterador), jobs if len(iniciais) > 1 else 1)
+
+        if self.interrompida:
+            print(f"Análise interrompida após {self.arquivos_analisados} arquivo(s). Relatórios não gerados.")
+            return self.relatorio.get_vulnerabilities()
 
-        for file_path in file_paths:
-            self.analisar_arquivo_php(file_path)
+        if self.baseline is not None and self.baseline.suprimidos:
+            print(f"{self.baseline.suprimidos} achado(s) já conhecido(s) ignorado(s) pela baseline "
+                  f"'{self.baseline.caminho}'.")
+        if self.gravador_baseline is not None:
+            total = self.gravador_baseline.gravar()
+            print(f"Baseline '{self.gravador_baseline.caminho}' atualizada com {total} achado(s).")
+        if self.diagnosticos:
+            print(f"Aviso: {len(self.diagnosticos)} regra(s) interrompida(s) durante a análise; os achados "
+                  "desses arquivos podem estar incompletos.", file=sys.stderr)
         
-        if generate_reports and self.relatorio.get_vulnerabilities():
+        if generate_reports and self.relatorio.total_vulnerabilidades:
+            if not self.relatorio.manter_em_memoria:
+                self.relatorio.carregar_jsonl(self.jsonl_path)
             self._gerar_relatorios_finais()
-        elif not self.relatorio.get_vulnerabilities():
+        elif not self.relatorio.total_vulnerabilidades:
             print("Nenhuma vulnerabilidade encontrada. Relatórios não gerados.")
         else:
             print("Opção 'gerar relatórios' desativada. Relatórios não gerados.")
 
         return self.relatorio.get_vulnerabilities()
 
+    def _analisar_lote(self, file_paths, jobs: int):
+        """
+        Analisa os arquivos com o cache e as saídas contínuas abertos,
+        fechando-os ao final, mesmo se a análise for interrompida.
+        """
+        if self.cache_path:
+            self.cache = CacheAnalise(self.cache_path, **self.cache_limites)
+        if self.jsonl_path:
+            self.relatorio.adicionar_saida(SaidaJSONL(self.jsonl_path))
+        if self.sarif_path:
+            self.relatorio.adicionar_saida(SaidaSARIF(self.sarif_path))
+        for saida in self.saidas_adicionais:
+            self.relatorio.adicionar_saida(saida)
+        try:
+            if jobs > 1:
+                self._analisar_em_paralelo(file_paths, jobs)
+            else:
+                for file_path in file_paths:
+                    if self._deve_interromper():
+                        break
+                    self.analisar_arquivo_php(file_path)
+                    self._arquivo_concluido(file_path)
+        finally:
+            if self.cache is not None:
+                print(f"Cache de análise: {self.cache.acertos} arquivo(s) reaproveitado(s), "
+                      f"{self.cache.falhas} analisado(s).")
+                self.cache.fechar()
+                self.cache = None
+            self.relatorio.fechar_saidas()
+
+
+    def analisar_alteracoes_git(self, intervalo: str, generate_reports: bool = True,
+                                contexto: int = CONTEXTO_PADRAO, **filtros) -> list:
+        """
+        Analisa apenas as linhas alteradas no intervalo do git informado
+        ('base..head', 'base...head' ou 'base', comparado com a árvore de
+        trabalho), mais 'contexto' linhas ao redor de cada trecho, e relata
+        somente os achados em linhas adicionadas ou modificadas. Os filtros
+        são repassados a obter_alteracoes. A análise é sequencial: seu custo
+        acompanha o tamanho da alteração. Lança ErroGit se o git falhar.
+        """
+        filtros.setdefault("extensoes", self.registro.extensoes)
+        self.recortes_diff = obter_alteracoes(intervalo, contexto=contexto, **filtros)
+        try:
+            return self.analisar_multiplos_arquivos_php(list(self.recortes_diff), generate_reports=generate_reports)
+        finally:
+            self.recortes_diff = None
+
+    def observar_alteracoes(self, caminhos: list, opcoes_descoberta: dict = None, generate_reports: bool = True,
+                            jobs: int = 1, ao_atualizar=None) -> AchadosPorArquivo:
+        """
+        Analisa os arquivos dos caminhos e passa a observá-los (veja
+        ObservadorArquivos). A cada gravação, apenas os arquivos criados ou
+        alterados, e os que os incluem, são reanalisados com as regras já
+        compiladas; as vulnerabilidades em memória (achados_observados), os
+        arquivos JSONL/SARIF e, com generate_reports, os relatórios HTML/PDF
+        de nome fixo são atualizados. Continua até que 'interromper' seja
+        sinalizado ou até KeyboardInterrupt. 'ao_atualizar', se informado, é
+        chamado após cada atualização com (reanalisados, removidos, total).
+        """
+        opcoes_descoberta = dict(opcoes_descoberta or {})
+        opcoes_descoberta.setdefault("extensoes", self.registro.extensoes)
+        observador = ObservadorArquivos(caminhos, opcoes_descoberta)
+        # JSONL e SARIF são regravados com todos os achados a cada atualização,
+        # e não apenas com os dos arquivos reanalisados.
+        saidas_completas = (self.jsonl_path, self.sarif_path)
+        self.jsonl_path = self.sarif_path = None
+        self.achados_observados = AchadosPorArquivo()
+        self.saidas_adicionais.append(self.achados_observados)
+        self.dependencias_por_arquivo = {}
+        self.diagnosticos = []
+        self.interrompida = False
+        if self.baseline is not None:
+            self.baseline.iniciar()
+        relatorio = GeradorRelatorio(self.diretorio_saida)
+        try:
+            arquivos = observador.iniciar()
+            self.relatorio.limpar()
+            self.arquivos_analisados = 0
+            if arquivos:
+                self._analisar_lote(arquivos, jobs if len(arquivos) > 1 else 1)
+            print(f"\n{self.achados_observados.total} vulnerabilidade(s) em {len(arquivos)} arquivo(s). "
+                  f"Observando alterações ({observador.modo}); pressione Ctrl+C para encerrar.")
+            self._atualizar_relatorios_observados(relatorio, generate_reports, *saidas_completas)
+
+            while not self._deve_interromper():
+                alterados, removidos = observador.aguardar(self.interromper)
+                if not alterados and not removidos:
+                    continue
+                inicio = time.perf_counter()
+                antes = self.achados_observados.total
+                reanalisar = self._arquivos_afetados(alterados, removidos, observador.arquivos)
+                for file_path in removidos:
+                    self.achados_observados.remover(file_path)
+                    self.dependencias_por_arquivo.pop(os.path.abspath(file_path), None)
+                for file_path in reanalisar:
+                    self.achados_observados.limpar_arquivo(file_path)
+                self.relatorio.limpar()
+                self.arquivos_analisados = 0
+                if reanalisar:
+                    self._analisar_lote(reanalisar, 1)
+                if self.interrompida:
+                    break
+                total = self.achados_observados.total
+                print(f"{len(reanalisar)} arquivo(s) reanalisado(s)"
+                      + (f", {len(removidos)} removido(s)" if removidos else "")
+                      + f" em {(time.perf_counter() - inicio) * 1000:.0f} ms: {total} vulnerabilidade(s) no total "
+                        f"({total - antes:+d}).")
+                self._atualizar_relatorios_observados(relatorio, generate_reports, *saidas_completas)
+                if ao_atualizar is not None:
+                    ao_atualizar(reanalisar, removidos, total)
+        finally:
+            observador.fechar()
+            self.saidas_adicionais.remove(self.achados_observados)
+            self.jsonl_path, self.sarif_path = saidas_completas
+            self.dependencias_por_arquivo = None
+        return self.achados_observados
+
+    def _arquivos_afetados(self, alterados: list, removidos: list, observados) -> list:
+        """Os arquivos alterados e os observados cujos achados dependem de algum alterado ou removido."""
+        mudaram = {os.path.abspath(file_path) for file_path in (*alterados, *removidos)}
+        ja_incluidos = set(alterados)
+        dependentes = [file_path for file_path in observados if file_path not in ja_incluidos
+                       and self.dependencias_por_arquivo.get(os.path.abspath(file_path), set()) & mudaram]
+        return list(alterados) + dependentes
+
+    def _atualizar_relatorios_observados(self, relatorio: GeradorRelatorio, generate_reports: bool,
+                                         jsonl_path: str = None, sarif_path: str = None):
+        """Regrava JSONL, SARIF e relatórios HTML/PDF com as vulnerabilidades de todos os arquivos observados."""
+        if not (generate_reports or jsonl_path or sarif_path):
+            return
+        relatorio.limpar()
+        if jsonl_path:
+            relatorio.adicionar_saida(SaidaJSONL(jsonl_path))
+        if sarif_path:
+            relatorio.adicionar_saida(SaidaSARIF(sarif_path))
+        try:
+            for vulnerabilidade in self.achados_observados.vulnerabilidades():
+                relatorio.adicionar_vulnerabilidade(vulnerabilidade)
+        finally:
+            relatorio.fechar_saidas()
+        if generate_reports:
+            gerar_relatorios_finais(relatorio, NOME_RELATORIO_OBSERVACAO)
+
+    def _analisar_em_paralelo(self, file_paths, jobs: int):
+        """
+        Analisa os arquivos em um pool de processos e incorpora os resultados
+        ao relatório na ordem da lista. Os processos de trabalho apenas
+        consultam o cache; as gravações são feitas aqui.
+        """
+        # Importado apenas aqui: o pool de processos (multiprocessing e
+        # concurrent.futures) pesa na inicialização das análises sequenciais.
+        from analyzers.parallel import analisar_em_paralelo
+
+        for file_path, erro, achados, hash_conteudo, do_cache, diagnosticos, dependencias in analisar_em_paralelo(
+                self.vul_config_path, file_paths, jobs, self.opcoes_detector, self.cache_path,
+                self.registro.ganchos_perfil, self.opcoes_leitura):
+            if self._deve_interromper():
+                break
+            if erro:
+                print(erro, file=sys.stderr)
+                self._arquivo_concluido(file_path)
+                continue
+            if self.cache is not None and hash_conteudo:
+                assinatura = self._assinatura_regras(file_path)
+                if do_cache:
+                    self.cache.acertos += 1
+                    self.cache.registrar_acesso(hash_conteudo, assinatura)
+                    if self.dependencias_por_arquivo is not None:
+                        dependencias = self.cache.obter_dependencias(hash_conteudo, assinatura)
+                else:
+                    self.cache.falhas += 1
+                    if not diagnosticos:
+                        self.cache.armazenar(hash_conteudo, assinatura, achados, file_path,
+                                             dependencias)
+            print(f"Iniciando análise de: {file_path}")
+            self._registrar_diagnosticos(diagnosticos)
+            self._registrar_dependencias(file_path, dependencias)
+            self._registrar_achados(file_path, achados)
+            self._arquivo_concluido(file_path)
+
+    def _deve_interromper(self) -> bool:
+        if self.interromper.is_set():
+            self.interrompida = True
+        return self.interrompida
+
+    def _arquivo_concluido(self, file_path: str):
+        self.arquivos_analisados += 1
+        if self.ao_analisar_arquivo is not None:
+            self.ao_analisar_arquivo(file_path, self.arquivos_analisados)
 
     def _gerar_relatorios_finais(self):
         """
         Gera os relatórios HTML e PDF com todas as vulnerabilidades coletadas.
         """
-        print("\nGerando relatórios...")
+        gerar_relatorios_finais(self.relatorio)
+
+
+def gerar_relatorios_finais(relatorio: GeradorRelatorio, report_name_base: str = None):
+    """Gera os relatórios HTML e PDF na pasta do relatório; por padrão, com data e hora no nome."""
+    print("\nGerando relatórios...")
+    if report_name_base is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_name_base = f"analise_seguranca_{timestamp}"
 
-        self.relatorio.gerar_html(f"{report_name_base}.html")
-        self.relatorio.gerar_pdf(f"{report_name_base}.pdf")
-        print(f"Relatórios gerados com sucesso na pasta: {self.relatorio.diretorio_saida}")
+    relatorio.gerar_html(f"{report_name_base}.html")
+    relatorio.gerar_pdf(f"{report_name_base}.pdf")
+    print(f"Relatórios gerados com sucesso na pasta: {relatorio.diretorio_saida}")
+
+
+def combinar_shards(fragmentos: list, diretorio_saida: str = "report", generate_reports: bool = True,
+                    jsonl_path: str = None, sarif_path: str = None, store_path: str = None,
+                    store_label: str = None) -> list:
+    """
+    Combina os fragmentos gravados pelos shards (--shard) em um único conjunto
+    de achados, sem repetições e em ordem determinística, e gera os relatórios
+    uma única vez; com store_path, registra a análise combinada no histórico.
+    Lança ErroFragmento se os fragmentos não formarem uma análise completa.
+    """
+    metadados, vulnerabilidades = combinar_fragmentos(resolver_fragmentos(fragmentos))
+    arquivos = sum(fragmento["arquivos_analisados"] for fragmento in metadados)
+    print(f"{len(metadados)} fragmento(s) combinado(s): {arquivos} arquivo(s) analisado(s), "
+          f"{len(vulnerabilidades)} vulnerabilidade(s).")
+
+    relatorio = GeradorRelatorio(diretorio_saida)
+    if jsonl_path:
+        relatorio.adicionar_saida(SaidaJSONL(jsonl_path))
+    if sarif_path:
+        relatorio.adicionar_saida(SaidaSARIF(sarif_path))
+    historico = None
+    if store_path:
+        historico = SaidaHistorico(store_path, metadados[0]["regras"], store_label)
+        relatorio.adicionar_saida(historico)
+    try:
+        for vulnerabilidade in vulnerabilidades:
+            relatorio.adicionar_vulnerabilidade(vulnerabilidade)
+    finally:
+        relatorio.fechar_saidas()
+    if historico is not None:
+        historico.concluir(arquivos)
+
+    if generate_reports and relatorio.total_vulnerabilidades:
+        gerar_relatorios_finais(relatorio)
+    elif not relatorio.total_vulnerabilidades:
+        print("Nenhuma vulnerabilidade encontrada. Relatórios não gerados.")
+    return relatorio.get_vulnerabilities()
+
+
+CACHE_PADRAO = os.path.join(".analysis_cache", "resultados.sqlite")
+
+PERFIL_PADRAO = os.path.join("report", "perfil_analise.json")
+
+TEMPO_LIMITE_REGRA_PADRAO = 10.0
+
+DIRETORIO_FRAGMENTOS = os.path.join("report", "fragmentos")
+
+# Nome dos relatórios HTML/PDF regravados a cada alteração com --watch.
+NOME_RELATORIO_OBSERVACAO = "analise_seguranca_watch"
+
+USO_MERGE = "python script.py merge <fragmento_ou_diretorio> [outro...] [--no-report] [--jsonl ARQUIVO] [--sarif ARQUIVO] [--store [ARQUIVO] [--store-label TEXTO]]"
+
+USO = "python script.py <caminho_do_arquivo_ou_diretorio> [outro_caminho...] [--no-report] [--jobs N] [--whole-file] [--cache [ARQUIVO]] [--jsonl ARQUIVO] [--sarif ARQUIVO]  [--profile [ARQUIVO]] [--rule-timeout SEGUNDOS] [--taint] [--include-comments] [--lint-rules] [--include GLOB] [--exclude GLOB] [--max-file-size KB] [--large-files {skip,sample,chunk}] [--skip-generated] [--diff BASE..HEAD] [--baseline ARQUIVO [--update-baseline]] [--shard i/N [--shard-output ARQUIVO]] [--store [ARQUIVO] [--store-label TEXTO]] [--min-severity SEVERIDADE] [--max-hits-per-rule N] [--fail-fast [SEVERIDADE]] [--watch] [--daemon [ENDERECO]]"
+
+
+def _severidade(texto: str) -> str:
+    if not texto:  # --fail-fast sem argumento
+        return texto
+    try:
+        return interpretar_severidade(texto)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _criar_parser_merge() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="script.py merge", usage=USO_MERGE,
+                                     description="Combina os fragmentos gravados com --shard e gera os relatórios.")
+    parser.add_argument("fragmentos", nargs="+",
+                        help=f"Arquivos de fragmento ou diretórios com arquivos '{NOME_FRAGMENTO.format(indice='*', total='*')}'.")
+    parser.add_argument("--no-report", action="store_true", help="Não gera os relatórios HTML/PDF.")
+    parser.add_argument("--jsonl", metavar="ARQUIVO", help="Grava os achados combinados em JSONL.")
+    parser.add_argument("--sarif", metavar="ARQUIVO", help="Grava os achados combinados em SARIF 2.1.0.")
+    _adicionar_argumentos_historico(parser)
+    return parser
+
+
+def _adicionar_argumentos_historico(parser: argparse.ArgumentParser):
+    parser.add_argument("--store", nargs="?", const=HISTORICO_PADRAO, default=None, metavar="ARQUIVO",
+                        help="Registra a execução e os achados no histórico SQLite, consultado com "
+                             f"query_findings.py (padrão: {HISTORICO_PADRAO}).")
+    parser.add_argument("--store-label", metavar="TEXTO",
+                        help="Rótulo da execução no histórico (ex.: o commit ou a versão analisada).")
+
+
+def _criar_parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(usage=USO, description="Análise estática de segurança de código PHP.")
+    parser.add_argument("paths", nargs="*", help="Arquivos ou diretórios a analisar.")
+    parser.add_argument("--no-report", action="store_true", help="Não gera os relatórios HTML/PDF.")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="Número de processos usados na análise (padrão: 1).")
+    parser.add_argument("--whole-file", action="store_true",
+                        help="Avalia cada regra sobre o arquivo inteiro de uma vez, encontrando também "
+                             "construções que se estendem por várias linhas.")
+    parser.add_argument("--cache", nargs="?", const=CACHE_PADRAO, default=None, metavar="ARQUIVO",
+                        help=f"Reaproveita resultados de arquivos inalterados entre execuções (padrão: {CACHE_PADRAO}).")
+    parser.add_argument("--cache-max-mb", type=float, default=256, metavar="MB",
+                        help="Tamanho máximo dos resultados mantidos no cache (padrão: 256).")
+    parser.add_argument("--cache-max-age-days", type=float, default=30, metavar="DIAS",
+                        help="Remove do cache resultados não usados há mais dias que isso (padrão: 30).")
+    parser.add_argument("--jsonl", metavar="ARQUIVO",
+                        help="Grava cada achado em JSONL assim que é encontrado, sem mantê-los em memória.")
+    parser.add_argument("--sarif", metavar="ARQUIVO",
+                        help="Grava os achados em um relatório SARIF 2.1.0 à medida que são encontrados.")
+    parser.add_argument("--profile", nargs="?", const=PERFIL_PADRAO, default=None, metavar="ARQUIVO",
+                        help="Mede tempo, linhas examinadas e ocorrências por regra e por arquivo, exibe as "
+                             f"regras e os arquivos mais lentos e grava as medições em JSON (padrão: {PERFIL_PADRAO}).")
+    parser.add_argument("--profile-hook", action="append", default=[], metavar="MODULO:CLASSE",
+                        help="Gancho (subclasse de GanchoPerfil) que também recebe as medições. Pode ser repetido.")
+    parser.add_argument("--rule-timeout", type=float, default=TEMPO_LIMITE_REGRA_PADRAO, metavar="SEGUNDOS",
+                        help="Tempo máximo de cada regra em cada arquivo; ao excedê-lo a regra é ignorada no "
+                             f"restante do arquivo e um aviso é exibido. Use 0 para desativar (padrão: {TEMPO_LIMITE_REGRA_PADRAO:g}).")
+    parser.add_argument("--min-severity", type=_severidade, metavar="SEVERIDADE",
+                        help="Carrega apenas as regras dessa severidade ou mais graves (" +
+                             ", ".join(ORDEM_SEVERIDADE) + "); as demais não são avaliadas.")
+    parser.add_argument("--max-hits-per-rule", type=int, metavar="N",
+                        help="Relata no máximo N achados de cada regra por arquivo; ao atingi-los, a regra deixa "
+                             "de ser avaliada no restante do arquivo.")
+    parser.add_argument("--fail-fast", nargs="?", const="", type=_severidade, metavar="SEVERIDADE",
+                        help="Encerra a análise no primeiro achado dessa severidade ou mais grave (padrão: a de "
+                             "--min-severity, ou qualquer achado), sem gerar relatórios, e sai com código 1.")
+    parser.add_argument("--taint", action="store_true",
+                        help="Avalia também as regras de fluxo de dados (campo 'taint'), que acompanham a entrada do "
+                             "usuário até os sinks; mais lenta que as demais regras e, por isso, desativada por padrão.")
+    parser.add_argument("--include-comments", action="store_true",
+                        help="Avalia as regras também sobre os comentários do código PHP, que por padrão são ignorados.")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB",
+                        help="Analisa apenas os arquivos que casarem com o glob (ex.: 'src/**/*.php'). Pode ser repetido.")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Ignora arquivos e diretórios que casarem com o glob (ex.: 'tests/'). Pode ser repetido.")
+    parser.add_argument("--max-file-size", type=float, default=None, metavar="KB",
+                        help="Ignora arquivos maiores que o tamanho informado, em KB, ou os analisa conforme "
+                             "--large-files.")
+    parser.add_argument("--large-files", choices=POLITICAS_ARQUIVOS_GRANDES, default=None,
+                        help="O que fazer com os arquivos maiores que --max-file-size (padrão: "
+                             f"{TAMANHO_MAXIMO_PADRAO // 1024} KB com esta opção): ignorá-los (skip, o padrão), "
+                             "analisar apenas o início e o fim (sample) ou analisá-los inteiros, em partes "
+                             "desse tamanho (chunk).")
+    parser.add_argument("--skip-generated", action="store_true",
+                        help="Ignora arquivos com código gerado (marcados com '@generated', 'DO NOT EDIT' ou "
+                             "'auto-generated') ou minificado.")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help="Percorre também " + ", ".join(f"{nome}/" for nome in DIRETORIOS_IGNORADOS_PADRAO) + ".")
+    parser.add_argument("--no-ignore-files", action="store_true",
+                        help="Não aplica as regras de " + " e ".join(ARQUIVOS_IGNORE_PADRAO) + " encontrados nos diretórios.")
+    parser.add_argument("--diff", metavar="BASE..HEAD",
+                        help="Analisa apenas as linhas alteradas no intervalo do git (ou, com apenas BASE, na árvore "
+                             "de trabalho) e relata somente achados em linhas adicionadas ou modificadas. Os caminhos, "
+                             "se informados, restringem os arquivos considerados.")
+    parser.add_argument("--diff-context", type=int, default=CONTEXTO_PADRAO, metavar="N",
+                        help=f"Linhas de contexto avaliadas ao redor de cada trecho alterado (padrão: {CONTEXTO_PADRAO}).")
+    parser.add_argument("--baseline", metavar="ARQUIVO",
+                        help="Ignora os achados já registrados no arquivo de baseline, relatando apenas os novos. "
+                             "Achados que mudam apenas de linha continuam reconhecidos.")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Grava todos os achados da análise no arquivo de --baseline, em vez de ignorá-los.")
+    parser.add_argument("--shard", metavar="i/N",
+                        help="Analisa apenas a i-ésima de N partes dos arquivos descobertos, balanceadas pelo "
+                             "tamanho, e grava os achados em um fragmento para 'script.py merge', sem gerar relatórios.")
+    parser.add_argument("--shard-output", metavar="ARQUIVO",
+                        help="Arquivo do fragmento do shard (padrão: " +
+                             os.path.join(DIRETORIO_FRAGMENTOS, NOME_FRAGMENTO.format(indice="i", total="N")) + ").")
+    _adicionar_argumentos_historico(parser)
+    parser.add_argument("--watch", action="store_true",
+                        help="Após a análise, observa os caminhos e reanalisa apenas os arquivos alterados a cada "
+                             "gravação, atualizando os achados e os relatórios, até Ctrl+C.")
+    parser.add_argument("--lint-rules", action="store_true",
+                        help="Verifica as regras em busca de padrões propensos a backtracking catastrófico, mede "
+                             "cada uma com entradas adversariais e encerra (código 1 se houver problemas).")
+    parser.add_argument("--daemon", nargs="?", const=endereco_padrao(), default=None, metavar="ENDERECO",
+                        help="Mantém as regras carregadas e atende requisições de análise do daemon_client.py em "
+                             "um socket Unix (ou em 'host:porta' local) até ser encerrado "
+                             f"(padrão: {endereco_padrao()}).")
+    return parser
 
 
 # Bloco de execução principal (interface de linha de comando ou CI/CD)
 if __name__ == "__main__":
-    vul_config_json_path = os.path.join(os.path.dirname(__file__), 'Vul', 'php_vulnerabilities.json')
+    vul_config_json_path = DIRETORIO_REGRAS_PADRAO
     output_report_dir = "report"
-    analisador = AnalisadorEstatico(vul_config_json_path, diretorio_saida=output_report_dir)
 
-    input_paths_from_cli = []
-    generate_reports_final = True
+    if sys.argv[1:2] == ["merge"]:
+        args_merge = _criar_parser_merge().parse_args(sys.argv[2:])
+        try:
+            combinar_shards(args_merge.fragmentos, output_report_dir, generate_reports=not args_merge.no_report,
+                            jsonl_path=args_merge.jsonl, sarif_path=args_merge.sarif,
+                            store_path=args_merge.store, store_label=args_merge.store_label)
+        except ErroFragmento as e:
+            print(f"Erro: Não foi possível combinar os fragmentos: {e}")
+            sys.exit(1)
+        except ErroHistorico as e:
+            print(f"Erro: Não foi possível abrir o histórico: {e}")
+            sys.exit(1)
+        print("\nCombinação concluída.")
+        sys.exit(0)
+
+    args = _criar_parser_argumentos().parse_args()
+    if args.jobs < 1:
+        print("Erro: --jobs deve ser um número inteiro maior ou igual a 1.")
+        sys.exit(1)
+    if args.rule_timeout < 0:
+        print("Erro: --rule-timeout deve ser maior ou igual a 0.")
+        sys.exit(1)
+
+    if args.update_baseline and not args.baseline:
+        print("Erro: --update-baseline requer --baseline ARQUIVO.")
+        sys.exit(1)
+    if args.update_baseline and (args.diff or args.daemon or args.shard):
+        print("Erro: --update-baseline não pode ser usado com --diff, --daemon ou --shard: a baseline deve "
+              "registrar os achados de todos os arquivos.")
+        sys.exit(1)
+    if args.max_file_size is not None and args.max_file_size <= 0:
+        print("Erro: --max-file-size deve ser maior que zero.")
+        sys.exit(1)
+    if args.max_hits_per_rule is not None and args.max_hits_per_rule < 1:
+        print("Erro: --max-hits-per-rule deve ser um número inteiro maior ou igual a 1.")
+        sys.exit(1)
+    severidade_falha = None
+    if args.fail_fast is not None:
+        if args.daemon or args.update_baseline:
+            print("Erro: --fail-fast não pode ser usado com --daemon ou --update-baseline.")
+            sys.exit(1)
+        severidade_falha = args.fail_fast or args.min_severity or list(ORDEM_SEVERIDADE)[-1]
+    if args.watch and (args.diff or args.daemon or args.shard or args.store or args.update_baseline
+                       or args.fail_fast is not None):
+        print("Erro: --watch não pode ser usado com --diff, --daemon, --shard, --store, --update-baseline "
+              "ou --fail-fast.")
+        sys.exit(1)
+    if args.store_label and not args.store:
+        print("Erro: --store-label requer --store.")
+        sys.exit(1)
+    if args.store and (args.diff or args.daemon or args.shard):
+        print("Erro: --store não pode ser usado com --diff, --daemon ou --shard: cada execução do histórico "
+              "deve conter os achados de todos os arquivos (com --shard, use 'script.py merge --store').")
+        sys.exit(1)
+    shard = None
+    if args.shard:
+        if args.diff or args.daemon:
+            print("Erro: --shard não pode ser usado com --diff ou --daemon.")
+            sys.exit(1)
+        try:
+            shard = interpretar_shard(args.shard)
+        except ValueError as e:
+            print(f"Erro: --shard inválido: {e}.")
+            sys.exit(1)
+
+    baseline = None
+    if args.baseline and not args.update_baseline:
+        try:
+            baseline = Baseline.carregar(args.baseline)
+        except (OSError, ValueError) as e:
+            print(f"Erro: Não foi possível carregar a baseline '{args.baseline}': {e}")
+            sys.exit(1)
+
+    if args.lint_rules:
+        registro = RegistroRegras(vul_config_json_path, verificar_regras=False)
+        sys.exit(1 if exibir_relatorio_regras(*registro.padroes_e_diagnosticos()) else 0)
+
+    politica_arquivos_grandes = args.large_files or POLITICA_IGNORAR
+    tamanho_maximo_arquivo = None
+    if args.max_file_size is not None:
+        tamanho_maximo_arquivo = int(args.max_file_size * 1024)
+    elif args.large_files:
+        tamanho_maximo_arquivo = TAMANHO_MAXIMO_PADRAO
+    opcoes_descoberta = {
+        "incluir": args.include,
+        "excluir": args.exclude,
+        # Com as demais políticas, os arquivos grandes são descobertos e lidos em partes.
+        "tamanho_maximo": tamanho_maximo_arquivo if politica_arquivos_grandes == POLITICA_IGNORAR else None,
+    }
+    if args.no_default_excludes:
+        opcoes_descoberta["diretorios_ignorados"] = ()
+    if args.no_ignore_files:
+        opcoes_descoberta["arquivos_ignore"] = ()
+
+    if args.daemon:
+        def criar_registro():
+            return RegistroRegras(vul_config_json_path, {"modo_buffer": args.whole_file,
+                                                         "tempo_limite_regra": args.rule_timeout or None,
+                                                         "ignorar_comentarios": not args.include_comments,
+                                                         "severidade_minima": args.min_severity,
+                                                         # Com baseline, o servidor aplica o limite após descartá-la.
+                                                         "limite_ocorrencias_regra": None if baseline is not None
+                                                         else args.max_hits_per_rule,
+                                                         "fluxo_de_dados": args.taint})
+        try:
+            ServidorAnalise(criar_registro, vul_config_json_path, args.daemon, opcoes_descoberta,
+                            baseline=baseline, limite_ocorrencias_regra=args.max_hits_per_rule,
+                            leitor=LeitorArquivos(tamanho_maximo_arquivo, politica_arquivos_grandes,
+                                                  args.skip_generated)).executar()
+        except (ErroDaemon, OSError) as e:
+            print(f"Erro: Não foi possível iniciar o servidor de análise: {e}")
+            sys.exit(1)
+        sys.exit(0)
 
     # Processar argumentos da linha de comando
     if len(sys.argv) > 1:
-        if "--no-report" in sys.argv:
-            generate_reports_final = False
-            sys.argv.remove("--no-report")
+        input_paths_from_cli = args.paths
+        generate_reports_final = not args.no_report
 
-        input_paths_from_cli = sys.argv[1:] # Pega todos os argumentos restantes
-        
-        if not input_paths_from_cli: # Se não houver caminhos após remover --no-report
+        if not input_paths_from_cli and not args.diff: # Se não houver caminhos após remover as opções
             print("Erro: Nenhum arquivo ou diretório para analisar fornecido.")
-            print("Uso: python script.py <caminho_do_arquivo_ou_diretorio> [outro_caminho...] [--no-report]")
+            print(f"Uso: {USO}")
             sys.exit(1) # Sai com erro se nao houver caminhos
 
-        # Coleta todos os arquivos PHP dos caminhos fornecidos (arquivos ou diretórios)
-        actual_files_to_analyze = []
-        for p in input_paths_from_cli:
-            if not os.path.exists(p):
-                print(f"Aviso: Caminho '{p}' não encontrado. Ignorando.", file=sys.stderr)
-                continue
-            collected = collect_php_files_from_path(p)
-            if not collected:
-                print(f"Aviso: Nenhum arquivo PHP encontrado em '{p}'. Ignorando.", file=sys.stderr)
-            actual_files_to_analyze.extend(collected)
-        
-        if not actual_files_to_analyze:
-            print("Erro: Nenhum arquivo PHP válido encontrado para análise nos caminhos fornecidos. Abortando.")
-            print("Uso: python script.py <caminho_do_arquivo_ou_diretorio> [outro_caminho...] [--no-report]")
-            sys.exit(1) # Sai com erro se nao encontrar arquivos PHP
+        analisador = AnalisadorEstatico(vul_config_json_path, diretorio_saida=output_report_dir,
+                                        modo_buffer=args.whole_file, cache_path=args.cache,
+                                        cache_max_mb=args.cache_max_mb, cache_max_age_days=args.cache_max_age_days,
+                                        jsonl_path=args.jsonl, sarif_path=args.sarif,
+                                        tempo_limite_regra=args.rule_timeout or None,
+                                        ignorar_comentarios=not args.include_comments,
+                                        severidade_minima=args.min_severity,
+                                        limite_ocorrencias_regra=args.max_hits_per_rule,
+                                        tamanho_maximo_arquivo=tamanho_maximo_arquivo,
+                                        politica_arquivos_grandes=politica_arquivos_grandes,
+                                        ignorar_gerados=args.skip_generated,
+                                        fluxo_de_dados=args.taint, baseline=baseline,
+                                        gravador_baseline=GravadorBaseline(args.baseline) if args.update_baseline
+                                        else None)
+
+        opcoes_descoberta["extensoes"] = analisador.registro.extensoes
+        analisador.severidade_falha = severidade_falha
+
+        perfil = None
+        if args.profile:
+            perfil = PerfilAnalise()
+            analisador.registro.adicionar_gancho_perfil(perfil)
+        for especificacao in args.profile_hook:
+            try:
+                analisador.registro.adicionar_gancho_perfil(carregar_gancho(especificacao))
+            except (ImportError, AttributeError, ValueError) as e:
+                print(f"Erro ao carregar o gancho de perfil '{especificacao}': {e}")
+                sys.exit(1)
+
+        if args.diff:
+            try:
+                analisador.analisar_alteracoes_git(args.diff, generate_reports=generate_reports_final,
+                                                   contexto=args.diff_context, caminhos=input_paths_from_cli,
+                                                   incluir=args.include, excluir=args.exclude,
+                                                   diretorios_ignorados=opcoes_descoberta.get(
+                                                       "diretorios_ignorados", DIRETORIOS_IGNORADOS_PADRAO))
+            except ErroGit as e:
+                print(f"Erro: Não foi possível obter as alterações de '{args.diff}': {e}")
+                sys.exit(1)
+            print(f"{analisador.arquivos_analisados} arquivo(s) alterado(s) analisado(s).")
+        elif args.watch:
+            for p in input_paths_from_cli:
+                if not os.path.exists(p):
+                    print(f"Aviso: Caminho '{p}' não encontrado. Ignorando.", file=sys.stderr)
+            try:
+                analisador.observar_alteracoes(input_paths_from_cli, opcoes_descoberta,
+                                               generate_reports=generate_reports_final, jobs=args.jobs)
+            except KeyboardInterrupt:
+                print("\nObservação encerrada.")
+        else:
+            # Descobre os arquivos PHP dos caminhos fornecidos (arquivos ou diretórios)
+            # à medida que a análise avança, em vez de montar a lista completa antes.
+            # Com --shard, a chave estável de cada arquivo (relativa ao caminho
+            # em que foi descoberto) é guardada em chaves_shard.
+            chaves_shard = {}
+            def arquivos_dos_caminhos():
+                for indice_raiz, p in enumerate(input_paths_from_cli):
+                    if not os.path.exists(p):
+                        print(f"Aviso: Caminho '{p}' não encontrado. Ignorando.", file=sys.stderr)
+                        continue
+                    encontrados = 0
+                    for file_path in descobrir_arquivos_php(p, **opcoes_descoberta):
+                        encontrados += 1
+                        if shard is not None:
+                            chaves_shard.setdefault(file_path, chave_estavel(file_path, p, indice_raiz))
+                        yield file_path
+                    if not encontrados:
+                        print(f"Aviso: Nenhum arquivo PHP encontrado em '{p}'. Ignorando.", file=sys.stderr)
+
+            actual_files_to_analyze = arquivos_dos_caminhos()
+            primeiro_arquivo = next(actual_files_to_analyze, None)
+            if primeiro_arquivo is None:
+                print("Erro: Nenhum arquivo PHP válido encontrado para análise nos caminhos fornecidos. Abortando.")
+                print(f"Uso: {USO}")
+                sys.exit(1) # Sai com erro se nao encontrar arquivos PHP
+
+            print(f"Modo de linha de comando: Analisando arquivos de {len(input_paths_from_cli)} caminho(s).")
+            if shard is None:
+                historico = None
+                if args.store:
+                    try:
+                        historico = SaidaHistorico(args.store, analisador.registro.obter_hash_regras(),
+                                                   args.store_label)
+                    except ErroHistorico as e:
+                        print(f"Erro: Não foi possível abrir o histórico: {e}")
+                        sys.exit(1)
+                    analisador.saidas_adicionais.append(historico)
+                analisador.analisar_multiplos_arquivos_php(chain([primeiro_arquivo], actual_files_to_analyze),
+                                                           generate_reports=generate_reports_final, jobs=args.jobs)
+                if historico is not None and not analisador.interrompida:
+                    historico.concluir(analisador.arquivos_analisados)
+            else:
+                # A divisão precisa de todos os arquivos descobertos; os relatórios ficam para o merge.
+                indice, total = shard
+                todos = [primeiro_arquivo, *actual_files_to_analyze]
+                arquivos_shard = selecionar_shard(todos, indice, total, chaves_shard)
+                print(f"Shard {indice}/{total}: {len(arquivos_shard)} de {len(todos)} arquivo(s).")
+                fragmento = SaidaFragmento(args.shard_output or os.path.join(
+                    DIRETORIO_FRAGMENTOS, NOME_FRAGMENTO.format(indice=indice, total=total)),
+                    indice, total, analisador.registro.obter_hash_regras(), hash_arquivos(todos, chaves_shard))
+                analisador.saidas_adicionais.append(fragmento)
+                analisador.analisar_multiplos_arquivos_php(arquivos_shard, generate_reports=False, jobs=args.jobs)
+                if analisador.interrompida:
+                    sys.exit(1)
+                fragmento.concluir(analisador.arquivos_analisados)
+            print(f"{analisador.arquivos_analisados} arquivo(s) analisado(s).")
 
-        print(f"Modo de linha de comando: Analisando {len(actual_files_to_analyze)} arquivo(s).")
-        analisador.analisar_multiplos_arquivos_php(actual_files_to_analyze, generate_reports=generate_reports_final)
+        if perfil is not None:
+            perfil.exibir_resumo()
+            perfil.exportar_json(args.profile)
+        if analisador.achado_falha is not None:
+            print(f"\nAnálise encerrada por --fail-fast: achado de severidade {analisador.achado_falha.severity}.")
+            sys.exit(1)
     else:
         # Se não houver argumentos na linha de comando, exibe o uso e sai
-        print("Uso: python script.py <caminho_do_arquivo_ou_diretorio> [outro_caminho...] [--no-report]")
+        print(f"Uso: {USO}")
         print("Nenhum arquivo ou diretório para análise fornecido. Abortando.")
         sys.exit(1) # Sai com erro
 